@@ -1,60 +1,132 @@
 # app.py
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, make_response, render_template, request, jsonify
+from flask.logging import default_handler
 import requests
+import math
 import os
+import time
 import logging
 from logging.handlers import RotatingFileHandler
+import sys
 from datetime import datetime, timezone
 from excel_backend import (
-    get_fruit_master,
+    get_model,
+    get_loaded_model,
+    load_model_in_background,
     auto_suggest_from_excel,
-    calculate_blend_manual,
-    _calculate_optimal_juice_amount,
+    calculate_blend_manual_cached,
+    calculate_blends_batch,
+    calculate_optimal_juice_amount_cached,
+    PlanTotals,
+    plan_production,
+    simulate_fermentation,
+    sweep_blend,
+    get_result_cache_stats,
 )
+from weather import get_weather_client
+import compression
+import exports
+import json_provider
+import metrics
+import profiling
+import static_assets
+import structured_logging
 
 app = Flask(__name__)
+json_provider.init_app(app)
 
 # Configuration
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max request size
-
-# Logging configuration
+app.config['MAX_BATCH_BLENDS'] = int(os.environ.get('MAX_BATCH_BLENDS', 1000))
+# Production plans: batches per request and the per-batch size cap (larger
+# than MAX_BATCH_SIZE, which is the single-blend form's limit)
+app.config['MAX_PLAN_BATCHES'] = int(os.environ.get('MAX_PLAN_BATCHES', 5000))
+app.config['MAX_PLAN_BATCH_L'] = float(os.environ.get('MAX_PLAN_BATCH_L', 1000))
+# Rows per /api/export/* response (blends, plan batches or sweep cells)
+app.config['MAX_EXPORT_ROWS'] = int(os.environ.get('MAX_EXPORT_ROWS', 100000))
+# Temperature x juice dose cells per /api/suggest/sweep request
+app.config['MAX_SWEEP_CELLS'] = int(os.environ.get('MAX_SWEEP_CELLS', 10000))
+# Scenarios x time steps per /api/ferment/simulate request
+app.config['MAX_SIMULATION_POINTS'] = int(os.environ.get('MAX_SIMULATION_POINTS', 200000))
+
+# Logging configuration: records are queued on the request thread and
+# formatted, written and rotated by a background writer (structured_logging)
 if not app.debug:
     if not os.path.exists('logs'):
         os.mkdir('logs')
     file_handler = RotatingFileHandler('logs/probiotic_app.log', maxBytes=10240000, backupCount=10)
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-    ))
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.setLevel(logging.INFO)
+    # Replaces Flask's synchronous stderr handler; platform log collectors still get every line
+    app.logger.removeHandler(default_handler)
+    # On the root logger so the excel_backend, weather and profiling module
+    # loggers (and app.logger, which propagates) all go through the writer
+    structured_logging.configure(
+        logging.getLogger(), file_handler, logging.StreamHandler(sys.stderr),
+        level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+    )
     app.logger.info('Probiotic Designer startup')
 else:
     app.logger.setLevel(logging.DEBUG)
 
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    # Label by route template, not path, so /metrics stays bounded
+    route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+    started = g.get("request_started")
+    if started is not None and route != "/metrics":
+        metrics.observe_request(route, request.method, response.status_code, time.perf_counter() - started)
+    return response
+
+
+profiling.init_app(app)
+static_assets.init_app(app)
+compression.init_app(app)
+
+# /api/metadata bodies by encoding, for the current model version only
+_metadata_cache = {}
+
+
 @app.route("/")
 def index():
     """Render main application page."""
-    return render_template("index.html")
+    # Asset URLs in the page are fingerprinted, so the page itself changes
+    # whenever they do; revalidate it each time (usually a 304)
+    response = make_response(render_template("index.html"))
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 
 @app.route("/health")
 def health_check():
     """Health check endpoint for monitoring."""
     try:
-        # Test Excel file access
-        fruits = get_fruit_master()
+        # Loads the model on a cold worker; probes should use /health/ready
+        model = get_model()
         return jsonify({
             'status': 'healthy',
             'timestamp': datetime.now(timezone.utc).isoformat(),
             'version': '1.0.0',
-            'fruits_loaded': len(fruits)
+            'fruits_loaded': len(model.catalog),
+            'model_version': model.version,
+            'model_loaded_at': model.loaded_at.isoformat(),
+            'model_source': model.source,
+            'worker_rss_mb': {
+                'before_model_load': round(model.rss_before_mb, 1),
+                'after_model_load': round(model.rss_after_mb, 1),
+            },
+            'result_cache': get_result_cache_stats(),
+            'logging': structured_logging.get_logging_stats(),
         }), 200
     except Exception as e:
-        app.logger.error(f'Health check failed: {str(e)}')
+        app.logger.error('Health check failed: %s', e)
         return jsonify({
             'status': 'unhealthy',
             'timestamp': datetime.now(timezone.utc).isoformat(),
@@ -62,16 +134,114 @@ def health_check():
         }), 503
 
 
+@app.route("/health/live")
+def health_live():
+    """Liveness probe: the worker is up and serving requests."""
+    return jsonify({
+        'status': 'alive',
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'pid': os.getpid(),
+    }), 200
+
+
+@app.route("/health/ready")
+def health_ready():
+    """
+    Readiness probe from cached model state; never parses the workbook.
+
+    A cold worker starts its model load in the background and answers 503
+    until the model is in place.
+    """
+    model = get_loaded_model()
+    if model is None:
+        load_error = load_model_in_background()
+        body = {
+            'status': 'not_ready',
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'model_loaded': False,
+        }
+        if load_error:
+            body['error'] = load_error
+        return jsonify(body), 503
+    return jsonify({
+        'status': 'ready',
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'model_loaded': True,
+        'model_version': model.version,
+        'model_source': model.source,
+        'model_loaded_at': model.loaded_at.isoformat(),
+        'model_load_seconds': round(model.load_seconds, 3),
+        'rows': {
+            'fruits': len(model.catalog),
+            'costing': len(model.costs),
+            'co2_safety': len(model.safety_index),
+        },
+        'suggest_table_entries': len(model.suggest_table),
+    }), 200
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus metrics, aggregated across gunicorn workers."""
+    scrape = metrics.render()
+    if scrape is None:
+        return jsonify({"error": "Metrics unavailable", "message": "prometheus_client is not installed"}), 501
+    body, content_type = scrape
+    return Response(body, content_type=content_type)
+
+
+@app.route("/api/admin/profiles", methods=["GET"])
+def api_admin_profiles():
+    """List the slowest profiled requests (requires the X-Profile-Token header)."""
+    if not profiling.is_admin(request):
+        return jsonify({"error": "Forbidden", "message": "A valid X-Profile-Token header is required"}), 403
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), 200))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    return jsonify({
+        "profile_dir": profiling.PROFILE_DIR,
+        "sample_rate": profiling.PROFILE_SAMPLE_RATE,
+        "requests": profiling.slowest(limit, route=request.args.get("route")),
+    })
+
+
 @app.route("/api/metadata", methods=["GET"])
 def api_metadata():
-    """Provide list of fruits for dropdowns and maybe other config."""
+    """
+    Provide list of fruits for dropdowns and maybe other config.
+
+    The ETag is the workbook model version: a client that already has this
+    version's list gets a 304 without the body being rebuilt or sent.
+    """
     try:
-        fruits = get_fruit_master()
-        fruit_names = [f["name"] for f in fruits]
-        app.logger.info(f'Metadata requested: {len(fruit_names)} fruits available')
-        return jsonify({"fruits": fruit_names})
+        model = get_model()
+        etag = f'metadata-{model.version}'
+        # Weak: the bytes differ by Content-Encoding
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+        else:
+            bodies = _metadata_cache.get(model.version)
+            if bodies is None:
+                body = app.json.response({"fruits": list(model.catalog.names)}).get_data()
+                _metadata_cache.clear()
+                bodies = _metadata_cache.setdefault(model.version, {'identity': body})
+            # Compressed once per version and encoding, not on every request
+            encoding = compression.negotiate(len(bodies['identity'])) or 'identity'
+            if encoding not in bodies:
+                bodies[encoding] = compression.compress(bodies['identity'], encoding)
+            response = app.response_class(bodies[encoding], mimetype='application/json')
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+            app.logger.info('Metadata requested: %d fruits available', len(model.catalog),
+                            extra={'event': 'metadata', 'fruits': len(model.catalog)})
+        # On the 304 too, so a cache revalidating one encoding doesn't reuse it for another
+        response.vary.add('Accept-Encoding')
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
-        app.logger.error(f'Error loading metadata: {str(e)}')
+        app.logger.error('Error loading metadata: %s', e)
         return jsonify({
             "error": "Failed to load fruit data",
             "message": str(e)
@@ -87,29 +257,16 @@ def api_weather():
 
     try:
         if lat and lon:
-            # Use wttr.in for weather data (free, no API key needed)
-            url = f"https://wttr.in/{lat},{lon}?format=j1"
-            response = requests.get(url, timeout=10)
-
-            if response.status_code == 200:
-                weather_data = response.json()
-                current = weather_data.get("current_condition", [{}])[0]
-
-                temp_c = float(current.get("temp_C", 28))
-                humidity = int(current.get("humidity", 60))
-                weather_desc = current.get("weatherDesc", [{}])[0].get("value", "Clear")
-
-                # Get location name
-                nearest_area = weather_data.get("nearest_area", [{}])[0]
-                city = nearest_area.get("areaName", [{}])[0].get("value", "Unknown")
-                country = nearest_area.get("country", [{}])[0].get("value", "")
+            # Pooled, cached client; most requests are served from the grid-cell cache
+            reading, cache_status = get_weather_client().get(lat, lon)
 
+            if reading is not None:
+                app.logger.debug('Weather %s for %s,%s', cache_status, lat, lon,
+                                 extra={'event': 'weather', 'cache': cache_status})
                 return jsonify({
                     "success": True,
-                    "temp_c": temp_c,
-                    "humidity": humidity,
-                    "weather": weather_desc,
-                    "location": f"{city}, {country}" if country else city
+                    **reading,
+                    "cache": cache_status,
                 })
 
         # Default fallback
@@ -157,7 +314,7 @@ def api_juice_recommend():
     target_sugar = float(data.get("target_sugar_g_L", 7.0))
 
     try:
-        recommendation = _calculate_optimal_juice_amount(fruits, target_sugar)
+        recommendation = calculate_optimal_juice_amount_cached(fruits, target_sugar)
         return jsonify({
             "success": True,
             **recommendation
@@ -181,6 +338,9 @@ def api_suggest_auto():
         batch_l = float(data.get("batch_l", 3))
         juice_ml_per_L = float(data.get("juice_ml_per_L", 80))
         temp_C = float(data.get("temp_C", 28))
+        max_sugar_g_L = float(data.get("max_sugar_g_L", 8))
+        max_cost_per_L = data.get("max_cost_per_L")
+        max_cost_per_L = float(max_cost_per_L) if max_cost_per_L not in (None, "") else None
 
         # Validate ranges
         if not (1 <= target_sweet <= 10):
@@ -193,13 +353,21 @@ def api_suggest_auto():
             return jsonify({"error": "Juice amount must be between 10 and 200 ml/L"}), 400
         if not (5 <= temp_C <= 45):
             return jsonify({"error": "Temperature must be between 5 and 45°C"}), 400
+        if not (1 <= max_sugar_g_L <= 20):
+            return jsonify({"error": "Max sugar must be between 1 and 20 g/L"}), 400
+        if max_cost_per_L is not None and max_cost_per_L < 0:
+            return jsonify({"error": "Max cost per liter cannot be negative"}), 400
 
     except (TypeError, ValueError) as e:
-        app.logger.warning(f'Invalid input in auto suggest: {str(e)}')
+        app.logger.warning('Invalid input in auto suggest: %s', e)
         return jsonify({"error": "Invalid input format"}), 400
 
     try:
-        base = auto_suggest_from_excel(target_sweet, target_tart, style, total_juice_ml_per_L=juice_ml_per_L, batch_l=batch_l, temp_C=temp_C)
+        base = auto_suggest_from_excel(
+            target_sweet, target_tart, style,
+            total_juice_ml_per_L=juice_ml_per_L, batch_l=batch_l, temp_C=temp_C,
+            max_sugar_g_L=max_sugar_g_L, max_cost_per_L=max_cost_per_L,
+        )
 
         for f in base["fruits"]:
             f["juice_ml_batch"] = round(f["juice_ml_per_L"] * batch_l, 2)
@@ -207,13 +375,20 @@ def api_suggest_auto():
         base["batch_l"] = batch_l
         base["juice_ml_per_L"] = juice_ml_per_L
 
-        app.logger.info(f'Auto blend generated: sweetness={target_sweet}, tartness={target_tart}, style={style}')
+        app.logger.info('Auto blend generated: sweetness=%s, tartness=%s, style=%s', target_sweet, target_tart, style,
+                        extra={'event': 'auto_blend', 'sweetness': target_sweet, 'tartness': target_tart,
+                               'style': style})
         return jsonify(base)
     except Exception as e:
-        app.logger.error(f'Error generating auto blend: {str(e)}')
+        app.logger.error('Error generating auto blend: %s', e)
         return jsonify({"error": "Failed to generate blend", "message": str(e)}), 500
 
 
+def _is_fruit_name(value):
+    """True for a non-blank string; the blend calculators strip and look these up."""
+    return isinstance(value, str) and bool(value.strip())
+
+
 @app.route("/api/suggest/manual", methods=["POST"])
 def api_suggest_manual():
     """Calculate manual blend based on selected fruits."""
@@ -225,6 +400,9 @@ def api_suggest_manual():
             data.get("fruit3", ""),
             data.get("fruit4", ""),
         ]
+        # Unused slots come through empty; anything else must be a name
+        if not all(f in (None, "") or _is_fruit_name(f) for f in fruits):
+            raise ValueError("fruit slots must be names")
         pcts = [
             float(data.get("pct1", 0)) / 100.0,
             float(data.get("pct2", 0)) / 100.0,
@@ -234,6 +412,7 @@ def api_suggest_manual():
         batch_l = float(data.get("batch_l", 3))
         juice_ml_per_L = float(data.get("juice_ml_per_L", 80))
         temp_C = float(data.get("temp_C", 28))
+        interpolate_safety = bool(data.get("safety_interpolation", False))
 
         # Validate ranges
         if not (0.5 <= batch_l <= 50):
@@ -244,18 +423,323 @@ def api_suggest_manual():
             return jsonify({"error": "Temperature must be between 5 and 45°C"}), 400
 
     except (TypeError, ValueError) as e:
-        app.logger.warning(f'Invalid input in manual suggest: {str(e)}')
+        app.logger.warning('Invalid input in manual suggest: %s', e)
         return jsonify({"error": "Invalid input format"}), 400
 
     try:
-        result = calculate_blend_manual(fruits, pcts, juice_ml_per_L, batch_l, temp_C=temp_C)
-        app.logger.info(f'Manual blend calculated: fruits={[f for f in fruits if f]}, batch={batch_l}L')
+        result = calculate_blend_manual_cached(
+            fruits, pcts, juice_ml_per_L, batch_l, temp_C=temp_C, interpolate_safety=interpolate_safety,
+        )
+        selected = [f for f in fruits if f]
+        app.logger.info('Manual blend calculated: fruits=%s, batch=%sL', selected, batch_l,
+                        extra={'event': 'manual_blend', 'fruits': selected, 'batch_l': batch_l})
         return jsonify(result)
     except Exception as e:
-        app.logger.error(f'Error calculating manual blend: {str(e)}')
+        app.logger.error('Error calculating manual blend: %s', e)
         return jsonify({"error": "Failed to calculate blend", "message": str(e)}), 500
 
 
+def _parse_blend_items(items, noun, max_batch_l=50, schedule=False):
+    """
+    Validate a request's list of blends into calculate_blends_batch inputs.
+
+    Args:
+        items: list of dicts with fruits, pcts (percent), batch_l, juice_ml_per_L, temp_C
+        noun: "Blend" or "Batch", used in error messages
+        max_batch_l: largest batch_l accepted
+        schedule: also read the production plan's label and start_at
+
+    Returns:
+        (blends, None), or (None, error response) for the first invalid item
+    """
+    blends = []
+    for i, item in enumerate(items):
+        try:
+            fruits = item.get("fruits", [])
+            if not isinstance(fruits, list) or not all(_is_fruit_name(f) for f in fruits):
+                raise ValueError("fruits must be a list of non-empty names")
+            pcts = [float(p or 0) / 100.0 for p in item.get("pcts", [])]
+            batch_l = float(item.get("batch_l", 3))
+            juice_ml_per_L = float(item.get("juice_ml_per_L", 80))
+            temp_C = float(item.get("temp_C", 28))
+            if schedule:
+                label = item.get("label")
+                start_at = item.get("start_at")
+                if start_at is not None:
+                    start_at = datetime.fromisoformat(start_at)
+                    if start_at.tzinfo is None:
+                        start_at = start_at.replace(tzinfo=timezone.utc)
+        except (AttributeError, TypeError, ValueError) as e:
+            app.logger.warning('Invalid input in %s %d: %s', noun.lower(), i, e)
+            return None, (jsonify({"error": f"{noun} {i}: Invalid input format"}), 400)
+
+        # Validate ranges
+        if not fruits or len(fruits) > 4 or len(fruits) != len(pcts):
+            return None, (jsonify({"error": f"{noun} {i}: Provide 1 to 4 fruits with one percentage each"}), 400)
+        if not (0.5 <= batch_l <= max_batch_l):
+            return None, (jsonify({
+                "error": f"{noun} {i}: Batch size must be between 0.5 and {max_batch_l:g} liters"
+            }), 400)
+        if not (10 <= juice_ml_per_L <= 200):
+            return None, (jsonify({"error": f"{noun} {i}: Juice amount must be between 10 and 200 ml/L"}), 400)
+        if not (5 <= temp_C <= 45):
+            return None, (jsonify({"error": f"{noun} {i}: Temperature must be between 5 and 45°C"}), 400)
+
+        blend = {
+            "fruit_names": fruits,
+            "pcts": pcts,
+            "batch_l": batch_l,
+            "juice_ml_per_L": juice_ml_per_L,
+            "temp_C": temp_C,
+        }
+        if schedule:
+            blend["label"] = None if label is None else str(label)
+            blend["start_at"] = start_at
+        blends.append(blend)
+    return blends, None
+
+
+@app.route("/api/suggest/manual/batch", methods=["POST"])
+def api_suggest_manual_batch():
+    """Calculate many manual blends in one request."""
+    data = request.get_json() or {}
+    items = data.get("blends")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Request must include a non-empty 'blends' list"}), 400
+    if len(items) > app.config['MAX_BATCH_BLENDS']:
+        return jsonify({"error": f"At most {app.config['MAX_BATCH_BLENDS']} blends per request"}), 400
+
+    blends, error = _parse_blend_items(items, "Blend")
+    if error is not None:
+        return error
+
+    try:
+        results = calculate_blends_batch(blends, interpolate_safety=bool(data.get("safety_interpolation", False)))
+        app.logger.info('Batch blends calculated: %d blends', len(results),
+                        extra={'event': 'batch_blend', 'blends': len(results)})
+        return jsonify({"count": len(results), "results": results})
+    except Exception as e:
+        app.logger.error('Error calculating batch blends: %s', e)
+        return jsonify({"error": "Failed to calculate blends", "message": str(e)}), 500
+
+
+@app.route("/api/plan", methods=["POST"])
+def api_plan():
+    """Formulate a production schedule with aggregated ingredient, cost and finish totals."""
+    data = request.get_json() or {}
+    items = data.get("batches")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Request must include a non-empty 'batches' list"}), 400
+    if len(items) > app.config['MAX_PLAN_BATCHES']:
+        return jsonify({"error": f"At most {app.config['MAX_PLAN_BATCHES']} batches per plan"}), 400
+    batches, error = _parse_blend_items(items, "Batch", app.config['MAX_PLAN_BATCH_L'], schedule=True)
+    if error is not None:
+        return error
+
+    try:
+        plan = plan_production(batches, interpolate_safety=bool(data.get("safety_interpolation", False)))
+        app.logger.info('Production plan calculated: %d batches, %sL', len(batches), plan["totals"]["volume_l"],
+                        extra={'event': 'plan', 'batches': len(batches), 'volume_l': plan["totals"]["volume_l"]})
+        return jsonify(plan)
+    except Exception as e:
+        app.logger.error('Error calculating production plan: %s', e)
+        return jsonify({"error": "Failed to calculate production plan", "message": str(e)}), 500
+
+
+def _sweep_axis(spec, default_min, default_max, max_steps):
+    """
+    Axis values from a list or {"min", "max", "steps"}; raises ValueError/TypeError.
+
+    Returns None, before building anything, when the axis would have more
+    than max_steps values.
+    """
+    if isinstance(spec, list):
+        if len(spec) > max_steps:
+            return None
+        return [float(v) for v in spec]
+    spec = spec or {}
+    lo = float(spec.get("min", default_min))
+    hi = float(spec.get("max", default_max))
+    steps = int(spec.get("steps", 50))
+    if steps < 1 or hi < lo:
+        raise ValueError("axis needs min <= max and at least one step")
+    if steps > max_steps:
+        return None
+    if steps == 1:
+        return [lo]
+    return [lo + (hi - lo) * i / (steps - 1) for i in range(steps)]
+
+
+def _parse_sweep(data, max_cells):
+    """
+    Validate a sweep request body.
+
+    Returns ((fruits, pcts, batch_l, temps, doses), None), or (None, error response).
+    """
+    try:
+        fruits = data.get("fruits", [])
+        if not isinstance(fruits, list) or not all(_is_fruit_name(f) for f in fruits):
+            raise ValueError("fruits must be a list of non-empty names")
+        pcts = [float(p or 0) / 100.0 for p in data.get("pcts", [])]
+        batch_l = float(data.get("batch_l", 3))
+        temps = _sweep_axis(data.get("temp_C"), 15, 35, max_cells)
+        # Bound the second axis by what the first leaves, so neither is built oversized
+        doses = None if temps is None else _sweep_axis(
+            data.get("juice_ml_per_L"), 20, 200, max_cells // max(len(temps), 1),
+        )
+    except (AttributeError, TypeError, ValueError) as e:
+        app.logger.warning('Invalid input in sweep: %s', e)
+        return None, (jsonify({"error": "Invalid input format"}), 400)
+    if temps is None or doses is None:
+        return None, (jsonify({"error": f"At most {max_cells} grid cells per request"}), 400)
+
+    # Validate ranges
+    if not fruits or len(fruits) > 4 or len(fruits) != len(pcts):
+        return None, (jsonify({"error": "Provide 1 to 4 fruits with one percentage each"}), 400)
+    if not (0.5 <= batch_l <= 50):
+        return None, (jsonify({"error": "Batch size must be between 0.5 and 50 liters"}), 400)
+    if not temps or not all(5 <= t <= 45 for t in temps):
+        return None, (jsonify({"error": "Temperature must be between 5 and 45°C"}), 400)
+    if not doses or not all(10 <= d <= 200 for d in doses):
+        return None, (jsonify({"error": "Juice amount must be between 10 and 200 ml/L"}), 400)
+    return (fruits, pcts, batch_l, temps, doses), None
+
+
+@app.route("/api/suggest/sweep", methods=["POST"])
+def api_suggest_sweep():
+    """Evaluate one blend over a temperature x juice dose grid."""
+    data = request.get_json() or {}
+    sweep, error = _parse_sweep(data, app.config['MAX_SWEEP_CELLS'])
+    if error is not None:
+        return error
+    fruits, pcts, batch_l, temps, doses = sweep
+
+    try:
+        result = sweep_blend(fruits, pcts, batch_l, temps, doses,
+                             interpolate_safety=bool(data.get("safety_interpolation", False)))
+        selected = [f for f in fruits if f]
+        app.logger.info('Blend sweep calculated: fruits=%s, %dx%d grid', selected, len(temps), len(doses),
+                        extra={'event': 'sweep', 'fruits': selected, 'cells': len(temps) * len(doses)})
+        return jsonify(result)
+    except Exception as e:
+        app.logger.error('Error calculating sweep: %s', e)
+        return jsonify({"error": "Failed to calculate sweep", "message": str(e)}), 500
+
+
+@app.route("/api/ferment/simulate", methods=["POST"])
+def api_ferment_simulate():
+    """Simulate sugar, CO2 and ABV over time for one or more scenarios."""
+    data = request.get_json() or {}
+    items = data.get("scenarios")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Request must include a non-empty 'scenarios' list"}), 400
+    try:
+        hours = float(data.get("hours", 48))
+        step_hours = float(data.get("step_hours", 0.5))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid input format"}), 400
+    if not (1 <= hours <= 168):
+        return jsonify({"error": "Hours must be between 1 and 168"}), 400
+    if not (0.05 <= step_hours <= hours):
+        return jsonify({"error": "Step must be between 0.05 hours and the simulated duration"}), 400
+    if len(items) * math.ceil(hours / step_hours) > app.config['MAX_SIMULATION_POINTS']:
+        return jsonify({"error": f"At most {app.config['MAX_SIMULATION_POINTS']} scenario time steps per request"}), 400
+
+    scenarios = []
+    for i, item in enumerate(items):
+        try:
+            sugar_g_L = float(item.get("sugar_g_L"))
+            profile = item.get("temp_profile")
+            if profile:
+                profile = [(float(h), float(t)) for h, t in profile]
+                temps = [t for _, t in profile]
+            else:
+                temps = [float(item.get("temp_C", 28))]
+        except (AttributeError, TypeError, ValueError) as e:
+            app.logger.warning('Invalid input in fermentation scenario %d: %s', i, e)
+            return jsonify({"error": f"Scenario {i}: Invalid input format"}), 400
+
+        # Validate ranges
+        if not (0 <= sugar_g_L <= 50):
+            return jsonify({"error": f"Scenario {i}: Sugar must be between 0 and 50 g/L"}), 400
+        if not all(5 <= t <= 45 for t in temps):
+            return jsonify({"error": f"Scenario {i}: Temperature must be between 5 and 45°C"}), 400
+
+        if profile:
+            scenarios.append({"sugar_g_L": sugar_g_L, "temp_profile": profile})
+        else:
+            scenarios.append({"sugar_g_L": sugar_g_L, "temp_C": temps[0]})
+
+    try:
+        result = simulate_fermentation(scenarios, hours, step_hours)
+        app.logger.info('Fermentation simulated: %d scenarios', len(scenarios),
+                        extra={'event': 'ferment_simulate', 'scenarios': len(scenarios)})
+        return jsonify(result)
+    except Exception as e:
+        app.logger.error('Error simulating fermentation: %s', e)
+        return jsonify({"error": "Failed to simulate fermentation", "message": str(e)}), 500
+
+
+@app.route("/api/export/blends", methods=["POST"])
+def api_export_blends():
+    """Stream /api/suggest/manual/batch results as CSV or NDJSON, one row per blend."""
+    fmt = exports.negotiate_format(request)
+    if fmt is None:
+        return jsonify({"error": "Format must be csv or ndjson"}), 400
+    data = request.get_json() or {}
+    items = data.get("blends")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Request must include a non-empty 'blends' list"}), 400
+    if len(items) > app.config['MAX_EXPORT_ROWS']:
+        return jsonify({"error": f"At most {app.config['MAX_EXPORT_ROWS']} rows per export"}), 400
+    blends, error = _parse_blend_items(items, "Blend")
+    if error is not None:
+        return error
+
+    # Pin one model so a reload mid-export can't mix workbook versions
+    model = get_model()
+    chunks = exports.blend_chunks(blends, model, bool(data.get("safety_interpolation", False)))
+    return exports.stream(chunks, exports.BLEND_COLUMNS, fmt, "blends")
+
+
+@app.route("/api/export/plan", methods=["POST"])
+def api_export_plan():
+    """Stream a production plan as CSV or NDJSON, one row per batch (NDJSON ends with the totals)."""
+    fmt = exports.negotiate_format(request)
+    if fmt is None:
+        return jsonify({"error": "Format must be csv or ndjson"}), 400
+    data = request.get_json() or {}
+    items = data.get("batches")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Request must include a non-empty 'batches' list"}), 400
+    if len(items) > app.config['MAX_EXPORT_ROWS']:
+        return jsonify({"error": f"At most {app.config['MAX_EXPORT_ROWS']} rows per export"}), 400
+    batches, error = _parse_blend_items(items, "Batch", app.config['MAX_PLAN_BATCH_L'], schedule=True)
+    if error is not None:
+        return error
+
+    model = get_model()
+    totals = PlanTotals(model)
+    chunks = exports.plan_chunks(batches, model, totals, bool(data.get("safety_interpolation", False)))
+    return exports.stream(chunks, exports.PLAN_COLUMNS, fmt, "plan", trailer=lambda: {"totals": totals.totals()})
+
+
+@app.route("/api/export/sweep", methods=["POST"])
+def api_export_sweep():
+    """Stream a temperature x juice dose sweep as CSV or NDJSON, one row per grid cell."""
+    fmt = exports.negotiate_format(request)
+    if fmt is None:
+        return jsonify({"error": "Format must be csv or ndjson"}), 400
+    data = request.get_json() or {}
+    sweep, error = _parse_sweep(data, app.config['MAX_EXPORT_ROWS'])
+    if error is not None:
+        return error
+
+    model = get_model()
+    chunks = exports.sweep_chunks(*sweep, model, bool(data.get("safety_interpolation", False)))
+    return exports.stream(chunks, exports.SWEEP_COLUMNS, fmt, "sweep")
+
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -270,7 +754,7 @@ def not_found_error(error):
 @app.errorhandler(500)
 def internal_error(error):
     """Handle 500 errors."""
-    app.logger.error(f'Server Error: {error}')
+    app.logger.error('Server Error: %s', error)
     return jsonify({
         'error': 'Internal server error',
         'message': 'Something went wrong. Please try again later.',
@@ -294,8 +778,8 @@ if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
 
     if debug_mode:
-        app.logger.info(f'Starting in DEBUG mode on port {port}')
+        app.logger.info('Starting in DEBUG mode on port %d', port)
     else:
-        app.logger.info(f'Starting in PRODUCTION mode on port {port}')
+        app.logger.info('Starting in PRODUCTION mode on port %d', port)
 
     app.run(debug=debug_mode, host="0.0.0.0", port=port)
@@ -0,0 +1,262 @@
+# benchmarks/bench_backend.py
+#
+# Timings for the excel_backend calculation paths and the Flask endpoints
+# that use them, on synthetic workbooks of increasing size, so a change to
+# excel_backend.py can be compared before/after and its scaling seen.
+#
+# For each size a workbook with that many FruitMaster fruits, Costing rows
+# and CO2Safety rows is generated (benchmarks/synthetic_workbook.py) and
+# installed as the active model. Result caches are disabled unless --cache
+# is given, so repeated inputs measure the computation rather than a hit.
+#
+#   python benchmarks/bench_backend.py [--sizes 20,1000,100000] [--json results.json]
+#                                      [--min-time 0.5] [--only auto,manual] [--cache]
+#
+# --json writes {"meta": {...}, "results": [{"size", "benchmark", "runs",
+# "mean_us", "p50_us", "p95_us", "min_us", "max_us"}, ...]}; "-" writes it
+# to stdout instead of the table.
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_workbook import write_workbook  # noqa: E402
+
+DEFAULT_SIZES = (20, 1000, 100000)
+# Whole-workbook loads are slow at 100k rows; time them this many times at most
+MAX_LOAD_RUNS = 3
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="excel_backend and endpoint timings on synthetic workbooks")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated workbook row counts")
+    parser.add_argument("--json", metavar="PATH", help="write machine-readable results here ('-' for stdout)")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to spend per benchmark (default 0.5)")
+    parser.add_argument("--only", help="comma-separated substrings; run benchmarks whose name contains one")
+    parser.add_argument("--cache", action="store_true", help="leave the result caches on")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def measure(fn, min_time, max_runs=100000, min_runs=3):
+    """Call fn repeatedly for about min_time seconds; return per-call seconds."""
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < max_runs and (len(timings) < min_runs or time.perf_counter() < deadline):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def summarize(size, name, timings):
+    ordered = sorted(timings)
+    us = lambda s: round(s * 1e6, 2)  # noqa: E731
+    return {
+        "size": size,
+        "benchmark": name,
+        "runs": len(ordered),
+        "mean_us": us(statistics.fmean(ordered)),
+        "p50_us": us(ordered[len(ordered) // 2]),
+        "p95_us": us(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]),
+        "min_us": us(ordered[0]),
+        "max_us": us(ordered[-1]),
+    }
+
+
+def cycle(items):
+    """Endless iterator over a list of prepared inputs (one next() per call)."""
+    while True:
+        yield from items
+
+
+def backend_cases(eb, model, rng):
+    """(name, fn, max_runs) for the direct excel_backend calls."""
+    names = list(model.catalog.names)
+    blends = []
+    for _ in range(256):
+        k = rng.randint(1, 4)
+        fruits = rng.sample(names, k)
+        cuts = sorted(rng.sample(range(1, 100), k - 1))
+        pcts = [(b - a) / 100.0 for a, b in zip([0] + cuts, cuts + [100])]
+        blends.append((fruits + [""] * (4 - k), pcts + [0.0] * (4 - k), rng.choice([60, 80, 120]),
+                       rng.choice([1, 3, 10]), rng.uniform(18, 34)))
+    juice_inputs = [rng.sample(names, rng.randint(1, 4)) for _ in range(256)]
+    # Off-grid targets are never in the auto-suggest table, so every call computes a frontier
+    off_grid = [(rng.randint(1, 9) + 0.5, rng.randint(1, 9) + 0.5, rng.choice(["", "tropical", "berry"]))
+                for _ in range(64)]
+    on_grid = [(rng.randint(1, 10), rng.randint(1, 10), rng.choice(["", "citrus"])) for _ in range(16)]
+    for sweet, tart, style in on_grid:
+        eb.auto_suggest_from_excel(sweet, tart, style, model=model)
+    safety = [(rng.uniform(3, 13), rng.uniform(15, 36)) for _ in range(1024)]
+    lookups = [rng.choice(names).upper() for _ in range(1024)]
+    scenarios = [{"sugar_g_L": rng.uniform(3, 10), "temp_C": rng.uniform(18, 34)} for _ in range(500)]
+    sweep_temps = [15 + 20 * i / 49 for i in range(50)]
+    sweep_doses = [20 + 180 * i / 49 for i in range(50)]
+    sweeps = [(b[0], b[1], b[3], sweep_temps, sweep_doses) for b in blends[:64]]
+
+    blend_it, juice_it, off_it, on_it = cycle(blends), cycle(juice_inputs), cycle(off_grid), cycle(on_grid)
+    safety_it, safety_interp_it, lookup_it = cycle(safety), cycle(safety), cycle(lookups)
+    sweep_it = cycle(sweeps)
+    plan = [{"fruit_names": f, "pcts": p, "juice_ml_per_L": j, "batch_l": b, "temp_C": t} for f, p, j, b, t in blends]
+    plan = (plan * 4)[:1000]
+    return [
+        ("get_fruit_master", eb.get_fruit_master, None),
+        ("_lookup_fruit_sugar", lambda: eb._lookup_fruit_sugar(next(lookup_it), model), None),
+        ("auto_suggest_from_excel[computed]",
+         lambda: eb.auto_suggest_from_excel(*next(off_it), model=model), 2000),
+        ("auto_suggest_from_excel[table hit]",
+         lambda: eb.auto_suggest_from_excel(*next(on_it), model=model), None),
+        # A cost cap bypasses the table: every call searches its candidate pool
+        ("auto_suggest_from_excel[cost cap]",
+         lambda: eb.auto_suggest_from_excel(*next(on_it), max_cost_per_L=20, model=model), 2000),
+        ("calculate_blend_manual", lambda: eb.calculate_blend_manual(*next(blend_it), model=model), None),
+        ("_calculate_optimal_juice_amount",
+         lambda: eb._calculate_optimal_juice_amount(next(juice_it), model=model), None),
+        ("_lookup_safety_row", lambda: eb._lookup_safety_row(*next(safety_it), model=model), None),
+        ("_lookup_safety_row[interpolated]",
+         lambda: eb._lookup_safety_row(*next(safety_interp_it), model=model, interpolate=True), None),
+        ("_calculate_optimal_ferment_time",
+         lambda: eb._calculate_optimal_ferment_time(*next(safety_it), model=model), None),
+        ("simulate_fermentation[500 x 48h]",
+         lambda: eb.simulate_fermentation(scenarios, 48, 0.5, model=model), 2000),
+        ("sweep_blend[50 x 50]",
+         lambda: eb.sweep_blend(*next(sweep_it), model=model), 2000),
+        ("plan_production[1000 batches]", lambda: eb.plan_production(plan, model=model), 200),
+    ]
+
+
+def endpoint_cases(client, model, rng):
+    """(name, fn, max_runs) for the Flask endpoints through the test client."""
+    names = list(model.catalog.names)
+    manual, juice, auto = [], [], []
+    for _ in range(256):
+        fruits = rng.sample(names, 3)
+        manual.append({
+            "fruit1": fruits[0], "pct1": 50, "fruit2": fruits[1], "pct2": 30, "fruit3": fruits[2], "pct3": 20,
+            "batch_l": rng.choice([1, 3, 10]), "juice_ml_per_L": rng.choice([60, 80, 120]),
+            "temp_C": round(rng.uniform(18, 34), 1),
+        })
+        juice.append({"fruits": fruits, "target_sugar_g_L": rng.choice([6, 7, 8])})
+    # Production builds the auto-suggest table at startup, so time table hits;
+    # auto_suggest_from_excel[computed] covers the frontier search itself
+    for _ in range(16):
+        auto.append({"sweetness": rng.randint(1, 10), "tartness": rng.randint(1, 10),
+                     "style": rng.choice(["", "tropical", "berry", "citrus"]), "temp_C": 26})
+        model.suggest_frontier(auto[-1]["sweetness"], auto[-1]["tartness"], auto[-1]["style"])
+    manual_it, juice_it, auto_it = cycle(manual), cycle(juice), cycle(auto)
+
+    def post(url, it):
+        response = client.post(url, json=next(it))
+        assert response.status_code == 200, (url, response.status_code)
+
+    def get(url):
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+
+    return [
+        ("GET /api/metadata", lambda: get("/api/metadata"), None),
+        ("GET /health", lambda: get("/health"), None),
+        ("POST /api/suggest/auto", lambda: post("/api/suggest/auto", auto_it), None),
+        ("POST /api/suggest/manual", lambda: post("/api/suggest/manual", manual_it), None),
+        ("POST /api/juice/recommend", lambda: post("/api/juice/recommend", juice_it), None),
+    ]
+
+
+def main():
+    args = parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    only = [s for s in (args.only or "").split(",") if s]
+    wanted = lambda name: not only or any(s in name for s in only)  # noqa: E731
+
+    # Both are read when excel_backend is imported
+    os.environ["MODEL_RELOAD_INTERVAL"] = "0"
+    if not args.cache:
+        os.environ["RESULT_CACHE_SIZE"] = "0"
+
+    import logging
+    import excel_backend as eb
+    from app import app
+
+    # The app logs every request at INFO; keep that out of the timings' output
+    app.logger.setLevel(logging.WARNING)
+    logging.getLogger("excel_backend").setLevel(logging.WARNING)
+    client = app.test_client()
+
+    out = sys.stderr if args.json == "-" else sys.stdout
+    results = []
+
+    def report(size, name, timings):
+        row = summarize(size, name, timings)
+        results.append(row)
+        print(f"{size:>7} {name:38s} runs={row['runs']:>6}  mean={row['mean_us']:>12.1f} us  "
+              f"p50={row['p50_us']:>12.1f} us  p95={row['p95_us']:>12.1f} us", file=out, flush=True)
+
+    workdir = tempfile.mkdtemp(prefix="bench-backend-")
+    try:
+        for size in sizes:
+            rng = random.Random(args.seed)
+            path = os.path.join(workdir, f"synthetic_{size}.xlsx")
+            started = time.perf_counter()
+            write_workbook(path, size, seed=args.seed)
+            print(f"\n{size} rows: workbook generated in {time.perf_counter() - started:.2f}s", file=out, flush=True)
+
+            if wanted("load_workbook"):
+                report(size, "load_workbook[openpyxl]", measure(
+                    lambda: eb._build_model(path, use_snapshot=False), args.min_time, MAX_LOAD_RUNS, 1))
+            eb.build_snapshot(path)
+            if wanted("load_workbook"):
+                report(size, "load_workbook[snapshot]", measure(
+                    lambda: eb._build_model(path), args.min_time, MAX_LOAD_RUNS, 1))
+
+            # Make this workbook the one every backend function and endpoint sees
+            store = eb.ModelStore(path, check_interval=0)
+            model = store.warm(suggestions=False)
+            eb._store = store
+
+            for name, fn, max_runs in backend_cases(eb, model, rng):
+                if wanted(name):
+                    report(size, name, measure(fn, args.min_time, max_runs or 100000))
+            for name, fn, max_runs in endpoint_cases(client, model, rng):
+                if wanted(name):
+                    report(size, name, measure(fn, args.min_time, max_runs or 100000))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        payload = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "sizes": sizes,
+                "min_time": args.min_time,
+                "result_cache": args.cache,
+                "seed": args.seed,
+            },
+            "results": results,
+        }
+        if args.json == "-":
+            json.dump(payload, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, "w") as fh:
+                json.dump(payload, fh, indent=2)
+            print(f"\nWrote {len(results)} results to {args.json}", file=out)
+
+
+if __name__ == "__main__":
+    main()
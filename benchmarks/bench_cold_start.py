@@ -0,0 +1,186 @@
+# benchmarks/bench_cold_start.py
+#
+# Cold-start latency of a fresh gunicorn deployment, before and after the
+# preloading gunicorn.conf.py.
+#
+#   legacy:  gunicorn app:app               (each worker loads the model on its first request)
+#   preload: gunicorn -c gunicorn.conf.py   (master loads it once before forking)
+#
+# Each run starts gunicorn in a scratch copy of the app, waits for it to be
+# ready (port accepting for legacy, READY_FILE for preload), then sends the
+# first REQUESTS manual-blend requests from 2 clients per worker and reports
+# latency percentiles plus total worker memory (RSS and PSS). Runs are done
+# with and without the prebuilt snapshot, i.e. with the openpyxl parse.
+#
+#   python benchmarks/bench_cold_start.py [workers]
+
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from excel_backend import EXCEL_FILE, _snapshot_path  # noqa: E402
+
+REQUESTS = 200
+FRUITS = ["Apple", "Mango", "Lemon", "Blueberry", "Orange", "Kiwi", "Pear", "Guava"]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def scratch_copy(mode, with_snapshot):
+    workdir = tempfile.mkdtemp(prefix="cold-start-")
+    shutil.copytree(ROOT, workdir, dirs_exist_ok=True,
+                    ignore=shutil.ignore_patterns(".git", "logs", "__pycache__", "*.snapshot.json"))
+    if mode == "legacy":
+        # gunicorn picks up ./gunicorn.conf.py even without -c
+        os.remove(os.path.join(workdir, "gunicorn.conf.py"))
+    if with_snapshot:
+        subprocess.run([sys.executable, "excel_backend.py", "build-snapshot"], cwd=workdir, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        assert not os.path.exists(_snapshot_path(os.path.join(workdir, EXCEL_FILE)))
+    return workdir
+
+
+def worker_pids(master_pid):
+    pids = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as fh:
+                    if int(fh.read().rsplit(")", 1)[1].split()[1]) == master_pid:
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                pass
+    return pids
+
+
+def memory_mb(pids):
+    rss = pss = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as fh:
+                for line in fh:
+                    key, value = line.split(":", 1)
+                    if key == "Rss":
+                        rss += int(value.split()[0])
+                    elif key == "Pss":
+                        pss += int(value.split()[0])
+        except OSError:
+            pass
+    return rss / 1024, pss / 1024
+
+
+def blend(i):
+    return {
+        "fruit1": FRUITS[i % len(FRUITS)], "pct1": 60,
+        "fruit2": FRUITS[(i + 3) % len(FRUITS)], "pct2": 40,
+        "batch_l": 3, "juice_ml_per_L": 80, "temp_C": 20 + i % 10,
+    }
+
+
+def first_requests(port, concurrency):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    counter = iter(range(REQUESTS))
+
+    def client():
+        session = requests.Session()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            started = time.perf_counter()
+            try:
+                response = session.post(f"http://127.0.0.1:{port}/api/suggest/manual", json=blend(i), timeout=60)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                (latencies if ok else errors).append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sorted(latencies), len(errors)
+
+
+def run(mode, workers, with_snapshot):
+    workdir = scratch_copy(mode, with_snapshot)
+    port = free_port()
+    ready_file = os.path.join(workdir, "gunicorn.ready")
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), READY_FILE=ready_file,
+               MODEL_RELOAD_INTERVAL="0")
+    if mode == "legacy":
+        cmd = ["gunicorn", "app:app", "--bind", f"127.0.0.1:{port}", "--workers", str(workers)]
+    else:
+        cmd = ["gunicorn", "-c", "gunicorn.conf.py", "app:app", "--bind", f"127.0.0.1:{port}"]
+
+    started = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with {proc.returncode}")
+            if mode == "preload":
+                ready = os.path.exists(ready_file)
+            else:
+                try:
+                    socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                    ready = True
+                except OSError:
+                    ready = False
+            if ready:
+                break
+            time.sleep(0.02)
+        ready_s = time.perf_counter() - started
+
+        latencies, errors = first_requests(port, concurrency=workers * 2)
+        rss, pss = memory_mb(worker_pids(proc.pid))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    pct = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000  # noqa: E731
+    source = "snapshot" if with_snapshot else "workbook"
+    print(f"{mode:8s} {source:9s} ready={ready_s:6.2f}s  p50={pct(0.5):8.1f} ms  p99={pct(0.99):8.1f} ms  "
+          f"max={latencies[-1] * 1000:8.1f} ms  errors={errors}  workers RSS={rss:6.1f} MB PSS={pss:6.1f} MB")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="First-request latency and worker memory of a fresh gunicorn deployment")
+    parser.add_argument("workers", type=int, nargs="?", default=4, help="gunicorn workers (default 4)")
+    return parser.parse_args()
+
+
+def main():
+    workers = parse_args().workers
+    print(f"First {REQUESTS} /api/suggest/manual requests after ready, {workers} workers, "
+          f"{workers * 2} concurrent clients\n")
+    for with_snapshot in (True, False):
+        for mode in ("legacy", "preload"):
+            run(mode, workers, with_snapshot)
+
+
+if __name__ == "__main__":
+    main()
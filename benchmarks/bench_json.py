@@ -0,0 +1,123 @@
+# benchmarks/bench_json.py
+#
+# Serialization time and bytes on the wire for API response bodies: Flask's
+# stdlib json provider vs the orjson provider (json_provider.py), and the
+# identity/gzip/br sizes and compression times produced by compression.py.
+#
+# Payloads are real backend results: one manual blend and one auto-suggest
+# (typical responses), a 1000-blend /api/suggest/manual/batch result and the
+# /api/metadata list of a 100k-fruit catalog (large responses).
+#
+#   python benchmarks/bench_json.py [--min-time 0.5] [--json results.json]
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_backend import measure  # noqa: E402
+from synthetic_workbook import fruit_rows  # noqa: E402
+
+BATCH_BLENDS = 1000
+METADATA_FRUITS = 100000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="JSON provider and response compression timings")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to spend per measurement (default 0.5)")
+    parser.add_argument("--json", metavar="PATH", help="write machine-readable results here")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def payloads(eb, rng):
+    """(name, obj) pairs shaped like the endpoints' response bodies."""
+    names = list(eb.get_model().catalog.names)
+    manual = eb.calculate_blend_manual(["Apple", "Mango", "Lemon"], [0.5, 0.3, 0.2], 80, 3, 26)
+    auto = eb.auto_suggest_from_excel(7, 4, "tropical")
+    blends = []
+    for _ in range(BATCH_BLENDS):
+        fruits = rng.sample(names, 3)
+        blends.append({"fruit_names": fruits, "pcts": [0.5, 0.3, 0.2], "juice_ml_per_L": rng.choice([60, 80, 120]),
+                       "batch_l": rng.choice([1, 3, 10]), "temp_C": round(rng.uniform(18, 34), 1)})
+    batch = eb.calculate_blends_batch(blends)
+    metadata = {"fruits": [row[0] for row in fruit_rows(METADATA_FRUITS, rng)]}
+    return [
+        ("manual blend", manual),
+        ("auto suggest", auto),
+        (f"batch x{BATCH_BLENDS}", {"count": len(batch), "results": batch}),
+        (f"metadata x{METADATA_FRUITS}", metadata),
+    ]
+
+
+def main():
+    args = parse_args()
+    os.environ["MODEL_RELOAD_INTERVAL"] = "0"
+
+    import logging
+    from flask.json.provider import DefaultJSONProvider
+
+    import compression
+    import excel_backend as eb
+    import json_provider
+    from app import app
+
+    logging.getLogger("excel_backend").setLevel(logging.WARNING)
+    providers = [("stdlib", DefaultJSONProvider(app))]
+    if json_provider.orjson is not None:
+        providers.append(("orjson", json_provider.OrjsonProvider(app)))
+    else:
+        print("orjson is not installed; timing the stdlib provider only\n")
+
+    results = []
+    with app.app_context():
+        for name, obj in payloads(eb, random.Random(args.seed)):
+            print(f"{name}")
+            body = None
+            for label, provider in providers:
+                timings = measure(lambda: provider.response(obj).get_data(), args.min_time)
+                body = provider.response(obj).get_data()
+                row = {"payload": name, "step": f"serialize[{label}]", "runs": len(timings),
+                       "mean_us": round(statistics.fmean(timings) * 1e6, 1), "bytes": len(body)}
+                results.append(row)
+                print(f"  {row['step']:20s} {row['mean_us']:>12.1f} us  {row['bytes']:>10d} bytes")
+            # Compress the last provider's body, the one the app sends
+            for encoding in compression.available_encodings():
+                timings = measure(lambda: compression.compress(body, encoding), args.min_time)
+                size = len(compression.compress(body, encoding))
+                row = {"payload": name, "step": f"compress[{encoding}]", "runs": len(timings),
+                       "mean_us": round(statistics.fmean(timings) * 1e6, 1), "bytes": size}
+                results.append(row)
+                print(f"  {row['step']:20s} {row['mean_us']:>12.1f} us  {size:>10d} bytes  "
+                      f"({size / len(body):.1%} of {len(body)})")
+            if len(body) < compression.COMPRESS_MIN_BYTES:
+                print(f"  (under COMPRESS_MIN_BYTES={compression.COMPRESS_MIN_BYTES}: sent uncompressed)")
+            print()
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({
+                "meta": {
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "min_time": args.min_time,
+                    "compress_min_bytes": compression.COMPRESS_MIN_BYTES,
+                    "gzip_level": compression.COMPRESS_GZIP_LEVEL,
+                    "brotli_quality": compression.COMPRESS_BROTLI_QUALITY,
+                },
+                "results": results,
+            }, fh, indent=2)
+        print(f"Wrote {len(results)} results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# benchmarks/bench_safety_lookup.py
+#
+# Compares the indexed CO2Safety lookup against the original linear scan and
+# times the index build and the bilinear max_hours interpolation.
+#
+#   python benchmarks/bench_safety_lookup.py [--grids 10x10,40x25,100x100] [--queries 20000] [--seed 42]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_backend import SafetyIndex  # noqa: E402
+
+
+def linear_lookup(rows, sugar_g_L, temp_C):
+    """The pre-index _lookup_safety_row, kept verbatim as the reference."""
+    # get_co2_safety_table() handed out a fresh list; the fallback below sorts it in place
+    rows = list(rows)
+    if not rows:
+        return None
+    candidates = [r for r in rows if sugar_g_L <= r["sugar_g_L"] + 0.1]
+    if not candidates:
+        candidates = rows
+    candidates.sort(key=lambda r: (abs(r["temp_C"] - temp_C), r["sugar_g_L"]))
+    return candidates[0]
+
+
+def make_rows(n_sugar, n_temp, rng):
+    rows = []
+    for t in range(n_temp):
+        temp = 18.0 + t * (16.0 / max(n_temp - 1, 1))
+        for s in range(n_sugar):
+            sugar = 4.0 + s * (8.0 / max(n_sugar - 1, 1))
+            rows.append({
+                "sugar_g_L": round(sugar, 2),
+                "temp_C": round(temp, 1),
+                "max_hours": round(48 - 2.5 * sugar - 0.8 * temp + rng.uniform(-1, 1), 1),
+                "risk": rng.choice(["Low", "Moderate", "High", "Very High"]),
+            })
+    rng.shuffle(rows)
+    return rows
+
+
+def bench(label, rows, queries):
+    started = time.perf_counter()
+    index = SafetyIndex(rows)
+    build_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    expected = [linear_lookup(rows, s, t) for s, t in queries]
+    linear_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    got = [index.lookup(s, t) for s, t in queries]
+    index_s = time.perf_counter() - started
+
+    mismatches = sum(1 for a, b in zip(expected, got) if a is not b)
+
+    started = time.perf_counter()
+    for s, t in queries[:2000]:
+        index.max_hours_at(s, t)
+    interp_scalar_s = (time.perf_counter() - started) / min(len(queries), 2000)
+
+    sugars = [s for s, _ in queries]
+    temps = [t for _, t in queries]
+    started = time.perf_counter()
+    index.max_hours_many(sugars, temps)
+    interp_vector_s = (time.perf_counter() - started) / len(queries)
+
+    n = len(queries)
+    print(
+        f"{label:<22} rows={len(rows):<6} build={build_s * 1e3:7.1f} ms  linear={linear_s / n * 1e6:9.2f} us  "
+        f"index={index_s / n * 1e6:7.2f} us  speedup={linear_s / index_s:7.1f}x  "
+        f"interp={interp_scalar_s * 1e6:6.2f} us (vector {interp_vector_s * 1e6:5.3f} us)  "
+        f"mismatches={mismatches}"
+    )
+    return mismatches
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Indexed vs linear CO2Safety lookup and interpolation timings")
+    parser.add_argument("--grids", default="10x10,40x25,100x100",
+                        help="comma-separated synthetic sheet sizes as SUGARxTEMP levels (default 10x10,40x25,100x100)")
+    parser.add_argument("--queries", type=int, default=20000,
+                        help="random lookups against the workbook sheet; synthetic sheets get a quarter (default 20000)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    try:
+        args.grids = [tuple(int(n) for n in grid.lower().split("x")) for grid in args.grids.split(",") if grid]
+    except ValueError:
+        parser.error("--grids entries must look like 40x25")
+    return args
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    sheet_rows = [
+        {"sugar_g_L": 6.0, "temp_C": 30.0, "max_hours": 12.0, "risk": "Moderate"},
+        {"sugar_g_L": 7.0, "temp_C": 30.0, "max_hours": 10.0, "risk": "High"},
+        {"sugar_g_L": 8.0, "temp_C": 30.0, "max_hours": 8.0, "risk": "Very High"},
+        {"sugar_g_L": 6.0, "temp_C": 26.0, "max_hours": 18.0, "risk": "Moderate"},
+        {"sugar_g_L": 7.0, "temp_C": 26.0, "max_hours": 14.0, "risk": "High"},
+        {"sugar_g_L": 8.0, "temp_C": 26.0, "max_hours": 12.0, "risk": "High"},
+    ]
+    queries = [(round(rng.uniform(0, 16), 2), round(rng.uniform(5, 45), 1)) for _ in range(args.queries)]
+    # Exact sheet values and the +0.1 boundary are where an index goes wrong
+    queries += [(r["sugar_g_L"] + d, r["temp_C"]) for r in sheet_rows for d in (-0.1, 0.0, 0.1, 0.1000001)]
+
+    failures = bench("workbook CO2Safety", sheet_rows, queries)
+    for n_sugar, n_temp in args.grids:
+        failures += bench(f"synthetic {n_sugar}x{n_temp}", make_rows(n_sugar, n_temp, rng), queries[:args.queries // 4])
+
+    index = SafetyIndex(sheet_rows)
+    print("\nInterpolated max_hours on the workbook grid (sheet rows snap to 12/10/8 at 30C, 18/14/12 at 26C):")
+    for sugar, temp in ((6.0, 26.0), (6.5, 28.0), (7.0, 30.0), (7.5, 27.0), (9.0, 35.0)):
+        print(f"  sugar={sugar:4.1f} temp={temp:4.1f}  snapped={index.lookup(sugar, temp)['max_hours']:5.1f}  "
+              f"interpolated={index.max_hours_at(sugar, temp):5.2f}")
+
+    if failures:
+        print(f"\nFAIL: {failures} lookups differ from the linear scan")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# benchmarks/bench_weather_outage.py
+#
+# Shows how long /api/weather holds a worker while wttr.in is hanging, before
+# and after moving the fetch off the request path.
+#
+# A local stub (python weather.py stub) stands in for wttr.in and never answers
+# within the API timeout. "Workers" are threads issuing /api/weather back to
+# back for new locations, so every call is a cache miss, like sync gunicorn
+# workers serving the detect-temperature button. The legacy run calls
+# requests.get inline, as the route used to; the current run goes through the
+# app. The stub is then restarted healthy to check the breaker closes again.
+#
+#   python benchmarks/bench_weather_outage.py [workers] [seconds]
+
+import argparse
+import itertools
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+API_TIMEOUT = 5.0
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stub(port, delay):
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "weather.py"), "stub", str(port), "24", str(delay)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("weather stub did not start")
+
+
+PORT = free_port()
+STUB_URL = f"http://127.0.0.1:{PORT}"
+
+# The weather client reads its settings at import
+os.environ["WEATHER_API_URL"] = STUB_URL
+os.environ["WEATHER_API_TIMEOUT"] = str(API_TIMEOUT)
+os.environ.setdefault("WEATHER_BREAKER_RESET", "5")
+
+import requests  # noqa: E402
+
+from app import app  # noqa: E402
+from weather import get_weather_client  # noqa: E402
+
+_coords = itertools.count()
+
+
+def next_location():
+    i = next(_coords)
+    return {"lat": 10 + (i % 500) * 0.1, "lon": 70 + (i // 500) * 0.1}
+
+
+def legacy_call(client):
+    loc = next_location()
+    try:
+        requests.get(f"{STUB_URL}/{loc['lat']},{loc['lon']}?format=j1", timeout=API_TIMEOUT)
+    except requests.RequestException:
+        pass
+
+
+def current_call(client):
+    client.post("/api/weather", json=next_location())
+
+
+def run(label, call, workers, seconds):
+    latencies = []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def worker():
+        client = app.test_client()
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            call(client)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:8s} requests={len(latencies):6d}  p50={statistics.median(latencies) * 1000:8.1f} ms  "
+          f"p99={p99 * 1000:8.1f} ms  max={latencies[-1] * 1000:8.1f} ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Worker time spent on /api/weather while wttr.in hangs")
+    parser.add_argument("workers", type=int, nargs="?", default=4, help="concurrent request threads (default 4)")
+    parser.add_argument("seconds", type=float, nargs="?", default=12.0, help="duration of each run (default 12)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    workers, seconds = args.workers, args.seconds
+    client = get_weather_client()
+    print(f"Upstream hanging; API timeout {API_TIMEOUT}s, request deadline {client.deadline}s, "
+          f"{workers} workers for {seconds}s each\n")
+
+    stub = start_stub(PORT, delay=60)
+    try:
+        run("legacy", legacy_call, workers, seconds)
+        run("current", current_call, workers, seconds)
+        print(f"\nweather client: {client.stats()}")
+    finally:
+        stub.kill()
+        stub.wait()
+
+    # Upstream recovers: the breaker lets a probe through after its reset timeout
+    stub = start_stub(PORT, delay=0)
+    try:
+        test_client = app.test_client()
+        started = time.perf_counter()
+        while time.perf_counter() - started < client.breaker.reset_timeout + API_TIMEOUT + 5:
+            if test_client.post("/api/weather", json=next_location()).get_json().get("success"):
+                print(f"recovered after {time.perf_counter() - started:.1f}s, circuit {client.breaker.state}")
+                break
+            time.sleep(0.25)
+        else:
+            print("FAIL: circuit did not close after the upstream recovered")
+            sys.exit(1)
+    finally:
+        stub.kill()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
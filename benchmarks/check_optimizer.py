@@ -0,0 +1,105 @@
+# benchmarks/check_optimizer.py
+#
+# Checks that the cost-capped optimize_blend returns a blend within both the
+# sugar and cost caps whenever the full catalog has one on the optimizer's
+# split grid. Feasibility is brute-forced over every fruit combination, not
+# just the pruned pool. Catalogs are synthetic: random, sugar/cost
+# anti-correlated, and ones where every fruit the pruning picks is
+# expensive. Exits 1 on any miss.
+#
+#   python benchmarks/check_optimizer.py [--catalogs 40] [--fruits 24] [--seed 0]
+
+import argparse
+import os
+import random
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blend_optimizer import _combo_index, _pct_grid, _prune, optimize_blend  # noqa: E402
+
+TARGETS_PER_CATALOG = 10
+N_FRUITS = 4
+# Combinations per brute-force chunk, to bound memory
+CHUNK = 2000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Cost-capped optimizer feasibility check")
+    parser.add_argument("--catalogs", type=int, default=40, help="synthetic catalogs per kind (default 40)")
+    parser.add_argument("--fruits", type=int, default=24, help="fruits per catalog (default 24)")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def any_feasible(sugar, cost_per_l, juice_ml_per_L, max_sugar_g_L, max_cost_per_L):
+    """True if some grid blend over the whole catalog is within both caps."""
+    k = min(N_FRUITS, len(sugar))
+    grid = _pct_grid(k)
+    combos = _combo_index(len(sugar), k)
+    sugar_cap = max_sugar_g_L * 100.0 / juice_ml_per_L + 1e-9
+    cost_cap = max_cost_per_L * 1000.0 / juice_ml_per_L
+    for start in range(0, len(combos), CHUNK):
+        chunk = combos[start:start + CHUNK]
+        ok = (sugar[chunk] @ grid.T <= sugar_cap) & (cost_per_l[chunk] @ grid.T <= cost_cap)
+        if ok.any():
+            return True
+    return False
+
+
+def catalog(kind, rng, n):
+    sweet = rng.uniform(1, 10, n)
+    tart = rng.uniform(1, 10, n)
+    style = (rng.random(n) < 0.3).astype(float)
+    if kind == "anticorrelated":
+        sugar = rng.uniform(2, 16, n)
+        cost_per_l = np.clip(20.0 - sugar + rng.normal(0, 1.5, n), 0.1, None)
+    else:
+        sugar = rng.uniform(2, 16, n)
+        cost_per_l = rng.uniform(0.5, 30, n)
+    return sweet, tart, sugar, cost_per_l, style
+
+
+def check_kind(kind, args, rng):
+    cases = feasible = misses = 0
+    for _ in range(args.catalogs):
+        sweet, tart, sugar, cost_per_l, style = catalog(kind, rng, args.fruits)
+        for _ in range(TARGETS_PER_CATALOG):
+            ts, tt = rng.integers(1, 11, 2)
+            juice = float(rng.choice([40, 60, 80, 120]))
+            max_sugar = float(rng.uniform(4, 12))
+            if kind == "expensive_pool":
+                # Every fruit pruning would pick costs far over the cap
+                cost_per_l = np.full(len(sugar), 0.8)
+                cost_per_l[list(_prune(sweet, tart, sugar, style, ts, tt))] = 500.0
+            max_cost = float(rng.uniform(0.2, 2.0))
+            cases += 1
+            if not any_feasible(sugar, cost_per_l, juice, max_sugar, max_cost):
+                continue
+            feasible += 1
+            best = optimize_blend(sweet, tart, sugar, cost_per_l, style, ts, tt, juice,
+                                  max_sugar_g_L=max_sugar, max_cost_per_L=max_cost, n_fruits=N_FRUITS)
+            if not best["feasible"]:
+                misses += 1
+                if misses <= 10:
+                    print(f"  {kind}: target=({ts},{tt}) juice={juice} max_sugar={max_sugar:.2f} "
+                          f"max_cost={max_cost:.2f} -> sugar {best['sugar_g_L']:.2f}, cost {best['cost_per_L']:.2f}")
+    print(f"  {kind:<16} cases={cases:<6} feasible={feasible:<6} misses={misses}")
+    return misses
+
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(random.Random(args.seed).getrandbits(32))
+    failures = 0
+    for kind in ("random", "anticorrelated", "expensive_pool"):
+        failures += check_kind(kind, args, rng)
+    if failures:
+        print(f"\nFAIL: {failures} feasible cases returned an over-cap blend")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
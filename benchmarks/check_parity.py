@@ -0,0 +1,154 @@
+# benchmarks/check_parity.py
+#
+# Checks that the vectorized paths report exactly what the scalar
+# calculate_blend_manual (and so /api/suggest/manual) reports for the same
+# inputs: every sweep_blend cell over grids with half-way doses, and whole
+# calculate_blends_batch results for random blends. Runs against the
+# bundled workbook and a synthetic one where every fruit has a Costing
+# price. Exits 1 on any mismatch.
+#
+#   python benchmarks/check_parity.py [--sweeps 10] [--blends 20000] [--seed 0]
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_workbook import write_workbook  # noqa: E402
+
+SYNTHETIC_ROWS = 500
+
+# Half-ml dose steps put plenty of values exactly half-way at 2 decimals
+SWEEP_DOSES = [d / 2 for d in range(2, 401)]
+SWEEP_TEMPS = [15 + t / 2 for t in range(41)]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Vectorized vs scalar blend result parity")
+    parser.add_argument("--sweeps", type=int, default=10,
+                        help="random blends swept over the full grid, per workbook (default 10)")
+    parser.add_argument("--blends", type=int, default=20000,
+                        help="random blends compared with calculate_blends_batch, per workbook (default 20000)")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def sweep_cell_fields(manual):
+    """The sweep grid fields for one calculate_blend_manual result."""
+    fields = {
+        "sugar_g_per_L": manual["sugar_g_per_L"],
+        "co2_vols": manual["co2_vols"],
+        "abv_percent": manual["abv_percent"],
+        "cost_estimate": manual["cost_estimate"],
+        "over_sugar_limit": not manual["safety_flag"].startswith("OK"),
+        "ferment_min_hours": manual["ferment_time"]["min_hours"],
+        "ferment_optimal_hours": manual["ferment_time"]["optimal_hours"],
+        "ferment_max_hours": manual["ferment_time"]["max_hours"],
+    }
+    if "safety_detail" in manual:
+        fields["risk"] = manual["safety_detail"]["risk"]
+        fields["safety_max_hours"] = manual["safety_detail"]["max_hours"]
+    return fields
+
+
+def check_sweeps(eb, model, blends, interpolate):
+    mismatches = cells = 0
+    for fruits, pcts, batch_l in blends:
+        sweep = eb.sweep_blend(fruits, pcts, batch_l, SWEEP_TEMPS, SWEEP_DOSES, model=model,
+                               interpolate_safety=interpolate)
+        grid = sweep["grid"]
+        for i, temp in enumerate(SWEEP_TEMPS):
+            for j, dose in enumerate(SWEEP_DOSES):
+                manual = eb.calculate_blend_manual(fruits, pcts, dose, batch_l, temp, model=model,
+                                                   interpolate_safety=interpolate)
+                cells += 1
+                for field, expected in sweep_cell_fields(manual).items():
+                    if grid[field][i][j] != expected:
+                        mismatches += 1
+                        if mismatches <= 10:
+                            print(f"  sweep {fruits} {pcts} batch={batch_l} temp={temp} dose={dose}: "
+                                  f"{field} {grid[field][i][j]!r} != {expected!r}")
+    return cells, mismatches
+
+
+def random_blend(rng, names):
+    k = rng.randint(1, 4)
+    # Repeated fruits and coarse pcts/doses make ties at 2 decimals common
+    fruits = [rng.choice(names) for _ in range(k)]
+    pcts = [rng.choice([0.05, 0.1, 0.2, 0.25, 0.35, 0.5]) for _ in range(k)]
+    return {"fruit_names": fruits + [""] * (4 - k), "pcts": pcts + [0.0] * (4 - k),
+            "juice_ml_per_L": rng.choice([20, 37, 60, 80, 92.5, 120]),
+            "batch_l": rng.choice([0.5, 1, 3, 10, 37]), "temp_C": rng.choice([18, 22.5, 26, 30, 33])}
+
+
+def check_batch(eb, model, blends, interpolate):
+    results = eb.calculate_blends_batch(blends, model=model, interpolate_safety=interpolate)
+    mismatches = 0
+    for blend, result in zip(blends, results):
+        manual = eb.calculate_blend_manual(blend["fruit_names"], blend["pcts"], blend["juice_ml_per_L"],
+                                           blend["batch_l"], blend["temp_C"], model=model,
+                                           interpolate_safety=interpolate)
+        if result != manual:
+            mismatches += 1
+            if mismatches <= 10:
+                fields = sorted(k for k in manual if result.get(k) != manual[k])
+                print(f"  batch {blend}: {', '.join(f'{k} {result.get(k)!r} != {manual[k]!r}' for k in fields)}")
+    return len(blends), mismatches
+
+
+def check_model(eb, model, args):
+    names = list(model.catalog.names)
+    rng = random.Random(args.seed)
+
+    # The Grape blend is a known half-way case (37 ml/L -> 0.925 g/L)
+    sweeps = [(["Apple", "Grape"], [0.1, 0.5], 3)]
+    for _ in range(args.sweeps - 1):
+        k = rng.randint(1, 4)
+        sweeps.append((rng.sample(names, k), [rng.choice([0.05, 0.1, 0.2, 0.25, 0.35, 0.5]) for _ in range(k)],
+                       rng.choice([0.5, 1, 3, 10, 37])))
+    # A blend whose cost lands on a 2-decimal tie (1.775)
+    blends = [{"fruit_names": ["Apple", "Apple", "Apple", "Mango"], "pcts": [0.35, 0.35, 0.1, 0.2],
+               "juice_ml_per_L": 37, "batch_l": 0.5, "temp_C": 26}]
+    blends += [random_blend(rng, names) for _ in range(args.blends - 1)]
+
+    failures = 0
+    for interpolate in (False, True):
+        suffix = "[interpolated]" if interpolate else ""
+        for label, check, inputs in (("sweep_blend", check_sweeps, sweeps),
+                                     ("calculate_blends_batch", check_batch, blends)):
+            count, mismatches = check(eb, model, inputs, interpolate)
+            unit = "cells" if check is check_sweeps else "blends"
+            print(f"  {label + suffix:<38} {unit}={count:<8} mismatches={mismatches}")
+            failures += mismatches
+    return failures
+
+
+def main():
+    args = parse_args()
+    os.environ["MODEL_RELOAD_INTERVAL"] = "0"
+
+    import logging
+
+    import excel_backend as eb
+
+    logging.getLogger("excel_backend").setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_workbook(os.path.join(tmp, "synthetic.xlsx"), SYNTHETIC_ROWS, seed=args.seed)
+        models = [("bundled", eb.get_model()),
+                  (f"synthetic {SYNTHETIC_ROWS}", eb._build_model(path, use_snapshot=False))]
+
+    failures = 0
+    for label, model in models:
+        print(f"{label} workbook")
+        failures += check_model(eb, model, args)
+    if failures:
+        print(f"\nFAIL: {failures} results differ from calculate_blend_manual")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
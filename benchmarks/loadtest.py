@@ -0,0 +1,397 @@
+# benchmarks/loadtest.py
+#
+# Load generator for sizing the gunicorn fleet. Replays a recorded request
+# mix from JSONL, or synthesizes one, at a fixed concurrency against the
+# app, and reports throughput and p50/p95/p99 latency per route.
+#
+# By default it starts the app itself (gunicorn -c gunicorn.conf.py with the
+# given worker count/class) with the weather upstream pointed at a local
+# stub, so no request leaves the machine. --url targets an app that is
+# already running instead.
+#
+#   python benchmarks/loadtest.py --workers 4 --concurrency 16 --duration 30
+#   python benchmarks/loadtest.py --workers 4 --worker-class gthread --threads 4 --replay traffic.jsonl
+#   python benchmarks/loadtest.py --synthesize 5000 --save traffic.jsonl   # write a mix and exit
+#   python benchmarks/loadtest.py --url http://127.0.0.1:8000 --json results.json
+#
+# Replay files have one request per line:
+#   {"method": "POST", "path": "/api/suggest/manual", "body": {...}}
+# "method" defaults to POST when there is a body, GET otherwise; an optional
+# "route" overrides the label the request is reported under.
+#
+# Clients are threads in this process, closed loop: each sends its next
+# request as soon as the previous one returns. The weather stub shares this
+# process. Check the reported client CPU: near 100% of a core means the
+# generator, not the app, is the bottleneck; run it from another machine
+# with --url.
+
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from weather import make_stub_server  # noqa: E402
+
+# Relative weights of the synthesized mix
+DEFAULT_MIX = "auto=3,manual=4,juice=2,weather=1,metadata=1"
+STYLES = ["", "tropical", "berry", "citrus", "neutral"]
+# Weather requests cluster around a few places, so some share a grid cell
+WEATHER_CENTRES = [(1.35, 103.82), (51.51, -0.13), (40.71, -74.01), (-33.87, 151.21), (35.68, 139.69)]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay or synthesize API traffic and report latency per route")
+    source = parser.add_argument_group("traffic")
+    source.add_argument("--replay", metavar="JSONL", help="recorded requests to replay (default: synthesize)")
+    source.add_argument("--synthesize", type=int, default=2000, metavar="N",
+                        help="size of the synthesized mix (default 2000)")
+    source.add_argument("--mix", default=DEFAULT_MIX, help=f"synthesized route weights (default {DEFAULT_MIX})")
+    source.add_argument("--save", metavar="JSONL", help="write the synthesized mix here and exit")
+    source.add_argument("--seed", type=int, default=0)
+
+    run = parser.add_argument_group("run")
+    run.add_argument("--concurrency", type=int, default=8, help="concurrent clients (default 8)")
+    run.add_argument("--duration", type=float, default=0,
+                     help="seconds to loop over the traffic; 0 sends it once (default)")
+    run.add_argument("--warmup", type=float, default=2.0, help="seconds of traffic excluded from stats (default 2)")
+    run.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    run.add_argument("--json", metavar="PATH", help="write machine-readable results here ('-' for stdout)")
+
+    app = parser.add_argument_group("app")
+    app.add_argument("--url", help="target an already running app instead of starting one")
+    app.add_argument("--workers", type=int, default=2, help="gunicorn workers (default 2)")
+    app.add_argument("--worker-class", default="sync", help="gunicorn worker class (default sync)")
+    app.add_argument("--threads", type=int, default=1, help="threads per gthread worker (default 1)")
+    app.add_argument("--weather-temp", type=float, default=24.0, help="temperature the weather stub reports")
+    app.add_argument("--weather-delay", type=float, default=0.05,
+                     help="seconds the weather stub takes to answer (default 0.05)")
+    return parser.parse_args()
+
+
+def parse_mix(spec):
+    weights = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    unknown = set(weights) - set(SYNTHESIZERS)
+    if unknown:
+        raise SystemExit(f"unknown routes in --mix: {', '.join(sorted(unknown))} (known: {', '.join(SYNTHESIZERS)})")
+    return weights
+
+
+def _auto(rng, fruits):
+    return {"method": "POST", "path": "/api/suggest/auto", "body": {
+        "sweetness": rng.randint(1, 10), "tartness": rng.randint(1, 10), "style": rng.choice(STYLES),
+        "batch_l": rng.choice([1, 3, 5, 10]), "juice_ml_per_L": rng.choice([60, 80, 100]),
+        "temp_C": round(rng.uniform(18, 34), 1),
+    }}
+
+
+def _manual(rng, fruits):
+    k = rng.randint(1, 4)
+    picks = rng.sample(fruits, min(k, len(fruits)))
+    cuts = sorted(rng.sample(range(5, 100, 5), len(picks) - 1))
+    body = {"batch_l": rng.choice([1, 3, 5, 10]), "juice_ml_per_L": rng.choice([60, 80, 100]),
+            "temp_C": round(rng.uniform(18, 34), 1)}
+    for i, (name, lo, hi) in enumerate(zip(picks, [0] + cuts, cuts + [100]), start=1):
+        body[f"fruit{i}"] = name
+        body[f"pct{i}"] = hi - lo
+    return {"method": "POST", "path": "/api/suggest/manual", "body": body}
+
+
+def _juice(rng, fruits):
+    return {"method": "POST", "path": "/api/juice/recommend", "body": {
+        "fruits": rng.sample(fruits, min(rng.randint(1, 4), len(fruits))),
+        "target_sugar_g_L": rng.choice([6, 7, 8]),
+    }}
+
+
+def _weather(rng, fruits):
+    lat, lon = rng.choice(WEATHER_CENTRES)
+    return {"method": "POST", "path": "/api/weather", "body": {
+        "lat": round(lat + rng.uniform(-0.5, 0.5), 4), "lon": round(lon + rng.uniform(-0.5, 0.5), 4),
+    }}
+
+
+def _metadata(rng, fruits):
+    return {"method": "GET", "path": "/api/metadata"}
+
+
+SYNTHESIZERS = {"auto": _auto, "manual": _manual, "juice": _juice, "weather": _weather, "metadata": _metadata}
+
+
+def synthesize(n, weights, fruits, seed):
+    rng = random.Random(seed)
+    names = list(weights)
+    return [SYNTHESIZERS[name](rng, fruits) for name in rng.choices(names, [weights[k] for k in names], k=n)]
+
+
+def load_replay(path):
+    entries = []
+    with open(path) as fh:
+        for lineno, line in enumerate(fh, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError as e:
+                raise SystemExit(f"{path}:{lineno}: invalid JSON: {e}")
+            if "path" not in entry:
+                raise SystemExit(f"{path}:{lineno}: missing \"path\"")
+            entries.append(entry)
+    if not entries:
+        raise SystemExit(f"{path}: no requests")
+    return entries
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LocalApp:
+    """gunicorn running this checkout with the weather upstream on a local stub."""
+
+    def __init__(self, args):
+        self.args = args
+        self.workdir = tempfile.mkdtemp(prefix="loadtest-")
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.stub = None
+        self.proc = None
+        self.log = None
+
+    def __enter__(self):
+        self.stub = make_stub_server(0, self.args.weather_temp, self.args.weather_delay)
+        threading.Thread(target=self.stub.serve_forever, name="weather-stub", daemon=True).start()
+
+        ready_file = os.path.join(self.workdir, "ready")
+        env = dict(
+            os.environ,
+            WEATHER_API_URL=f"http://127.0.0.1:{self.stub.server_port}",
+            READY_FILE=ready_file,
+            PROMETHEUS_MULTIPROC_DIR=os.path.join(self.workdir, "metrics"),
+        )
+        cmd = [
+            "gunicorn", "-c", "gunicorn.conf.py", "app:app",
+            "--bind", f"127.0.0.1:{self.port}",
+            "--workers", str(self.args.workers),
+            "--worker-class", self.args.worker_class,
+            "--threads", str(self.args.threads),
+        ]
+        self.log_path = os.path.join(self.workdir, "gunicorn.log")
+        self.log = open(self.log_path, "w")
+        self.proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=self.log, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + 300
+        while not os.path.exists(ready_file):
+            if self.proc.poll() is not None or time.monotonic() > deadline:
+                self.__exit__(None, None, None)
+                raise SystemExit(f"gunicorn did not become ready, see {self.log_path}")
+            time.sleep(0.05)
+        # The ready file is written before workers finish booting
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                if requests.get(f"{self.url}/api/metadata", timeout=5).status_code == 200:
+                    break
+            except requests.RequestException:
+                time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        if self.stub is not None:
+            self.stub.shutdown()
+            self.stub.server_close()
+        if self.log is not None:
+            self.log.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def process_cpu_seconds():
+    times = os.times()
+    return times.user + times.system
+
+
+def run_load(url, entries, concurrency, duration, warmup, timeout):
+    """
+    Send entries from `concurrency` client threads; return (samples, wall seconds).
+
+    samples are (route, seconds, ok) for requests that started after warmup.
+    With duration 0 every entry is sent once and warmup is not applied.
+    """
+    lock = threading.Lock()
+    samples = []
+    position = iter(range(len(entries) if not duration else sys.maxsize))
+    started = time.perf_counter()
+    measure_from = started + (warmup if duration else 0)
+    stop_at = started + warmup + duration if duration else None
+
+    def client():
+        session = requests.Session()
+        local = []
+        while True:
+            with lock:
+                i = next(position, None)
+            if i is None or (stop_at is not None and time.perf_counter() >= stop_at):
+                break
+            entry = entries[i % len(entries)]
+            body = entry.get("body")
+            method = entry.get("method") or ("POST" if body is not None else "GET")
+            sent = time.perf_counter()
+            try:
+                response = session.request(method, url + entry["path"], json=body, timeout=timeout)
+                ok = response.status_code < 400
+            except requests.RequestException:
+                ok = False
+            done = time.perf_counter()
+            if sent >= measure_from:
+                local.append((entry.get("route") or entry["path"], done - sent, ok))
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=client, name=f"client-{n}") for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples, time.perf_counter() - measure_from
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def summarize(samples, wall):
+    by_route = {}
+    for route, seconds, ok in samples:
+        by_route.setdefault(route, []).append((seconds, ok))
+    by_route["ALL"] = [(seconds, ok) for _, seconds, ok in samples]
+
+    rows = []
+    for route, items in by_route.items():
+        ordered = sorted(seconds for seconds, _ in items)
+        if not ordered:
+            continue
+        ms = lambda s: round(s * 1000, 2)  # noqa: E731
+        rows.append({
+            "route": route,
+            "requests": len(items),
+            "errors": sum(1 for _, ok in items if not ok),
+            "rps": round(len(items) / wall, 1) if wall > 0 else 0.0,
+            "mean_ms": ms(sum(ordered) / len(ordered)),
+            "p50_ms": ms(percentile(ordered, 0.50)),
+            "p95_ms": ms(percentile(ordered, 0.95)),
+            "p99_ms": ms(percentile(ordered, 0.99)),
+            "max_ms": ms(ordered[-1]),
+        })
+    rows.sort(key=lambda r: (r["route"] == "ALL", r["route"]))
+    return rows
+
+
+def print_table(rows, out):
+    print(f"{'route':28s} {'requests':>9s} {'errors':>7s} {'req/s':>8s} {'mean':>9s} {'p50':>9s} "
+          f"{'p95':>9s} {'p99':>9s} {'max':>9s}   (ms)", file=out)
+    for r in rows:
+        print(f"{r['route']:28s} {r['requests']:>9d} {r['errors']:>7d} {r['rps']:>8.1f} {r['mean_ms']:>9.2f} "
+              f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['max_ms']:>9.2f}", file=out)
+
+
+def fetch_fruits(url):
+    response = requests.get(f"{url}/api/metadata", timeout=30)
+    response.raise_for_status()
+    return response.json()["fruits"]
+
+
+def main():
+    args = parse_args()
+    out = sys.stderr if args.json == "-" else sys.stdout
+    weights = parse_mix(args.mix)
+
+    if args.save:
+        # Synthesize from the workbook directly; no app needed
+        from excel_backend import get_fruit_master
+        entries = synthesize(args.synthesize, weights, [f["name"] for f in get_fruit_master()], args.seed)
+        with open(args.save, "w") as fh:
+            for entry in entries:
+                fh.write(json.dumps(entry) + "\n")
+        print(f"Wrote {len(entries)} requests to {args.save}", file=out)
+        return
+
+    def run(url):
+        if args.replay:
+            entries = load_replay(args.replay)
+        else:
+            entries = synthesize(args.synthesize, weights, fetch_fruits(url), args.seed)
+        mode = f"{args.duration:g}s after {args.warmup:g}s warmup" if args.duration else "one pass"
+        print(f"{len(entries)} requests ({args.replay or 'synthesized: ' + args.mix}), "
+              f"{args.concurrency} clients, {mode}", file=out, flush=True)
+        cpu_before = process_cpu_seconds()
+        samples, wall = run_load(url, entries, args.concurrency, args.duration, args.warmup, args.timeout)
+        return samples, wall, process_cpu_seconds() - cpu_before
+
+    if args.url:
+        target = args.url.rstrip("/")
+        print(f"Target: {target}", file=out)
+        samples, wall, client_cpu = run(target)
+    else:
+        print(f"Starting gunicorn: {args.workers} x {args.worker_class} workers"
+              f"{f', {args.threads} threads' if args.threads > 1 else ''}; weather stub "
+              f"{args.weather_delay * 1000:g} ms", file=out, flush=True)
+        with LocalApp(args) as app:
+            samples, wall, client_cpu = run(app.url)
+
+    rows = summarize(samples, wall)
+    print(file=out)
+    print_table(rows, out)
+    print(f"\nWall {wall:.2f}s, load generator CPU {client_cpu:.2f}s "
+          f"({client_cpu / wall * 100 if wall else 0:.0f}% of one core; {os.cpu_count()} CPUs)", file=out)
+
+    if args.json:
+        payload = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "target": args.url or "local gunicorn",
+                "workers": None if args.url else args.workers,
+                "worker_class": None if args.url else args.worker_class,
+                "threads": None if args.url else args.threads,
+                "concurrency": args.concurrency,
+                "duration": args.duration,
+                "warmup": args.warmup,
+                "traffic": args.replay or {"synthesized": args.synthesize, "mix": args.mix, "seed": args.seed},
+                "weather_stub_delay": None if args.url else args.weather_delay,
+                "wall_seconds": round(wall, 3),
+                "client_cpu_seconds": round(client_cpu, 3),
+            },
+            "routes": rows,
+        }
+        if args.json == "-":
+            json.dump(payload, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, "w") as fh:
+                json.dump(payload, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
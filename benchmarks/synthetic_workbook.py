@@ -0,0 +1,101 @@
+# benchmarks/synthetic_workbook.py
+#
+# Writes workbooks with the FruitMaster, Costing and CO2Safety layouts the
+# backend reads, at any size, for benchmarks and load tests.
+#
+#   python benchmarks/synthetic_workbook.py <path.xlsx> [rows] [--seed N]
+
+import argparse
+import os
+import random
+
+from openpyxl import Workbook
+
+# Real names first so the usual request payloads resolve at every size
+BASE_FRUITS = [
+    ("Apple", 10.0, 7, 3, ""),
+    ("Orange", 8.5, 6, 5, "Citrus, bright"),
+    ("Pineapple", 10.0, 7, 6, "Tropical, sharp"),
+    ("Mango", 14.0, 9, 2, "Tropical, aromatic"),
+    ("Lemon", 2.5, 2, 10, "Citrus, acid"),
+    ("Lime", 1.7, 2, 10, "Citrus, acid"),
+    ("Blueberry", 10.0, 6, 5, "Berry"),
+    ("Strawberry", 6.0, 6, 5, "Berry, red"),
+    ("Raspberry", 5.0, 5, 7, "Berry, red"),
+    ("Grape", 16.0, 8, 3, "Grape, red"),
+    ("Watermelon", 6.0, 6, 1, "Neutral, refreshing"),
+    ("Pear", 10.0, 7, 2, "Neutral, balanced"),
+    ("Kiwi", 9.0, 5, 7, "Tropical, bright"),
+    ("Guava", 9.0, 7, 4, "Tropical, aromatic"),
+]
+STYLE_NOTES = ["", "Tropical", "Berry, red", "Citrus, bright", "Neutral, balanced", "Aromatic", "Acid"]
+
+
+def fruit_rows(n, rng):
+    rows = list(BASE_FRUITS[:n])
+    for i in range(len(rows), n):
+        rows.append((
+            f"Fruit {i:06d}",
+            round(rng.uniform(1.0, 18.0), 1),
+            rng.randint(1, 10),
+            rng.randint(1, 10),
+            rng.choice(STYLE_NOTES),
+        ))
+    return rows
+
+
+def safety_rows(n):
+    """An n-row sugar x temperature grid (roughly square) like the real sheet."""
+    n_temp = max(1, int(n ** 0.5))
+    n_sugar = max(1, n // n_temp)
+    rows = []
+    for t in range(n_temp):
+        temp = round(18.0 + t * (16.0 / max(n_temp - 1, 1)), 3)
+        for s in range(n_sugar):
+            sugar = round(4.0 + s * (8.0 / max(n_sugar - 1, 1)), 3)
+            hours = round(max(1.0, 48 - 2.5 * sugar - 0.8 * temp), 1)
+            risk = "Low" if hours >= 24 else "Moderate" if hours >= 12 else "High"
+            rows.append((sugar, temp, hours, risk))
+    return rows
+
+
+def write_workbook(path, rows, seed=0):
+    """
+    Write a workbook with `rows` FruitMaster fruits, as many Costing entries
+    and a CO2Safety grid of about `rows` rows. Returns path.
+    """
+    rng = random.Random(seed)
+    wb = Workbook(write_only=True)
+
+    ws = wb.create_sheet("FruitMaster")
+    ws.append(["Fruit", "Sugar_g_per_100ml", "Sweetness_Score_1to10", "Tartness_Score_1to10", "Notes"])
+    fruits = fruit_rows(rows, rng)
+    for row in fruits:
+        ws.append(list(row))
+
+    ws = wb.create_sheet("Costing")
+    ws.append(["Ingredient", "Cost_per_L_or_kg", "Usage_Unit", "Cost_for_Batch"])
+    for name, *_ in fruits:
+        ws.append([f"{name} Juice", round(rng.uniform(50, 400)), "per L", None])
+
+    ws = wb.create_sheet("CO2Safety")
+    ws.append(["Sugar_g_per_L", "Temp_C", "Max_Time_Hours", "Risk"])
+    for row in safety_rows(rows):
+        ws.append(list(row))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    wb.save(path)
+    return path
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Write a synthetic FruitMaster/Costing/CO2Safety workbook")
+    parser.add_argument("path", help="output .xlsx path")
+    parser.add_argument("rows", type=int, nargs="?", default=1000, help="fruits and approximate CO2Safety rows (default 1000)")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(write_workbook(args.path, args.rows, seed=args.seed))
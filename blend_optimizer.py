@@ -0,0 +1,371 @@
+# blend_optimizer.py
+
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import combinations
+import numpy as np
+
+# Percentage splits are searched on a 5% grid with every fruit at least 10%
+PCT_STEP = 0.05
+MIN_PCT = 0.10
+
+# How many fruits survive pruning before combinations are enumerated
+POOL_BY_SCORE = 8
+POOL_BY_SUGAR = 4
+# Fruits added when a cost cap leaves the pruned pool with no feasible blend
+POOL_BY_COST = 12
+
+# Objective weights (cost is per litre of juice, so the objective doesn't
+# depend on the juice dose and can be precomputed)
+SWEET_WEIGHT = 1.0
+TART_WEIGHT = 1.0
+STYLE_WEIGHT = 1.0
+COST_WEIGHT = 0.001
+# Large enough that any feasible blend beats any infeasible one
+CONSTRAINT_PENALTY = 1e6
+# Slack on the average-sugar cap so blends landing exactly on it count as within
+SUGAR_TOLERANCE = 1e-9
+
+
+@lru_cache(maxsize=8)
+def _pct_grid(k):
+    """All k-fruit splits on the PCT_STEP grid, each fruit >= MIN_PCT, as a (m, k) array."""
+    units = round(1 / PCT_STEP)
+    min_units = round(MIN_PCT / PCT_STEP)
+    free = units - k * min_units
+    rows = []
+    # Stars and bars over the units left after each fruit gets its minimum
+    for bars in combinations(range(free + k - 1), k - 1):
+        parts = np.diff((-1,) + bars + (free + k - 1,)) - 1
+        rows.append(parts + min_units)
+    return np.array(rows, dtype=float) / units
+
+
+@lru_cache(maxsize=8)
+def _combo_index(pool_size, k):
+    """All k-of-pool_size index combinations as a (c, k) int array."""
+    return np.array(list(combinations(range(pool_size), k)), dtype=np.intp)
+
+
+def _single_scores(sweet, tart, style_match, target_sweet, target_tart):
+    """Objective of each fruit on its own (lower is better), without the cost term."""
+    return (
+        SWEET_WEIGHT * (sweet - target_sweet) ** 2
+        + TART_WEIGHT * (tart - target_tart) ** 2
+        - STYLE_WEIGHT * style_match
+    )
+
+
+def _prune(sweet, tart, sugar, style_match, target_sweet, target_tart):
+    """Pick the candidate pool: best single-fruit matches plus the lowest-sugar fruits."""
+    n = len(sweet)
+    single = _single_scores(sweet, tart, style_match, target_sweet, target_tart)
+    pool = []
+    for i in np.argsort(single, kind="stable")[:POOL_BY_SCORE]:
+        pool.append(int(i))
+    for i in np.argsort(sugar, kind="stable"):
+        if len(pool) >= min(n, POOL_BY_SCORE + POOL_BY_SUGAR):
+            break
+        if int(i) not in pool:
+            pool.append(int(i))
+    return tuple(pool)
+
+
+def _dominance_layers(sugar, cost, depth):
+    """
+    Fruits in the first depth Pareto layers on (sugar, cost), layer by layer.
+
+    A fruit outside them is matched or beaten on both sugar and cost by at
+    least one fruit in each layer, so any blend can swap it for one of depth
+    distinct fruits here without raising its sugar or cost.
+    """
+    # Ascending sugar, then cost, then index: everything before a fruit has
+    # sugar <= its own, so it is dominated iff an earlier cost is <= its own
+    remaining = np.lexsort((np.arange(len(sugar)), cost, sugar))
+    picked = []
+    for _ in range(depth):
+        if len(remaining) == 0:
+            break
+        c = cost[remaining]
+        earlier_min = np.minimum.accumulate(np.concatenate(([np.inf], c[:-1])))
+        front = c < earlier_min
+        picked.extend(int(i) for i in remaining[front])
+        remaining = remaining[~front]
+    return picked
+
+
+def _cost_candidates(single, sugar, cost_per_l, fits, n_fruits):
+    """
+    Fruits to add to the pool so a blend within both caps is found if one exists.
+
+    With at least n_fruits fruits inside both caps on their own, any split of
+    them is within both, so the best-matching ones are enough. Otherwise the
+    blend has to balance over-cap fruits, and the dominance layers on
+    (sugar, cost) cover it: exactly, unless they exceed POOL_BY_COST fruits.
+    """
+    k = min(n_fruits, len(sugar))
+    fitting = np.flatnonzero(fits)
+    if len(fitting) >= k:
+        return [int(i) for i in fitting[np.argsort(single[fitting], kind="stable")[:k]]]
+    return _dominance_layers(sugar, cost_per_l, k)[:POOL_BY_COST]
+
+
+def _best_capped(sweet, tart, sugar, cost_per_l, style_match, target_sweet, target_tart, pool,
+                 juice_ml_per_L, max_sugar_g_L, max_cost_per_L, n_fruits):
+    """Best blend from pool under the sugar and cost caps (see optimize_blend)."""
+    # A single argmin doesn't need the cells in sugar order
+    cells = _PoolCells(sweet, tart, sugar, cost_per_l, pool, n_fruits, sort=False)
+    score = cells.objective(style_match, target_sweet, target_tart)
+    # Constraint violations: sugar in g/100ml of juice, cost per litre of
+    # drink. A full-size temporary costs about as much as the arithmetic on
+    # it, so both are computed in place.
+    sugar_cap = max_sugar_g_L * 100.0 / juice_ml_per_L + SUGAR_TOLERANCE
+    violation = cells.avg_sugar - sugar_cap
+    np.maximum(violation, 0.0, out=violation)
+    over_cost = cells.cost * juice_ml_per_L
+    over_cost /= 1000.0
+    over_cost -= max_cost_per_L
+    np.maximum(over_cost, 0.0, out=over_cost)
+    violation += over_cost
+    violation *= CONSTRAINT_PENALTY
+    score += violation
+    pos = int(np.argmin(score))
+
+    best = cells.describe(pos)
+    return {
+        "indices": list(best["indices"]),
+        "pcts": list(best["pcts"]),
+        "sweet": best["sweet"],
+        "tart": best["tart"],
+        "sugar_g_L": best["avg_sugar"] * juice_ml_per_L / 100.0,
+        "cost_per_L": best["juice_cost_per_l"] * juice_ml_per_L / 1000.0,
+        "feasible": bool(violation[pos] == 0),
+    }
+
+
+class _PoolCells:
+    """
+    Every (combination, split) cell for one candidate pool, flattened.
+
+    With sort (what frontier building needs), cell arrays are stored in
+    ascending average-sugar order and order maps back to cell ids. Without
+    it (a single argmin), they stay in cell id order and order is None.
+    """
+
+    def __init__(self, sweet, tart, sugar, cost_per_l, pool, n_fruits, sort=True):
+        pool = np.array(pool, dtype=np.intp)
+        k = min(n_fruits, len(pool))
+        self.combos = pool[_combo_index(len(pool), k)]       # (c, k) fruit indices
+        self.grid = _pct_grid(k)                             # (m, k) splits, rows sum to 1
+        self.shape = (len(self.combos), len(self.grid))
+
+        avg_sugar = (sugar[self.combos] @ self.grid.T).ravel()
+        # Quicksort is ~5x faster than a stable sort here; equal-sugar cells
+        # still come out in a deterministic order for the same catalog
+        self.order = np.argsort(avg_sugar) if sort else None
+        self.avg_sugar = self._arrange(avg_sugar)                                    # g/100ml of juice
+        self.sweet = self._arrange((sweet[self.combos] @ self.grid.T).ravel())
+        self.tart = self._arrange((tart[self.combos] @ self.grid.T).ravel())
+        self.cost = self._arrange((cost_per_l[self.combos] @ self.grid.T).ravel())  # per L of juice
+        # Target-independent part of the objective, with the squares expanded
+        self._base = (
+            SWEET_WEIGHT * self.sweet ** 2
+            + TART_WEIGHT * self.tart ** 2
+            + COST_WEIGHT * self.cost
+        )
+        self._style = {}
+
+    def _arrange(self, values):
+        # Per-cell values (cell id order) into this instance's storage order
+        return values if self.order is None else values[self.order]
+
+    def style_share(self, style_match):
+        key = style_match.tobytes()
+        if key not in self._style:
+            self._style[key] = self._arrange((style_match[self.combos] @ self.grid.T).ravel())
+        return self._style[key]
+
+    def objective(self, style_match, target_sweet, target_tart):
+        """Objective per cell (sorted order), up to a target-only constant."""
+        obj = self.sweet * (-2.0 * SWEET_WEIGHT * target_sweet)
+        obj += self.tart * (-2.0 * TART_WEIGHT * target_tart)
+        obj += self._base
+        if style_match.any():
+            obj -= STYLE_WEIGHT * self.style_share(style_match)
+        return obj
+
+    def describe(self, pos):
+        cell = pos if self.order is None else int(self.order[pos])
+        ci, mi = divmod(cell, self.shape[1])
+        # Largest share first; plain Python is faster than numpy for 4 items
+        picks = sorted(zip(self.grid[mi].tolist(), self.combos[ci].tolist()), key=lambda p: -p[0])
+        return {
+            "indices": tuple(i for _, i in picks),
+            "pcts": tuple(round(p, 2) for p, _ in picks),
+            "sweet": float(self.sweet[pos]),
+            "tart": float(self.tart[pos]),
+            "avg_sugar": float(self.avg_sugar[pos]),
+            "juice_cost_per_l": float(self.cost[pos]),
+        }
+
+
+class BlendFrontier:
+    """
+    Best blend for every sugar budget, for one sweet/tart/style target.
+
+    Entries are the cells where the best objective among blends with average
+    fruit sugar <= threshold improves, in ascending threshold order. The
+    optimum under any sugar cap is the last entry whose threshold fits.
+    """
+
+    def __init__(self, thresholds, entries):
+        self.thresholds = thresholds
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def pick(self, juice_ml_per_L, max_sugar_g_L):
+        """Best blend whose sugar at this juice dose stays <= max_sugar_g_L."""
+        cap = max_sugar_g_L * 100.0 / juice_ml_per_L
+        pos = bisect_right(self.thresholds, cap + SUGAR_TOLERANCE) - 1
+        feasible = pos >= 0
+        if not feasible:
+            # Nothing fits: fall back to the best of the lowest-sugar blends
+            pos = bisect_right(self.thresholds, self.thresholds[0] + SUGAR_TOLERANCE) - 1
+        entry = self.entries[pos]
+        return {
+            "indices": list(entry["indices"]),
+            "pcts": list(entry["pcts"]),
+            "sweet": entry["sweet"],
+            "tart": entry["tart"],
+            "sugar_g_L": entry["avg_sugar"] * juice_ml_per_L / 100.0,
+            "cost_per_L": entry["juice_cost_per_l"] * juice_ml_per_L / 1000.0,
+            "feasible": feasible,
+        }
+
+
+def _frontier_from_cells(cells, objective):
+    # objective is already in ascending-sugar order
+    running_min = np.minimum.accumulate(objective)
+    # Positions where the prefix minimum strictly improves
+    improves = np.empty(len(objective), dtype=bool)
+    improves[0] = True
+    np.less(objective[1:], running_min[:-1], out=improves[1:])
+    positions = np.flatnonzero(improves)
+    return BlendFrontier(
+        thresholds=cells.avg_sugar[positions].tolist(),
+        entries=[cells.describe(p) for p in positions.tolist()],
+    )
+
+
+def blend_frontier(sweet, tart, sugar, cost_per_l, style_match, target_sweet, target_tart, n_fruits=4):
+    """
+    Build the BlendFrontier for one target; None for an empty catalog.
+
+    Arguments are the same per-fruit arrays as optimize_blend.
+    """
+    if len(sweet) == 0:
+        return None
+    pool = _prune(sweet, tart, sugar, style_match, target_sweet, target_tart)
+    cells = _PoolCells(sweet, tart, sugar, cost_per_l, pool, n_fruits)
+    return _frontier_from_cells(cells, cells.objective(style_match, target_sweet, target_tart))
+
+
+def build_suggest_table(sweet, tart, sugar, cost_per_l, style_matches, table=None,
+                        sweet_range=range(1, 11), tart_range=range(1, 11), n_fruits=4):
+    """
+    Precompute BlendFrontiers for every integer sweet/tart target and style.
+
+    Args:
+        style_matches: dict of style name -> per-fruit style match array
+            (include "" with all zeros for "no style")
+        table: dict to fill in place; keys already present are skipped, so
+            readers can use it while it is being built
+
+    Returns:
+        dict keyed by (sweet, tart, style)
+    """
+    table = {} if table is None else table
+    # Group targets by candidate pool so each pool's cells are built once and
+    # dropped before the next; keeping them all alive peaks at gigabytes
+    by_pool = {}
+    for style, style_match in style_matches.items():
+        for ts in sweet_range:
+            for tt in tart_range:
+                key = (ts, tt, style)
+                if key in table:
+                    continue
+                if len(sweet) == 0:
+                    table[key] = None
+                    continue
+                pool = _prune(sweet, tart, sugar, style_match, ts, tt)
+                by_pool.setdefault(pool, []).append((key, style_match))
+
+    for pool, targets in by_pool.items():
+        cells = _PoolCells(sweet, tart, sugar, cost_per_l, pool, n_fruits)
+        for key, style_match in targets:
+            if key not in table:
+                table[key] = _frontier_from_cells(cells, cells.objective(style_match, key[0], key[1]))
+    return table
+
+
+def optimize_blend(
+    sweet,
+    tart,
+    sugar,
+    cost_per_l,
+    style_match,
+    target_sweet,
+    target_tart,
+    juice_ml_per_L,
+    max_sugar_g_L=8.0,
+    max_cost_per_L=None,
+    n_fruits=4,
+):
+    """
+    Search fruit combinations and percentage splits for the best blend.
+
+    Blend sweetness/tartness are the pct-weighted averages of the fruit
+    scores. The objective is the weighted squared sweet/tart error, minus a
+    bonus for the share of style-matching fruit, plus a small cost term.
+    Blends whose sugar exceeds max_sugar_g_L or whose juice cost per litre of
+    drink exceeds max_cost_per_L are excluded when any blend satisfies them;
+    otherwise the least-bad blend is returned. With a cost cap, a pool with no
+    blend inside both caps is widened with fruits chosen on sugar and cost
+    (see _cost_candidates) before giving up.
+
+    Args:
+        sweet, tart, sugar, cost_per_l, style_match: per-fruit numpy arrays
+            (scores 1-10, sugar g/100ml, juice cost per L, 1.0 if style matches)
+        target_sweet, target_tart: requested profile (1-10)
+        juice_ml_per_L: total juice per litre of drink
+        max_sugar_g_L: sugar ceiling for the finished drink
+        max_cost_per_L: optional juice cost ceiling per litre of drink
+        n_fruits: fruits per blend (fewer if the catalog is smaller)
+
+    Returns:
+        dict with fruit indices, pcts (descending), and the blend's sweet,
+        tart, sugar_g_L, cost_per_L and feasible flag; None for an empty catalog
+    """
+    if len(sweet) == 0:
+        return None
+    if max_cost_per_L is None:
+        frontier = blend_frontier(sweet, tart, sugar, cost_per_l, style_match, target_sweet, target_tart, n_fruits)
+        return frontier.pick(juice_ml_per_L, max_sugar_g_L)
+
+    args = (sweet, tart, sugar, cost_per_l, style_match, target_sweet, target_tart)
+    caps = (juice_ml_per_L, max_sugar_g_L, max_cost_per_L, n_fruits)
+    pool = _prune(sweet, tart, sugar, style_match, target_sweet, target_tart)
+    best = _best_capped(*args, pool, *caps)
+    if best["feasible"]:
+        return best
+
+    # The pool is picked without looking at cost, so a cheaper blend may sit
+    # outside it: widen it with fruits that can meet both caps and retry
+    fits = (sugar <= max_sugar_g_L * 100.0 / juice_ml_per_L) & (cost_per_l * juice_ml_per_L / 1000.0 <= max_cost_per_L)
+    single = _single_scores(sweet, tart, style_match, target_sweet, target_tart)
+    extra = [i for i in _cost_candidates(single, sugar, cost_per_l, fits, n_fruits) if i not in pool]
+    if not extra:
+        return best
+    return _best_capped(*args, pool + tuple(extra), *caps)
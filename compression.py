@@ -0,0 +1,93 @@
+# compression.py
+
+import gzip
+import os
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without it responses are gzip-compressed only
+    brotli = None
+
+# Bodies smaller than this go out uncompressed: the saving doesn't cover the
+# CPU, and a small JSON response already fits in one packet
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 1024))
+# Per-response levels: cheap enough for dynamic bodies, most of the ratio
+# (static assets are precompressed at maximum levels by static_assets)
+COMPRESS_GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", 6))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", 4))
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+    "text/html",
+    "text/plain",
+}
+
+
+def available_encodings():
+    """Content-codings this process can produce, in server preference order."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compress(data, encoding):
+    """Compress data with encoding ("br" or "gzip") at the configured level."""
+    if encoding == "br":
+        return brotli.compress(data, quality=COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+def negotiate(size):
+    """The encoding to send a size-byte compressible body in for this request, or None."""
+    if size < COMPRESS_MIN_BYTES:
+        return None
+    return request.accept_encodings.best_match(available_encodings())
+
+
+def compress_response(response):
+    """
+    Compress a buffered response body with the client's preferred encoding.
+
+    Only successful, not already encoded, compressible responses of at
+    least COMPRESS_MIN_BYTES are touched; streamed bodies are left alone.
+    A strong ETag becomes weak, since the bytes now depend on the encoding.
+    """
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or request.method == "HEAD"
+    ):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+
+    # The body is large enough that another client could get it compressed
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate(len(data))
+    if encoding is None:
+        return response
+    compressed = compress(data, encoding)
+    if len(compressed) >= len(data):
+        return response
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    """Compress eligible responses of app."""
+    # after_request hooks run in reverse registration order: installed after
+    # the metrics and profiling hooks, compression runs first and its time is
+    # included in the request duration they record
+    app.after_request(compress_response)
@@ -1,27 +1,120 @@
 # excel_backend.py
 
-from openpyxl import load_workbook
-from functools import lru_cache
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from blend_optimizer import blend_frontier, build_suggest_table, optimize_blend
+from fermentation import FermentationModel, profile_from_points
+from result_cache import ResultCache
+import hashlib
+import io
+import json
+import logging
+import math
+import metrics
 import os
+import sys
+import threading
+import time
 
 EXCEL_FILE = "WWY_ProbioticDrink_Model_v1_DASHBOARD.xlsx"
 
+# Bump when the snapshot layout changes so old files are treated as stale
+SNAPSHOT_FORMAT = 1
 
-@lru_cache(maxsize=1)
-def _load_wb():
-    if not os.path.exists(EXCEL_FILE):
-        raise FileNotFoundError(f"Excel file not found: {EXCEL_FILE}")
-    return load_workbook(EXCEL_FILE, data_only=True)
+# Seconds between cheap mtime/size checks for an updated workbook (0 disables)
+MODEL_RELOAD_INTERVAL = float(os.environ.get("MODEL_RELOAD_INTERVAL", 5))
 
+# Manual-blend / juice-recommendation result caches (size 0 disables)
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", 1024))
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", 300))
 
-def get_fruit_master():
-    """Return list of fruits with sugar, sweetness, tartness from FruitMaster sheet."""
-    wb = _load_wb()
-    ws = wb["FruitMaster"]
+logger = logging.getLogger(__name__)
+
+
+def _load_wb(data):
+    # Imported lazily: workers that start from a snapshot never need openpyxl.
+    # Read-only mode streams rows from the zip on demand, so sheets we never
+    # open (charts, dashboard, SOP) are never parsed into cell objects.
+    from openpyxl import load_workbook
+    return load_workbook(io.BytesIO(data), read_only=True, data_only=True, keep_links=False)
+
+
+def _iter_sheet_rows(wb, sheet, width):
+    """Yield data rows (after the header) padded/truncated to width cells."""
+    ws = wb[sheet]
+    for row in ws.iter_rows(min_row=2, values_only=True):
+        # Read-only sheets without a stored dimension can yield ragged rows
+        if len(row) != width:
+            row = (tuple(row) + (None,) * width)[:width]
+        yield row
+
+
+def _rss_mb():
+    """Current resident set size of this process in MB (best effort)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        # Peak rather than current, and KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _normalize_name(name):
+    return (name or "").strip().lower()
+
+
+class FruitCatalog:
+    """
+    Compiled, read-only view of the FruitMaster sheet.
+
+    Built once per workbook load. Lookups go through a normalized-name
+    index and the numeric columns are precomputed, so request paths never
+    walk the sheet or rebuild row dicts.
+    """
+
+    def __init__(self, fruits):
+        self.fruits = tuple(fruits)
+        self.names = tuple(f["name"] for f in self.fruits)
+        self.sugar = tuple(f["sugar"] for f in self.fruits)
+        self.sweet = tuple(f["sweet"] for f in self.fruits)
+        self.tart = tuple(f["tart"] for f in self.fruits)
+        self.notes_lower = tuple(str(f["notes"] or "").lower() for f in self.fruits)
+
+        # Array copies of the numeric columns for vectorized scoring
+        self.sugar_arr = np.array(self.sugar, dtype=float)
+        self.sweet_arr = np.array(self.sweet, dtype=float)
+        self.tart_arr = np.array(self.tart, dtype=float)
+        # 1.0 where a fruit's notes mention one of the style's tags
+        self.style_match = {
+            style: np.array([float(any(tag in notes for tag in tags)) for notes in self.notes_lower])
+            for style, tags in _style_aliases().items()
+        }
+
+        self._index = {}
+        for i, name in enumerate(self.names):
+            # First row wins, same as the old linear scan
+            self._index.setdefault(_normalize_name(name), i)
+
+    def __len__(self):
+        return len(self.fruits)
+
+    def find(self, name):
+        """Return the row index for a fruit name, or None if unknown."""
+        return self._index.get(_normalize_name(name))
+
+    def sugar_of(self, name, default=0.0):
+        """Return sugar (g/100ml) for a fruit name, or default if unknown."""
+        i = self._index.get(_normalize_name(name))
+        return self.sugar[i] if i is not None else default
+
+
+def _read_fruit_master(wb):
     fruits = []
 
     # Assuming headers in row 1: Fruit | Sugar_g_per_100ml | Sweetness_Score_1to10 | Tartness_Score_1to10 | Notes
-    for row in ws.iter_rows(min_row=2, values_only=True):
+    for row in _iter_sheet_rows(wb, "FruitMaster", 5):
         name, sugar, sweet, tart, notes = row
         if not name:
             continue
@@ -35,15 +128,12 @@ def get_fruit_master():
     return fruits
 
 
-def get_cost_table():
-    """Read Costing sheet into a dict keyed by ingredient (lowercase)."""
-    wb = _load_wb()
+def _read_cost_table(wb):
     if "Costing" not in wb.sheetnames:
         return {}
-    ws = wb["Costing"]
     costs = {}
     # Assuming: Ingredient | Cost_per_L_or_kg | Usage_Unit | Cost_for_Batch
-    for row in ws.iter_rows(min_row=2, values_only=True):
+    for row in _iter_sheet_rows(wb, "Costing", 4):
         ingredient, cost_per_unit, unit, _ = row
         if not ingredient:
             continue
@@ -56,15 +146,57 @@ def get_cost_table():
     return costs
 
 
-def get_co2_safety_table():
-    """Read CO2Safety sheet into a list of rows."""
-    wb = _load_wb()
+def _normalize_cost_unit(unit):
+    """Map a Costing unit label to "L", "kg", or None if it isn't a purchase unit."""
+    unit = str(unit or "")
+    if "per L" in unit:
+        return "L"
+    if "per kg" in unit:
+        return "kg"
+    return None
+
+
+class CostResolver:
+    """
+    Compiled fruit name -> juice cost per litre, built from the Costing table.
+
+    A fruit matches the ingredient with its own name or "<name> Juice"
+    (the plain name wins if both exist). Units are normalized once; "per kg"
+    prices are used as-is, assuming juice density ~1 kg/L, and any other
+    unit costs nothing. missing lists catalog fruits with no usable price.
+    """
+
+    def __init__(self, costs, fruit_names=()):
+        entries = {}
+        # Aliases first so a direct ingredient key overrides "<name> juice"
+        for key, info in costs.items():
+            if key.endswith(" juice"):
+                entries[key[:-len(" juice")].strip()] = info
+        entries.update(costs)
+
+        self._by_name = {}
+        for name, info in entries.items():
+            unit = _normalize_cost_unit(info["unit"])
+            if unit is not None:
+                self._by_name[name] = (unit, float(info["cost_per_unit"]))
+
+        self.missing = tuple(name for name in fruit_names if _normalize_name(name) not in self._by_name)
+
+    def resolve(self, name):
+        """Return (normalized unit, cost per litre); (None, 0.0) if not costed."""
+        return self._by_name.get(_normalize_name(name), (None, 0.0))
+
+    def cost_per_litre(self, name):
+        """Return juice cost per litre for a fruit name, or 0.0."""
+        return self.resolve(name)[1]
+
+
+def _read_co2_safety_table(wb):
     if "CO2Safety" not in wb.sheetnames:
         return []
-    ws = wb["CO2Safety"]
     rows = []
     # Sugar_g_per_L | Temp_C | Max_Time_Hours | Risk
-    for row in ws.iter_rows(min_row=2, values_only=True):
+    for row in _iter_sheet_rows(wb, "CO2Safety", 4):
         sugar, temp, hours, risk = row
         if sugar is None or temp is None:
             continue
@@ -77,6 +209,544 @@ def get_co2_safety_table():
     return rows
 
 
+class SafetyIndex:
+    """
+    Prebuilt (sugar, temperature) index over the CO2Safety rows.
+
+    lookup() answers the same question as the original linear scan (rows
+    whose sugar covers the blend, then nearest temperature, then lowest
+    sugar, then sheet order) with two bisects. max_hours_at() interpolates
+    Max_Time_Hours bilinearly between rows instead of snapping to one.
+    """
+
+    def __init__(self, rows):
+        self.rows = tuple(rows)
+
+        # Candidate sets are suffixes of the sorted sugar levels: a row is a
+        # candidate when blend sugar <= row sugar + 0.1
+        by_sugar = {}
+        for pos, r in enumerate(self.rows):
+            by_sugar.setdefault(r["sugar_g_L"], []).append(pos)
+        levels = sorted(by_sugar)
+        self._thresholds = [level + 0.1 for level in levels]
+
+        # One pass from the highest level down, carrying the best (lowest
+        # sugar, then first in sheet order) row per temperature forward: a
+        # level's rows beat every carried row at the same temperature, and
+        # the first of them in sheet order wins among themselves
+        best = {}
+        temps = []
+        by_level = []
+        for level in reversed(levels):
+            for pos in reversed(by_sugar[level]):
+                temp = self.rows[pos]["temp_C"]
+                if temp not in best:
+                    insort(temps, temp)
+                best[temp] = (level, pos)
+            by_level.append((list(temps), [best[t] for t in temps]))
+        self._by_level = by_level[::-1]
+        # The same per level as (temps, row sugar, row position) arrays for the vectorized lookups
+        self._level_arrays = [
+            (np.array(temps, dtype=float), np.array([k[0] for k in keys], dtype=float),
+             np.array([k[1] for k in keys], dtype=np.intp))
+            for temps, keys in self._by_level
+        ]
+
+        # Per-temperature sugar -> hours curves for interpolation
+        curves = {}
+        for r in self.rows:
+            curves.setdefault(r["temp_C"], {}).setdefault(r["sugar_g_L"], r["max_hours"])
+        self._interp_temps = np.array(sorted(curves))
+        self._interp_curves = [
+            (np.array(sorted(curves[t])), np.array([curves[t][s] for s in sorted(curves[t])]))
+            for t in self._interp_temps.tolist()
+        ]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def lookup(self, sugar_g_L, temp_C):
+        """Return the closest safety row, or None for an empty sheet."""
+        if not self.rows:
+            return None
+        i = bisect_left(self._thresholds, sugar_g_L)
+        if i == len(self._thresholds):
+            # No row covers this much sugar: fall back to every row
+            i = 0
+        temps, keys = self._by_level[i]
+        j = bisect_left(temps, temp_C)
+        best = None
+        for k in (j - 1, j):
+            if 0 <= k < len(temps):
+                candidate = (abs(temps[k] - temp_C),) + keys[k]
+                if best is None or candidate < best:
+                    best = candidate
+        return self.rows[best[2]]
+
+    def _levels(self, sugar_g_L):
+        # Candidate level per sugar value, as in lookup()
+        levels = np.searchsorted(self._thresholds, np.asarray(sugar_g_L, dtype=float), side="left")
+        # No row covers this much sugar: fall back to every row
+        levels[levels == len(self._thresholds)] = 0
+        return levels
+
+    def _nearest(self, level, temp_C):
+        """Row positions lookup() picks at one candidate level for an array of temperatures."""
+        temps, sugars, positions = self._level_arrays[level]
+        j = np.searchsorted(temps, temp_C)
+        left = np.clip(j - 1, 0, len(temps) - 1)
+        right = np.clip(j, 0, len(temps) - 1)
+        # Same tie-break as lookup(): distance, then row sugar, then sheet order
+        d_left = np.abs(temps[left] - temp_C)
+        d_right = np.abs(temps[right] - temp_C)
+        take_left = (d_left < d_right) | (
+            (d_left == d_right)
+            & ((sugars[left] < sugars[right]) | ((sugars[left] == sugars[right]) & (positions[left] <= positions[right])))
+        )
+        return np.where(take_left, positions[left], positions[right])
+
+    def lookup_many(self, sugar_g_L, temp_C):
+        """
+        lookup() for arrays of (sugar, temp) pairs.
+
+        Returns an array of row positions in self.rows, or None for an empty
+        sheet. Pairs are grouped by candidate level, so memory is O(n).
+        """
+        if not self.rows:
+            return None
+        temp_C = np.asarray(temp_C, dtype=float)
+        levels = self._levels(sugar_g_L)
+        out = np.empty(levels.shape, dtype=np.intp)
+        for level in np.unique(levels).tolist():
+            mask = levels == level
+            out[mask] = self._nearest(level, temp_C[mask])
+        return out
+
+    def lookup_grid(self, sugar_g_L, temp_C):
+        """
+        lookup() for every (temperature, sugar) pair of two axes.
+
+        Returns a (len(temp_C), len(sugar_g_L)) array of row positions in
+        self.rows, or None for an empty sheet. The answer depends on the
+        sugar only through its candidate level, so temperatures are resolved
+        once per distinct level.
+        """
+        if not self.rows:
+            return None
+        temp_C = np.asarray(temp_C, dtype=float)
+        levels = self._levels(sugar_g_L)
+        out = np.empty((temp_C.size, levels.size), dtype=np.intp)
+        for level in np.unique(levels).tolist():
+            out[:, levels == level] = self._nearest(level, temp_C)[:, None]
+        return out
+
+    def max_hours_many(self, sugar_g_L, temp_C):
+        """
+        Bilinearly interpolated max hours for arrays of (sugar, temp).
+
+        Interpolates along sugar within each sheet temperature, then between
+        the two bracketing temperatures. Values are clamped to the table's
+        edges rather than extrapolated. Returns None for an empty sheet.
+        """
+        if not self.rows:
+            return None
+        sugar_g_L = np.asarray(sugar_g_L, dtype=float)
+        temp_C = np.asarray(temp_C, dtype=float)
+        per_temp = np.array([np.interp(sugar_g_L, s, h) for s, h in self._interp_curves])
+        if len(self._interp_temps) == 1:
+            return per_temp[0]
+        k = np.clip(np.searchsorted(self._interp_temps, temp_C), 1, len(self._interp_temps) - 1)
+        t0 = self._interp_temps[k - 1]
+        t1 = self._interp_temps[k]
+        w = np.clip((temp_C - t0) / (t1 - t0), 0.0, 1.0)
+        cols = np.arange(sugar_g_L.size)
+        return per_temp[k - 1, cols] * (1.0 - w) + per_temp[k, cols] * w
+
+    def max_hours_at(self, sugar_g_L, temp_C):
+        """Scalar max_hours_many()."""
+        hours = self.max_hours_many([sugar_g_L], [temp_C])
+        return None if hours is None else float(hours[0])
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+class WorkbookModel:
+    """
+    Parsed FruitMaster/Costing/CO2Safety tables from one workbook version.
+
+    The tables are never mutated after construction, so a request that holds
+    a reference keeps a consistent view even if a reload swaps in a newer one.
+    The only thing filled in later is suggest_table, a cache of auto-suggest
+    frontiers derived purely from those tables, and signature, which follows
+    the file's mtime when it changes without new content.
+    """
+
+    def __init__(self, fruits, costs, co2_safety, version, signature, load_seconds=None, source="workbook"):
+        self.fruits = tuple(fruits)
+        self.catalog = FruitCatalog(self.fruits)
+        self.costs = costs
+        self.cost_resolver = CostResolver(costs, self.catalog.names)
+        if self.cost_resolver.missing:
+            logger.warning(
+                "Model %s: no Costing price for %d fruits (costed at 0): %s",
+                version, len(self.cost_resolver.missing), ", ".join(self.cost_resolver.missing),
+            )
+        # Juice cost per litre for each catalog row (0.0 when not costed)
+        self.fruit_cost_per_l = np.array([self.cost_resolver.cost_per_litre(name) for name in self.catalog.names])
+        self.co2_safety = tuple(co2_safety)
+        self.safety_index = SafetyIndex(self.co2_safety)
+        self.fermentation = FermentationModel.calibrate(self.co2_safety)
+        self.version = version
+        self.signature = signature
+        self.load_seconds = load_seconds
+        self.source = source
+        self.loaded_at = datetime.now(timezone.utc)
+        self.rss_before_mb = None
+        self.rss_after_mb = None
+        # (sweet, tart, style) -> BlendFrontier; see precompute_suggestions()
+        self.suggest_table = {}
+
+    def _style_masks(self):
+        # "" is the no-style/unknown-style entry
+        masks = {"": np.zeros(len(self.catalog))}
+        masks.update(self.catalog.style_match)
+        return masks
+
+    def precompute_suggestions(self):
+        """
+        Fill suggest_table for every integer sweet/tart in 1-10 and every style.
+
+        Several seconds of CPU, so it runs off the request path: in the
+        preloading master before workers fork, and on the reload thread
+        before a new model is swapped in.
+        """
+        started = time.perf_counter()
+        build_suggest_table(
+            self.catalog.sweet_arr,
+            self.catalog.tart_arr,
+            self.catalog.sugar_arr,
+            self.fruit_cost_per_l,
+            self._style_masks(),
+            table=self.suggest_table,
+        )
+        elapsed = time.perf_counter() - started
+        metrics.observe_suggest_table(elapsed)
+        logger.info(
+            "Auto-suggest table for model %s: %d entries in %.2fs",
+            self.version, len(self.suggest_table), elapsed,
+        )
+
+    def suggest_frontier(self, target_sweet, target_tart, style):
+        """
+        Return the cached BlendFrontier for a target, computing it on a miss.
+
+        Misses are the fallback for a model whose table wasn't built (a
+        worker that loaded without preload) and for off-grid targets.
+        """
+        key = (target_sweet, target_tart, style if style in self.catalog.style_match else "")
+        frontier = self.suggest_table.get(key)
+        if frontier is None:
+            frontier = blend_frontier(
+                self.catalog.sweet_arr,
+                self.catalog.tart_arr,
+                self.catalog.sugar_arr,
+                self.fruit_cost_per_l,
+                self._style_masks()[key[2]],
+                target_sweet,
+                target_tart,
+            )
+            # Only cache the grid the table covers, so arbitrary floats can't grow it
+            if key[0] in range(1, 11) and key[1] in range(1, 11):
+                self.suggest_table[key] = frontier
+        return frontier
+
+
+def _snapshot_path(path):
+    return os.path.splitext(path)[0] + ".snapshot.json"
+
+
+def _read_snapshot(path, version):
+    """Return the snapshot tables for path if they match version, else None."""
+    try:
+        with open(_snapshot_path(path), "r", encoding="utf-8") as fh:
+            snap = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if snap.get("format") != SNAPSHOT_FORMAT or snap.get("version") != version:
+        return None
+    return snap
+
+
+def _write_snapshot(path, model):
+    """Write model's tables next to the workbook; atomic via rename."""
+    snap = {
+        "format": SNAPSHOT_FORMAT,
+        "version": model.version,
+        "fruits": list(model.fruits),
+        "costs": model.costs,
+        "co2_safety": list(model.co2_safety),
+    }
+    target = _snapshot_path(path)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(snap, fh, ensure_ascii=False, separators=(",", ":"), default=str)
+    os.replace(tmp, target)
+    return target
+
+
+def _content_version(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _build_model(path, use_snapshot=True):
+    """
+    Load the workbook at path into a WorkbookModel.
+
+    A snapshot whose content hash matches the workbook is used when present;
+    otherwise the workbook is parsed with openpyxl and the snapshot refreshed.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Excel file not found: {path}")
+    started = time.perf_counter()
+    rss_before = _rss_mb()
+    signature = _file_signature(path)
+    with open(path, "rb") as fh:
+        data = fh.read()
+    # Hash the exact bytes we parse so the version always matches the tables
+    version = _content_version(data)
+
+    snap = _read_snapshot(path, version) if use_snapshot else None
+    if snap is not None:
+        model = WorkbookModel(
+            fruits=snap["fruits"],
+            costs=snap["costs"],
+            co2_safety=snap["co2_safety"],
+            version=version,
+            signature=signature,
+            source="snapshot",
+        )
+        # Measured after construction: building the catalog, cost resolver,
+        # safety index and fermentation fit is part of the load
+        model.load_seconds = time.perf_counter() - started
+    else:
+        wb = _load_wb(data)
+        try:
+            model = WorkbookModel(
+                fruits=_read_fruit_master(wb),
+                costs=_read_cost_table(wb),
+                co2_safety=_read_co2_safety_table(wb),
+                version=version,
+                signature=signature,
+            )
+        finally:
+            # Drop the zip handle and lazily parsed sheets right away
+            wb.close()
+            del wb
+        model.load_seconds = time.perf_counter() - started
+        if use_snapshot:
+            try:
+                _write_snapshot(path, model)
+            except OSError as e:
+                # Read-only deploys still work, they just parse on every start
+                logger.warning("Could not write model snapshot: %s", e)
+
+    model.rss_before_mb = rss_before
+    model.rss_after_mb = _rss_mb()
+    metrics.observe_model_load(model.source, model.load_seconds, len(model.catalog))
+    logger.info(
+        "Loaded workbook model %s from %s (%s) in %.3fs, worker RSS %.1f MB -> %.1f MB",
+        version, path, model.source, model.load_seconds, model.rss_before_mb, model.rss_after_mb,
+    )
+    return model
+
+
+def build_snapshot(path=EXCEL_FILE):
+    """Parse the workbook with openpyxl and write its snapshot file."""
+    model = _build_model(path, use_snapshot=False)
+    return _write_snapshot(path, model), model
+
+
+class ModelStore:
+    """
+    Holds the active WorkbookModel and hot-reloads it when the file changes.
+
+    The first load is synchronous. After that, get() stats the file at most
+    once per check interval; on a change the new model is built on a
+    background thread and swapped in with a single reference assignment, so
+    callers always see either the old model or the complete new one.
+
+    Reloaded models get their auto-suggest table built before the swap, as
+    does a model loaded up front with warm(). A first load from get() skips
+    it so no request waits on it; that model fills its table as keys miss.
+    """
+
+    def __init__(self, path, check_interval=MODEL_RELOAD_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._model = None
+        self._lock = threading.Lock()
+        self._reloading = False
+        self._next_check = 0.0
+        self._background_lock = threading.Lock()
+        self._background_load = None
+        self.load_error = None
+
+    def get(self):
+        model = self._model
+        if model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = _build_model(self.path)
+                    self._next_check = time.monotonic() + self.check_interval
+                return self._model
+
+        if self.check_interval > 0:
+            now = time.monotonic()
+            if now >= self._next_check:
+                self._next_check = now + self.check_interval
+                self._maybe_reload(model)
+        return model
+
+    def warm(self, suggestions=True):
+        """
+        Load the model, and optionally its auto-suggest table, on this thread.
+
+        Starts no background threads, so it is safe in a process that forks
+        afterwards (the gunicorn master): workers inherit the finished model
+        instead of each loading their own.
+        """
+        with self._lock:
+            if self._model is None:
+                model = _build_model(self.path)
+                if suggestions:
+                    model.precompute_suggestions()
+                self._model = model
+                self._next_check = time.monotonic() + self.check_interval
+            return self._model
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    @property
+    def current(self):
+        """The active model, or None; never loads or checks for a reload."""
+        return self._model
+
+    def load_in_background(self):
+        """Start the first load on a background thread, unless loaded or already loading."""
+        if self._model is not None:
+            return
+        with self._background_lock:
+            if self._background_load is None or not self._background_load.is_alive():
+                self._background_load = threading.Thread(
+                    target=self._load_quietly, name="model-load", daemon=True,
+                )
+                self._background_load.start()
+
+    def _load_quietly(self):
+        try:
+            self.get()
+            self.load_error = None
+        except Exception as e:
+            self.load_error = str(e)
+            logger.warning("Background model load failed: %s", e)
+
+    def _maybe_reload(self, model):
+        try:
+            signature = _file_signature(self.path)
+        except OSError:
+            # Keep serving the last good model while the file is missing
+            return
+        if signature == model.signature:
+            return
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload, name="workbook-reload", daemon=True).start()
+
+    def _reload(self):
+        try:
+            # A new mtime with the same bytes (touch, re-copy) keeps the model
+            # and its suggest table; rebuilding costs every worker seconds of CPU
+            current = self._model
+            signature = _file_signature(self.path)
+            with open(self.path, "rb") as fh:
+                version = _content_version(fh.read())
+            if current is not None and version == current.version:
+                current.signature = signature
+                logger.info("Workbook file changed but content is unchanged (version %s); keeping model", version)
+                return
+            new_model = _build_model(self.path)
+            new_model.precompute_suggestions()
+            old_model = self._model
+            self._model = new_model
+            if old_model is None or old_model.version != new_model.version:
+                logger.info("Workbook model swapped to version %s", new_model.version)
+        except Exception as e:
+            # Likely a partially written file; the next check will retry
+            logger.warning("Workbook reload failed, keeping current model: %s", e)
+        finally:
+            self._reloading = False
+
+
+_store = ModelStore(EXCEL_FILE)
+
+
+def warm_model(suggestions=True):
+    """Load the workbook model up front (see ModelStore.warm)."""
+    return _store.warm(suggestions)
+
+
+def is_model_loaded():
+    """True once a model is loaded; never triggers a load itself."""
+    return _store.loaded
+
+
+def get_model():
+    """Return the active WorkbookModel, loading it on first use."""
+    return _store.get()
+
+
+def get_loaded_model():
+    """
+    Return the active WorkbookModel without loading it, or None.
+
+    For probes: constant time, and never stats or parses the workbook.
+    """
+    return _store.current
+
+
+def load_model_in_background():
+    """Start loading the model off-thread if it isn't loaded; returns the last load error, if any."""
+    _store.load_in_background()
+    return _store.load_error
+
+
+def get_fruit_catalog(model=None):
+    """Return the compiled FruitCatalog for the loaded workbook."""
+    return (model or get_model()).catalog
+
+
+def get_fruit_master():
+    """Return list of fruits with sugar, sweetness, tartness from FruitMaster sheet."""
+    return list(get_fruit_catalog().fruits)
+
+
+def get_cost_table(model=None):
+    """Return the Costing sheet as a dict keyed by ingredient (lowercase)."""
+    return (model or get_model()).costs
+
+
+def get_co2_safety_table(model=None):
+    """Return the CO2Safety sheet as a list of rows."""
+    return list((model or get_model()).co2_safety)
+
+
 def _style_aliases():
     return {
         "tropical": ["tropical", "mango", "pineapple", "aromatic"],
@@ -86,30 +756,45 @@ def _style_aliases():
     }
 
 
-def auto_suggest_from_excel(target_sweet, target_tart, style, total_juice_ml_per_L=80.0, batch_l=3.0, temp_C=28.0):
-    """Use FruitMaster to suggest 4 fruits that best match target sweet/tart."""
-    fruits = get_fruit_master()
-    style = (style or "").lower().strip()
-    style_tags = _style_aliases().get(style, [])
+def auto_suggest_from_excel(target_sweet, target_tart, style, total_juice_ml_per_L=80.0, batch_l=3.0, temp_C=28.0,
+                            max_sugar_g_L=8.0, max_cost_per_L=None, model=None):
+    """
+    Use FruitMaster to suggest up to 4 fruits and a split that best match target sweet/tart.
 
-    scored = []
-    for f in fruits:
-        base_distance = abs(f["sweet"] - target_sweet) + abs(f["tart"] - target_tart)
-        style_bonus = 0
-        if style_tags and any(tag in (f["notes"] or "").lower() for tag in style_tags):
-            style_bonus = -1
-        score = base_distance + style_bonus
-        scored.append((score, f))
+    The split is optimized (see blend_optimizer.optimize_blend) so the blend's
+    sweet/tart lands near the target while sugar stays at or below
+    max_sugar_g_L and, if given, juice cost per litre at or below max_cost_per_L.
+    Without a cost cap the choice comes from the model's precomputed
+    suggest_table, so only the juice scaling is done per request.
+    """
+    model = model or get_model()
+    catalog = model.catalog
+    style = (style or "").lower().strip()
+    no_style = np.zeros(len(catalog))
 
-    scored.sort(key=lambda x: x[0])
-    top_fruits = [f for _, f in scored[:4]]
+    if max_cost_per_L is None and catalog.fruits:
+        # Precomputed path: only the sugar cap depends on this request
+        best = model.suggest_frontier(target_sweet, target_tart, style).pick(total_juice_ml_per_L, max_sugar_g_L)
+    else:
+        best = optimize_blend(
+            catalog.sweet_arr,
+            catalog.tart_arr,
+            catalog.sugar_arr,
+            model.fruit_cost_per_l,
+            catalog.style_match.get(style, no_style),
+            target_sweet,
+            target_tart,
+            total_juice_ml_per_L,
+            max_sugar_g_L=max_sugar_g_L,
+            max_cost_per_L=max_cost_per_L,
+        )
+    picks = zip(best["indices"], best["pcts"]) if best else []
 
-    pct_pattern = [0.4, 0.3, 0.2, 0.1]
     fruits_out = []
     sugar_total_g_L = 0.0
 
-    for i, f in enumerate(top_fruits):
-        pct = pct_pattern[i] if i < len(pct_pattern) else 0.0
+    for i, pct in picks:
+        f = catalog.fruits[i]
         juice_ml_per_L = total_juice_ml_per_L * pct
         sugar_g_L = f["sugar"] * juice_ml_per_L / 100.0
         sugar_total_g_L += sugar_g_L
@@ -128,7 +813,7 @@ def auto_suggest_from_excel(target_sweet, target_tart, style, total_juice_ml_per
     formulation = _calculate_formulation(batch_l, total_juice_ml_per_L)
 
     # Calculate optimal fermentation time
-    ferment_time = _calculate_optimal_ferment_time(sugar_total_g_L, temp_C)
+    ferment_time = _calculate_optimal_ferment_time(sugar_total_g_L, temp_C, model=model)
 
     return {
         "fruits": fruits_out,
@@ -139,67 +824,59 @@ def auto_suggest_from_excel(target_sweet, target_tart, style, total_juice_ml_per
         "formulation": formulation,
         "ferment_time": ferment_time,
         "temp_C": temp_C,
+        "blend_profile": {
+            "sweetness": round(best["sweet"], 2) if best else None,
+            "tartness": round(best["tart"], 2) if best else None,
+            "juice_cost_per_L": round(best["cost_per_L"], 2) if best else None,
+            "constraints_met": best["feasible"] if best else False,
+        },
     }
 
 
-def _lookup_fruit_sugar(name):
-    name = (name or "").strip().lower()
-    for f in get_fruit_master():
-        if f["name"].strip().lower() == name:
-            return f["sugar"]
-    return 0.0
-
+def _lookup_fruit_sugar(name, model=None):
+    return get_fruit_catalog(model).sugar_of(name)
 
-def _estimate_cost_for_blend(fruits, batch_l):
-    """Estimate cost for a given blend using Costing sheet."""
-    costs = get_cost_table()
-    total_cost = 0.0
 
-    for f in fruits:
-        fruit_name = f["name"]
-        juice_ml_batch = f["juice_ml_batch"]
-        key_candidates = [
-            fruit_name.strip().lower(),
-            (fruit_name + " juice").strip().lower(),
-        ]
-        cost_info = None
-        for key in key_candidates:
-            if key in costs:
-                cost_info = costs[key]
-                break
-
-        if cost_info:
-            if "per L" in cost_info["unit"]:
-                liters = juice_ml_batch / 1000.0
-                total_cost += liters * cost_info["cost_per_unit"]
-            elif "per kg" in cost_info["unit"]:
-                # rough approximation: assume juice density ~1 kg/L
-                liters = juice_ml_batch / 1000.0
-                total_cost += liters * cost_info["cost_per_unit"]
-            # else: ignore or extend logic as needed
+def _estimate_cost_for_blend(names, juice_ml_batch, model=None):
+    """Estimate cost for a blend's fruits and per-batch ml using the compiled Costing prices."""
+    cost_per_litre = (model or get_model()).cost_resolver.cost_per_litre
+    total_cost = _sum_parts([ml / 1000.0 * cost_per_litre(name) for name, ml in zip(names, juice_ml_batch)])
     return round(total_cost, 2)
 
 
-def _lookup_safety_row(sugar_g_L, temp_C):
-    """Find the closest safety row given sugar and temp."""
-    rows = get_co2_safety_table()
-    if not rows:
-        return None
-    # Simple: choose row where sugar_g_L <= sheet sugar and closest temp
-    candidates = [r for r in rows if sugar_g_L <= r["sugar_g_L"] + 0.1]
-    if not candidates:
-        candidates = rows
-    candidates.sort(key=lambda r: (abs(r["temp_C"] - temp_C), r["sugar_g_L"]))
-    return candidates[0]
+def _lookup_safety_row(sugar_g_L, temp_C, model=None, interpolate=False):
+    """
+    Find the closest safety row given sugar and temp.
+
+    With interpolate=True the returned row's max_hours is bilinearly
+    interpolated between sheet rows instead of taken from the nearest one.
+    """
+    index = (model or get_model()).safety_index
+    row = index.lookup(sugar_g_L, temp_C)
+    if row is None or not interpolate:
+        return row
+    return dict(row, max_hours=round(index.max_hours_at(sugar_g_L, temp_C), 1), interpolated=True)
+
+
+def _safety_detail(safety_row):
+    detail = {
+        "temp_C": safety_row["temp_C"],
+        "max_hours": safety_row["max_hours"],
+        "risk": safety_row["risk"],
+    }
+    if safety_row.get("interpolated"):
+        detail["interpolated"] = True
+    return detail
 
 
-def _calculate_optimal_juice_amount(fruit_names, target_sugar_g_L=7.0):
+def _calculate_optimal_juice_amount(fruit_names, target_sugar_g_L=7.0, model=None):
     """
     Calculate optimal juice amount per liter to achieve target sugar level.
 
     Args:
         fruit_names: List of fruit names (can include empty strings)
         target_sugar_g_L: Target sugar content in g/L (default 7.0 for safety)
+        model: WorkbookModel to read from (defaults to the active model)
 
     Returns:
         dict with recommended juice amounts and reasoning
@@ -217,19 +894,18 @@ def _calculate_optimal_juice_amount(fruit_names, target_sugar_g_L=7.0):
         }
 
     # Get fruit data and calculate average sugar content
-    total_sugar = 0
-    fruit_count = 0
+    model = model or get_model()
+    sugars = []
 
     for name in selected_fruits:
-        sugar = _lookup_fruit_sugar(name)
+        sugar = _lookup_fruit_sugar(name, model)
         if sugar > 0:
-            total_sugar += sugar
-            fruit_count += 1
+            sugars.append(sugar)
 
-    if fruit_count == 0:
+    if not sugars:
         avg_sugar = 10.0  # Default assumption
     else:
-        avg_sugar = total_sugar / fruit_count
+        avg_sugar = math.fsum(sugars) / len(sugars)
 
     # Calculate juice amount to achieve target sugar
     # Formula: sugar_g_L = (avg_sugar_g_per_100ml * juice_ml_per_L) / 100
@@ -254,98 +930,155 @@ def _calculate_optimal_juice_amount(fruit_names, target_sugar_g_L=7.0):
     else:
         intensity = "strong"
 
-    # Generate reasoning
+    return {
+        "recommended_ml_per_L": int(optimal_juice_ml_L),
+        "intensity": intensity,
+        "reasoning": _juice_reasoning(selected_fruits, avg_sugar, optimal_juice_ml_L, actual_sugar_g_L),
+        "sugar_estimate_g_L": round(actual_sugar_g_L, 1),
+        "avg_fruit_sugar": round(avg_sugar, 1)
+    }
+
+
+def _juice_reasoning(selected_fruits, avg_sugar, juice_ml_per_L, sugar_g_L):
     fruit_list = ", ".join(selected_fruits[:3])
     if len(selected_fruits) > 3:
         fruit_list += f" and {len(selected_fruits) - 3} more"
 
-    reasoning = (
+    return (
         f"Based on {fruit_list} (avg {avg_sugar:.1f}g sugar/100ml), "
-        f"{optimal_juice_ml_L} ml/L will give ~{actual_sugar_g_L:.1f}g/L sugar - "
+        f"{juice_ml_per_L} ml/L will give ~{sugar_g_L:.1f}g/L sugar - "
         f"safe and balanced"
     )
 
+
+def _ferment_quality(temp_C):
+    """(recommendation, quality) for a fermentation temperature."""
+    if temp_C >= 25 and temp_C <= 30:
+        return "Ideal conditions for fermentation", "optimal"
+    elif temp_C >= 20 and temp_C < 25:
+        return "Good conditions, but fermentation will be slower", "good"
+    elif temp_C > 30 and temp_C <= 35:
+        return "Warm conditions - watch closely to avoid over-carbonation", "caution"
+    elif temp_C < 20:
+        return "Cool conditions - fermentation will be slow. Consider warming.", "slow"
+    else:
+        return "Extreme temperature - not recommended for fermentation", "danger"
+
+
+def _ferment_time_result(min_hours, optimal_hours, max_hours, limit_reached, temp_C):
+    recommendation, quality = _ferment_quality(temp_C)
+    optimal_hours = round(optimal_hours)
     return {
-        "recommended_ml_per_L": int(optimal_juice_ml_L),
-        "intensity": intensity,
-        "reasoning": reasoning,
-        "sugar_estimate_g_L": round(actual_sugar_g_L, 1),
-        "avg_fruit_sugar": round(avg_sugar, 1)
+        "min_hours": round(min_hours),
+        "max_hours": round(max_hours),
+        "optimal_hours": optimal_hours,
+        "recommendation": recommendation,
+        "quality": quality,
+        "phase_1_hours": round(optimal_hours * 0.6),  # Active fermentation
+        "phase_2_hours": round(optimal_hours * 0.4),  # Settling/carbonation
+        "co2_limit_reached": limit_reached,
     }
 
 
-def _calculate_optimal_ferment_time(sugar_g_L, temp_C, humidity=60):
+def _ferment_times_many(sugar_g_L, temp_C, model=None):
+    """
+    Fermentation time recommendations for arrays of (sugar, temperature).
+
+    Args:
+        sugar_g_L: sequence of sugar contents in g/L
+        temp_C: sequence of temperatures in Celsius (same length)
+        model: WorkbookModel whose calibrated fermentation model to use
+
+    Returns:
+        list of dicts shaped like _calculate_optimal_ferment_time's output
+    """
+    model = model or get_model()
+    times = model.fermentation.ferment_times(sugar_g_L, temp_C)
+    return [
+        _ferment_time_result(*row)
+        for row in zip(
+            times["min_hours"].tolist(),
+            times["optimal_hours"].tolist(),
+            times["max_hours"].tolist(),
+            times["limit_reached"].tolist(),
+            np.asarray(temp_C, dtype=float).tolist(),
+        )
+    ]
+
+
+def _calculate_optimal_ferment_time(sugar_g_L, temp_C, model=None):
     """
-    Calculate optimal fermentation time based on temperature, sugar, and humidity.
+    Calculate optimal fermentation time based on temperature and sugar.
 
     Args:
         sugar_g_L: Sugar content in g/L
         temp_C: Temperature in Celsius
-        humidity: Relative humidity percentage
+        model: WorkbookModel to read from (defaults to the active model)
 
     Returns:
         dict with fermentation time recommendations
+
+    Times come from the fermentation model calibrated to the CO2Safety
+    sheet (see fermentation.FermentationModel): max_hours is when the CO2
+    built up in a sealed bottle reaches the sheet's limit, optimal_hours and
+    min_hours when it reaches 75% and 50% of it. A blend with too little
+    sugar to reach the limit (co2_limit_reached False) is timed against
+    fermenting out instead.
     """
-    # Base fermentation time calculation (in hours)
-    # Lower sugar = faster fermentation
-    # Higher temperature = faster fermentation
-    # Optimal range: 20-30°C
-
-    # Base time at 25°C with 8 g/L sugar
-    base_hours = 24
-
-    # Temperature factor (optimal at 25-28°C)
-    if temp_C < 20:
-        temp_factor = 1.5  # Slower fermentation in cold
-    elif temp_C <= 25:
-        temp_factor = 1.2
-    elif temp_C <= 30:
-        temp_factor = 1.0  # Optimal range
-    elif temp_C <= 35:
-        temp_factor = 0.8  # Faster but riskier
-    else:
-        temp_factor = 0.6  # Very fast, high risk
-
-    # Sugar factor (more sugar = more activity but also more time needed for balance)
-    if sugar_g_L <= 4:
-        sugar_factor = 0.7  # Less sugar, faster
-    elif sugar_g_L <= 6:
-        sugar_factor = 0.85
-    elif sugar_g_L <= 8:
-        sugar_factor = 1.0  # Optimal range
-    else:
-        sugar_factor = 1.2  # More sugar, needs more time
+    model = model or get_model()
+    times = model.fermentation.ferment_times_one(float(sugar_g_L), float(temp_C))
+    return _ferment_time_result(times["min_hours"], times["optimal_hours"], times["max_hours"],
+                                times["limit_reached"], temp_C)
 
-    # Calculate time range
-    min_hours = round(base_hours * temp_factor * sugar_factor * 0.75)
-    max_hours = round(base_hours * temp_factor * sugar_factor * 1.25)
-    optimal_hours = round(base_hours * temp_factor * sugar_factor)
 
-    # Determine fermentation phase recommendations
-    if temp_C >= 25 and temp_C <= 30:
-        recommendation = "Ideal conditions for fermentation"
-        quality = "optimal"
-    elif temp_C >= 20 and temp_C < 25:
-        recommendation = "Good conditions, but fermentation will be slower"
-        quality = "good"
-    elif temp_C > 30 and temp_C <= 35:
-        recommendation = "Warm conditions - watch closely to avoid over-carbonation"
-        quality = "caution"
-    elif temp_C < 20:
-        recommendation = "Cool conditions - fermentation will be slow. Consider warming."
-        quality = "slow"
-    else:
-        recommendation = "Extreme temperature - not recommended for fermentation"
-        quality = "danger"
+def simulate_fermentation(scenarios, hours=48.0, step_hours=0.5, model=None):
+    """
+    Simulate sugar, CO2 and ABV over time for many scenarios at once.
+
+    Args:
+        scenarios: list of dicts with sugar_g_L and either temp_C (constant)
+            or temp_profile ([(hour, temp_C), ...], linearly interpolated)
+        hours: simulated duration
+        step_hours: time step of the returned series
+        model: WorkbookModel whose calibrated fermentation model to use
 
+    Returns:
+        dict with the shared "hours" axis, the model parameters and one
+        entry per scenario holding its series and co2_limit_hours (None if
+        the limit isn't reached within hours)
+    """
+    model = model or get_model()
+    fermentation = model.fermentation
+    steps = math.ceil(hours / step_hours)
+    sugar = np.array([float(sc["sugar_g_L"]) for sc in scenarios])
+    temps = np.empty((len(scenarios), steps))
+    for i, sc in enumerate(scenarios):
+        if sc.get("temp_profile"):
+            temps[i] = profile_from_points(sc["temp_profile"], hours, step_hours)
+        else:
+            temps[i] = float(sc.get("temp_C", 28.0))
+
+    series = fermentation.simulate(sugar, temps, hours, step_hours)
+    sugar_l = np.round(series["sugar_g_L"], 3).tolist()
+    co2_l = np.round(series["co2_vols"], 3).tolist()
+    abv_l = np.round(series["abv_percent"], 4).tolist()
+    limit_l = np.round(series["limit_hours"], 2).tolist()
+
+    results = []
+    for i, sc in enumerate(scenarios):
+        results.append({
+            "sugar_g_L": sc["sugar_g_L"],
+            "temp_C": sc.get("temp_C") if not sc.get("temp_profile") else None,
+            "temp_profile": sc.get("temp_profile"),
+            "sugar_remaining_g_L": sugar_l[i],
+            "co2_vols": co2_l[i],
+            "abv_percent": abv_l[i],
+            "co2_limit_hours": None if math.isnan(limit_l[i]) else limit_l[i],
+        })
     return {
-        "min_hours": min_hours,
-        "max_hours": max_hours,
-        "optimal_hours": optimal_hours,
-        "recommendation": recommendation,
-        "quality": quality,
-        "phase_1_hours": round(optimal_hours * 0.6),  # Active fermentation
-        "phase_2_hours": round(optimal_hours * 0.4),  # Settling/carbonation
+        "hours": np.round(series["hours"], 4).tolist(),
+        "model": fermentation.describe(),
+        "scenarios": results,
     }
 
 
@@ -383,15 +1116,22 @@ def _calculate_formulation(batch_l, juice_ml_per_L, ginger_bug_pct=0.1, lemon_ml
     }
 
 
-def calculate_blend_manual(fruit_names, pcts, juice_ml_per_L, batch_l, temp_C=28.0):
+def calculate_blend_manual(fruit_names, pcts, juice_ml_per_L, batch_l, temp_C=28.0, model=None,
+                           interpolate_safety=False):
     """
     Manual mode:
       fruit_names: list of 4 names (can be empty)
       pcts: list of 4 floats (fractions, should sum ~1)
+      interpolate_safety: interpolate safety_detail.max_hours between CO2Safety rows
     """
+    # Pin one model for the whole calculation so a reload can't mix versions
+    model = model or get_model()
+
     # Auto-correct percentages to sum to 100%
     original_pcts = pcts.copy()
-    total_pct = sum(pcts)
+    # Sums in ascending order (here and below), so the result doesn't depend
+    # on fruit order and matches calculate_blends_batch's row sums
+    total_pct = _sum_parts(pcts)
     pct_corrected = False
 
     # Only normalize if we have non-zero percentages
@@ -401,16 +1141,18 @@ def calculate_blend_manual(fruit_names, pcts, juice_ml_per_L, batch_l, temp_C=28
         pct_corrected = True
 
     fruits_out = []
-    sugar_total_g_L = 0.0
+    sugar_parts = []
+    batch_parts = []
 
     for name, pct, orig_pct in zip(fruit_names, pcts, original_pcts):
         if not name or pct <= 0:
             continue
-        sugar_per_100 = _lookup_fruit_sugar(name)
+        sugar_per_100 = _lookup_fruit_sugar(name, model)
         juice_ml_L = juice_ml_per_L * pct
         juice_ml_batch = juice_ml_L * batch_l
         sugar_g_L = sugar_per_100 * juice_ml_L / 100.0
-        sugar_total_g_L += sugar_g_L
+        sugar_parts.append(sugar_g_L)
+        batch_parts.append(juice_ml_batch)
 
         fruit_data = {
             "name": name,
@@ -426,18 +1168,20 @@ def calculate_blend_manual(fruit_names, pcts, juice_ml_per_L, batch_l, temp_C=28
 
         fruits_out.append(fruit_data)
 
+    sugar_total_g_L = _sum_parts(sugar_parts)
     co2_vols = sugar_total_g_L * 0.24
     abv_percent = sugar_total_g_L * 0.065
     safety_flag = "OK (≤ 8 g/L)" if sugar_total_g_L <= 8 else "Too high – reduce juice/sugar"
 
-    safety_row = _lookup_safety_row(sugar_total_g_L, temp_C)
-    est_cost = _estimate_cost_for_blend(fruits_out, batch_l)
+    safety_row = _lookup_safety_row(sugar_total_g_L, temp_C, model, interpolate=interpolate_safety)
+    # Priced off the unrounded per-batch ml, which the batch path can do as one array operation
+    est_cost = _estimate_cost_for_blend([f["name"] for f in fruits_out], batch_parts, model)
 
     # Add complete formulation breakdown
     formulation = _calculate_formulation(batch_l, juice_ml_per_L)
 
     # Calculate optimal fermentation time
-    ferment_time = _calculate_optimal_ferment_time(sugar_total_g_L, temp_C)
+    ferment_time = _calculate_optimal_ferment_time(sugar_total_g_L, temp_C, model=model)
 
     result = {
         "fruits": fruits_out,
@@ -460,10 +1204,536 @@ def calculate_blend_manual(fruit_names, pcts, juice_ml_per_L, batch_l, temp_C=28
         result["original_total_pct"] = round(total_pct * 100, 1)
 
     if safety_row:
-        result["safety_detail"] = {
-            "temp_C": safety_row["temp_C"],
-            "max_hours": safety_row["max_hours"],
-            "risk": safety_row["risk"],
+        result["safety_detail"] = _safety_detail(safety_row)
+
+    return result
+
+
+def calculate_blends_batch(blends, model=None, interpolate_safety=False):
+    """
+    Evaluate many manual blends at once.
+
+    Args:
+        blends: list of dicts with fruit_names, pcts (fractions), juice_ml_per_L,
+            batch_l and optional temp_C, i.e. calculate_blend_manual's arguments
+        model: WorkbookModel to read from (defaults to the active model)
+        interpolate_safety: interpolate safety_detail.max_hours between CO2Safety rows
+
+    Returns:
+        list of result dicts, each shaped like calculate_blend_manual's output
+
+    Percentage, sugar and cost totals, CO2, ABV and safety-row selection
+    are computed as array operations over an (n_blends x n_fruit_slots)
+    matrix rather than per blend; only the result dicts are built per blend.
+    """
+    model = model or get_model()
+    n = len(blends)
+    if n == 0:
+        return []
+
+    catalog = model.catalog
+    cost_per_litre = model.cost_resolver.cost_per_litre
+    width = max(len(b["fruit_names"]) for b in blends)
+
+    names = [[""] * width for _ in range(n)]
+    raw_pcts = np.zeros((n, width))
+    sugar_per_100 = np.zeros((n, width))
+    cost_per_l = np.zeros((n, width))
+    for i, b in enumerate(blends):
+        for j, (name, pct) in enumerate(zip(b["fruit_names"], b["pcts"])):
+            names[i][j] = name
+            raw_pcts[i, j] = pct
+            if name:
+                sugar_per_100[i, j] = catalog.sugar_of(name)
+                cost_per_l[i, j] = cost_per_litre(name)
+
+    juice_ml_per_L = np.array([float(b["juice_ml_per_L"]) for b in blends])
+    batch_l = np.array([float(b["batch_l"]) for b in blends])
+    temp_C = np.array([float(b.get("temp_C", 28.0)) for b in blends])
+
+    # Same auto-correction rule as calculate_blend_manual, row by row
+    total_pct = _row_sums(raw_pcts)
+    pct_corrected = (total_pct > 0) & (np.abs(total_pct - 1.0) > 0.001)
+    divisor = np.where(pct_corrected, total_pct, 1.0)
+    pcts = raw_pcts / divisor[:, None]
+
+    has_name = np.array([[bool(name) for name in row] for row in names], dtype=bool)
+    active = has_name & (pcts > 0)
+
+    juice_ml_L = np.where(active, juice_ml_per_L[:, None] * pcts, 0.0)
+    juice_ml_batch = juice_ml_L * batch_l[:, None]
+    sugar_g_L = sugar_per_100 * juice_ml_L / 100.0
+    sugar_total = _row_sums(sugar_g_L)
+    co2_vols = sugar_total * 0.24
+    abv_percent = sugar_total * 0.065
+    cost_total = _row_sums(juice_ml_batch / 1000.0 * cost_per_l)
+
+    safety_idx = _select_safety_rows(model, sugar_total, temp_C)
+    safety_hours = model.safety_index.max_hours_many(sugar_total, temp_C) if interpolate_safety else None
+
+    # Convert to Python lists once; indexing numpy scalars per cell is slow
+    active_l = active.tolist()
+    pcts_l = pcts.tolist()
+    raw_pcts_l = raw_pcts.tolist()
+    juice_ml_L_l = juice_ml_L.tolist()
+    juice_ml_batch_l = juice_ml_batch.tolist()
+    sugar_g_L_l = sugar_g_L.tolist()
+    sugar_total_l = sugar_total.tolist()
+    co2_l = co2_vols.tolist()
+    abv_l = abv_percent.tolist()
+    cost_total_l = cost_total.tolist()
+    corrected_l = pct_corrected.tolist()
+    total_pct_l = total_pct.tolist()
+    safety_l = safety_idx.tolist() if safety_idx is not None else None
+    safety_hours_l = safety_hours.tolist() if safety_hours is not None else None
+    ferment_l = _ferment_times_many(sugar_total, temp_C, model)
+
+    results = []
+    for i, b in enumerate(blends):
+        corrected = corrected_l[i]
+        fruits_out = []
+        for j in range(width):
+            if not active_l[i][j]:
+                continue
+            fruit_data = {
+                "name": names[i][j],
+                "pct": pcts_l[i][j],
+                "juice_ml_per_L": round(juice_ml_L_l[i][j], 2),
+                "juice_ml_batch": round(juice_ml_batch_l[i][j], 2),
+                "sugar_g_L": round(sugar_g_L_l[i][j], 2),
+            }
+            if corrected:
+                fruit_data["original_pct"] = raw_pcts_l[i][j]
+            fruits_out.append(fruit_data)
+
+        sugar = sugar_total_l[i]
+        result = {
+            "fruits": fruits_out,
+            "sugar_g_per_L": round(sugar, 2),
+            "co2_vols": round(co2_l[i], 2),
+            "abv_percent": round(abv_l[i], 3),
+            "safety_flag": "OK (≤ 8 g/L)" if sugar <= 8 else "Too high – reduce juice/sugar",
+            "batch_l": b["batch_l"],
+            "juice_ml_per_L": b["juice_ml_per_L"],
+            "cost_estimate": round(cost_total_l[i], 2),
+            "formulation": _calculate_formulation(b["batch_l"], b["juice_ml_per_L"]),
+            "pct_corrected": corrected,
+            "ferment_time": ferment_l[i],
+            "temp_C": b.get("temp_C", 28.0),
         }
 
+        if corrected:
+            original_total = round(total_pct_l[i] * 100, 1)
+            result["correction_message"] = f"Percentages auto-corrected from {original_total}% to 100%"
+            result["original_total_pct"] = original_total
+
+        if safety_l is not None:
+            safety_row = model.co2_safety[safety_l[i]]
+            if safety_hours_l is not None:
+                safety_row = dict(safety_row, max_hours=round(safety_hours_l[i], 1), interpolated=True)
+            result["safety_detail"] = _safety_detail(safety_row)
+
+        results.append(result)
+
+    return results
+
+
+def _round_grid(values, ndigits=None):
+    """
+    Nested lists of a 2-D array's values rounded like the scalar results.
+
+    To whole numbers np.rint is exact (half to even, as round() is); with
+    decimals np.round isn't correctly rounded, so those go through round().
+    """
+    if ndigits is None:
+        return np.rint(values).astype(int).tolist()
+    return [[round(v, ndigits) for v in row] for row in values.tolist()]
+
+
+def sweep_blend(fruit_names, pcts, batch_l, temps_C, juice_doses, model=None, interpolate_safety=False):
+    """
+    Evaluate one blend over a temperature x juice dose grid.
+
+    Args:
+        fruit_names, pcts: the blend, as for calculate_blend_manual (pcts are
+            fractions and are auto-corrected to sum to 1 the same way)
+        batch_l: batch size in liters
+        temps_C: temperature axis (rows of the grid)
+        juice_doses: juice_ml_per_L axis (columns of the grid)
+        model: WorkbookModel to read from (defaults to the active model)
+        interpolate_safety: interpolate max_hours between CO2Safety rows
+
+    Returns:
+        dict with both axes and (len(temps_C) x len(juice_doses)) grids of
+        sugar, CO2, ABV, cost, safety flag, risk, max hours and ferment
+        times; every cell matches calculate_blend_manual for those inputs
+
+    Sugar, CO2, ABV and cost depend only on the dose and are computed once
+    per column, with the scalar path's arithmetic. Safety rows and ferment
+    times come from array lookups over the whole grid instead of one
+    calculate_blend_manual call per cell.
+    """
+    model = model or get_model()
+    catalog = model.catalog
+    cost_per_litre = model.cost_resolver.cost_per_litre
+    temps_C = np.asarray(temps_C, dtype=float)
+    doses = np.asarray(juice_doses, dtype=float)
+
+    # Same auto-correction and fruit filtering as calculate_blend_manual
+    total_pct = _sum_parts(pcts)
+    pct_corrected = total_pct > 0 and abs(total_pct - 1.0) > 0.001
+    if pct_corrected:
+        pcts = [p / total_pct for p in pcts]
+    slots = [(name, pct) for name, pct in zip(fruit_names, pcts) if name and pct > 0]
+    slot_pct = np.array([pct for _, pct in slots])
+    slot_sugar = np.array([catalog.sugar_of(name) for name, _ in slots])
+    slot_cost = [cost_per_litre(name) for name, _ in slots]
+
+    # One column per dose, in plain Python with the scalar path's exact
+    # operations and round(): np.round isn't correctly rounded, so half-way
+    # values (0.925 -> 0.93) would come out differently
+    sugar, columns = [], {"sugar_g_per_L": [], "co2_vols": [], "abv_percent": [], "cost_estimate": []}
+    for dose in doses.tolist():
+        juice_ml_L = [dose * pct for _, pct in slots]
+        sugar_total = _sum_parts([s * ml / 100.0 for s, ml in zip(slot_sugar.tolist(), juice_ml_L)])
+        cost = _sum_parts([ml * batch_l / 1000.0 * c for ml, c in zip(juice_ml_L, slot_cost)])
+        sugar.append(sugar_total)
+        columns["sugar_g_per_L"].append(round(sugar_total, 2))
+        columns["co2_vols"].append(round(sugar_total * 0.24, 2))
+        columns["abv_percent"].append(round(sugar_total * 0.065, 3))
+        columns["cost_estimate"].append(round(cost, 2))
+    sugar = np.array(sugar, dtype=float)
+
+    shape = (temps_C.size, doses.size)
+    sugar_grid = np.broadcast_to(sugar, shape)
+    temp_grid = np.broadcast_to(temps_C[:, None], shape)
+    times = model.fermentation.ferment_times(sugar_grid, temp_grid)
+
+    result = {
+        "fruits": [{"name": name, "pct": pct} for name, pct in slots],
+        "batch_l": batch_l,
+        "pct_corrected": pct_corrected,
+        "temps_C": temps_C.tolist(),
+        "juice_ml_per_L": doses.tolist(),
+        # Dose at which the blend reaches the 8 g/L flag (None without sugar)
+        "sugar_limit_juice_ml_per_L": None,
+        "grid": dict(
+            {name: [list(column) for _ in range(temps_C.size)] for name, column in columns.items()},
+            over_sugar_limit=(sugar_grid > 8).tolist(),
+            ferment_optimal_hours=_round_grid(times["optimal_hours"]),
+            ferment_min_hours=_round_grid(times["min_hours"]),
+            ferment_max_hours=_round_grid(times["max_hours"]),
+        ),
+    }
+    sugar_per_ml = math.fsum((slot_sugar * slot_pct / 100.0).tolist())
+    if sugar_per_ml > 0:
+        result["sugar_limit_juice_ml_per_L"] = round(8.0 / sugar_per_ml, 1)
+
+    safety_idx = model.safety_index.lookup_grid(sugar.tolist(), temps_C)
+    if safety_idx is not None:
+        rows = model.co2_safety
+        risks = np.array([r["risk"] for r in rows], dtype=object)
+        if interpolate_safety:
+            hours = model.safety_index.max_hours_many(sugar_grid.ravel(), temp_grid.ravel()).reshape(shape)
+            max_hours = _round_grid(hours, 1)
+        else:
+            max_hours = np.array([r["max_hours"] for r in rows])[safety_idx].tolist()
+        result["grid"]["risk"] = risks[safety_idx].tolist()
+        result["grid"]["safety_max_hours"] = max_hours
     return result
+
+
+class _ExactSum:
+    """
+    math.fsum over values added one at a time, in bounded memory.
+
+    Keeps Shewchuk's non-overlapping partials (what math.fsum keeps
+    internally), so the running total is exact and value is the correctly
+    rounded sum of every value added. The partials list stays short: at
+    most a few dozen floats, however many values are added.
+    """
+
+    def __init__(self):
+        self._partials = []
+
+    def add(self, value):
+        x = float(value)
+        i = 0
+        for y in self._partials:
+            if abs(x) < abs(y):
+                x, y = y, x
+            hi = x + y
+            lo = y - (hi - x)
+            if lo:
+                self._partials[i] = lo
+                i += 1
+            x = hi
+        self._partials[i:] = [x]
+
+    @property
+    def value(self):
+        return math.fsum(self._partials)
+
+
+class PlanTotals:
+    """
+    Running totals for a production plan.
+
+    add() annotates one batch result (label, ingredient_cost and, given
+    start_at, finish times) and folds it into the totals, so a plan can be
+    totalled in chunks without keeping its results. Totals add up the
+    rounded per-batch figures, so they match the sum of what each batch shows.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.lemon_per_l = model.cost_resolver.cost_per_litre("lemon")
+        self.ginger_per_l = model.cost_resolver.cost_per_litre("ginger bug")
+        self.batches = 0
+        # normalized name -> [display name, juice ml sum, cost sum, batches]
+        self.fruits = {}
+        self.sums = {key: _ExactSum() for key in (
+            "volume_l", "water_ml", "fruit_juice_ml", "lemon_juice_ml", "ginger_bug_ml",
+            "fruit_juice_cost", "lemon_juice_cost", "ginger_bug_cost",
+        )}
+        self.first_finish = None
+        self.last_finish = None
+        self.longest_ferment_hours = None
+
+    def add(self, batch, result):
+        formulation = result["formulation"]
+        lemon_cost = round(formulation["lemon_juice_ml"] / 1000.0 * self.lemon_per_l, 2)
+        ginger_cost = round(formulation["ginger_bug_ml"] / 1000.0 * self.ginger_per_l, 2)
+        result["label"] = batch.get("label")
+        result["ingredient_cost"] = {
+            "fruit_juice": result["cost_estimate"],
+            "lemon_juice": lemon_cost,
+            "ginger_bug": ginger_cost,
+            "total": round(math.fsum((result["cost_estimate"], lemon_cost, ginger_cost)), 2),
+        }
+
+        ferment_time = result["ferment_time"]
+        start_at = batch.get("start_at")
+        if start_at is not None:
+            finish_at = start_at + timedelta(hours=ferment_time["optimal_hours"])
+            result["start_at"] = start_at.isoformat()
+            result["finish_at"] = finish_at.isoformat()
+            result["finish_window"] = [
+                (start_at + timedelta(hours=ferment_time["min_hours"])).isoformat(),
+                (start_at + timedelta(hours=ferment_time["max_hours"])).isoformat(),
+            ]
+            if self.first_finish is None or finish_at < self.first_finish:
+                self.first_finish = finish_at
+            if self.last_finish is None or finish_at > self.last_finish:
+                self.last_finish = finish_at
+        if self.longest_ferment_hours is None or ferment_time["optimal_hours"] > self.longest_ferment_hours:
+            self.longest_ferment_hours = ferment_time["optimal_hours"]
+
+        cost_per_litre = self.model.cost_resolver.cost_per_litre
+        for fruit in result["fruits"]:
+            entry = self.fruits.get(_normalize_name(fruit["name"]))
+            if entry is None:
+                entry = self.fruits[_normalize_name(fruit["name"])] = [fruit["name"], _ExactSum(), _ExactSum(), 0]
+            entry[1].add(fruit["juice_ml_batch"])
+            entry[2].add(fruit["juice_ml_batch"] / 1000.0 * cost_per_litre(fruit["name"]))
+            entry[3] += 1
+            self.sums["fruit_juice_ml"].add(fruit["juice_ml_batch"])
+
+        sums = self.sums
+        sums["volume_l"].add(result["batch_l"])
+        sums["water_ml"].add(formulation["water_ml"])
+        sums["lemon_juice_ml"].add(formulation["lemon_juice_ml"])
+        sums["ginger_bug_ml"].add(formulation["ginger_bug_ml"])
+        sums["fruit_juice_cost"].add(result["cost_estimate"])
+        sums["lemon_juice_cost"].add(lemon_cost)
+        sums["ginger_bug_cost"].add(ginger_cost)
+        self.batches += 1
+        return result
+
+    def totals(self):
+        sums = {key: total.value for key, total in self.sums.items()}
+        fruit_totals = sorted(
+            (
+                {"name": name, "juice_ml": round(ml.value, 1), "cost": round(cost.value, 2), "batches": n}
+                for name, ml, cost, n in self.fruits.values()
+            ),
+            key=lambda f: -f["juice_ml"],
+        )
+        return {
+            "batches": self.batches,
+            "volume_l": round(sums["volume_l"], 2),
+            "water_ml": round(sums["water_ml"], 1),
+            "fruit_juice_ml": round(sums["fruit_juice_ml"], 1),
+            "fruit_juices": fruit_totals,
+            "lemon_juice_ml": round(sums["lemon_juice_ml"], 1),
+            "ginger_bug_ml": round(sums["ginger_bug_ml"], 1),
+            "cost": {
+                "fruit_juice": round(sums["fruit_juice_cost"], 2),
+                "lemon_juice": round(sums["lemon_juice_cost"], 2),
+                "ginger_bug": round(sums["ginger_bug_cost"], 2),
+                "total": round(math.fsum((sums["fruit_juice_cost"], sums["lemon_juice_cost"],
+                                          sums["ginger_bug_cost"])), 2),
+            },
+            # Fruits with no Costing price are costed at 0 above
+            "uncosted_fruits": [
+                name for name, *_ in self.fruits.values() if self.model.cost_resolver.resolve(name)[0] is None
+            ],
+            "first_finish_at": self.first_finish.isoformat() if self.first_finish else None,
+            "last_finish_at": self.last_finish.isoformat() if self.last_finish else None,
+            "longest_ferment_hours": self.longest_ferment_hours,
+        }
+
+
+def plan_production(batches, model=None, interpolate_safety=False):
+    """
+    Formulate a production schedule and total its ingredients, cost and timing.
+
+    Args:
+        batches: list of dicts with calculate_blends_batch's keys (fruit_names,
+            pcts, juice_ml_per_L, batch_l, temp_C) plus optional label and
+            start_at (datetime the batch goes into the fermenter)
+        model: WorkbookModel to read from (defaults to the active model)
+        interpolate_safety: interpolate safety_detail.max_hours between CO2Safety rows
+
+    Returns:
+        dict with "batches" (calculate_blends_batch results plus label,
+        ingredient costs and, given start_at, finish times) and "totals"
+        (see PlanTotals)
+
+    Every batch is evaluated in one calculate_blends_batch call and totalled
+    in one pass, so a plan costs time linear in its number of batches.
+    """
+    model = model or get_model()
+    results = calculate_blends_batch(batches, model=model, interpolate_safety=interpolate_safety)
+    totals = PlanTotals(model)
+    for batch, result in zip(batches, results):
+        totals.add(batch, result)
+    return {"batches": results, "totals": totals.totals()}
+
+
+def _sum_parts(values):
+    """
+    Sum in ascending order: independent of slot order, and equal to _row_sums.
+
+    Zero padding in _row_sums doesn't change the result, since adding 0.0 is exact.
+    """
+    total = 0.0
+    for v in sorted(values):
+        total += v
+    return total
+
+
+def _row_sums(matrix):
+    """Per-row sums of a 2-D array, column by column over its sorted rows (see _sum_parts)."""
+    ordered = np.sort(matrix, axis=1)
+    total = np.zeros(len(ordered))
+    for j in range(ordered.shape[1]):
+        total += ordered[:, j]
+    return total
+
+
+def _select_safety_rows(model, sugar_g_L, temp_C):
+    """
+    Vectorized _lookup_safety_row: CO2Safety row index per (sugar, temp) pair.
+
+    Returns None when the sheet is empty.
+    """
+    return model.safety_index.lookup_many(sugar_g_L, temp_C)
+
+
+_blend_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL, name="manual_blend")
+_juice_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL, name="juice_recommend")
+
+# Percentages are fractions; 1e-6 is far below anything the UI can submit
+_PCT_KEY_DIGITS = 6
+
+
+def _blend_slots(fruit_names, pcts):
+    """(name, pct, key) for each input slot that becomes a fruits row, in request order."""
+    return [
+        (name, pct, (_normalize_name(name), round(pct, _PCT_KEY_DIGITS)))
+        for name, pct in zip(fruit_names, pcts)
+        if name and pct > 0
+    ]
+
+
+def calculate_blend_manual_cached(fruit_names, pcts, juice_ml_per_L, batch_l, temp_C=28.0,
+                                  interpolate_safety=False):
+    """
+    calculate_blend_manual behind the manual-blend result cache.
+
+    Blends are keyed by their sorted (normalized name, rounded pct) pairs plus
+    the batch inputs, so the same blend listed in another order or case is a
+    hit. The cached fruit rows are returned in this request's order with its
+    spelling of the names. Nested dicts are shared with the cache entry and
+    must not be mutated.
+    """
+    model = get_model()
+    slots = _blend_slots(fruit_names, pcts)
+    key = (
+        tuple(sorted(slot_key for _, _, slot_key in slots)),
+        # Slots without a fruit still count towards the percentage total
+        round(sum(pcts), _PCT_KEY_DIGITS),
+        float(juice_ml_per_L),
+        float(batch_l),
+        float(temp_C),
+        bool(interpolate_safety),
+    )
+    cached = _blend_cache.get(key, model.version)
+    if cached is None:
+        result = calculate_blend_manual(
+            fruit_names, pcts, juice_ml_per_L, batch_l, temp_C=temp_C, model=model,
+            interpolate_safety=interpolate_safety,
+        )
+        cached = (result, [slot_key for _, _, slot_key in slots])
+        _blend_cache.put(key, model.version, cached)
+
+    result, row_keys = cached
+    rows = {}
+    for row_key, row in zip(row_keys, result["fruits"]):
+        rows.setdefault(row_key, []).append(row)
+    fruits = []
+    for name, pct, slot_key in slots:
+        row = dict(rows[slot_key].pop(0), name=name)
+        if "original_pct" in row:
+            row["original_pct"] = pct
+        fruits.append(row)
+    return dict(result, fruits=fruits)
+
+
+def calculate_optimal_juice_amount_cached(fruit_names, target_sugar_g_L=7.0):
+    """_calculate_optimal_juice_amount behind the juice-recommendation result cache."""
+    model = get_model()
+    selected_fruits = [name for name in fruit_names if name and name.strip()]
+    key = (tuple(sorted(_normalize_name(name) for name in selected_fruits)), float(target_sugar_g_L))
+    result = _juice_cache.get(key, model.version)
+    if result is None:
+        result = _calculate_optimal_juice_amount(selected_fruits, target_sugar_g_L, model)
+        _juice_cache.put(key, model.version, result)
+
+    if not selected_fruits:
+        return dict(result)
+    # The reasoning names the fruits, so it follows this request's order and spelling
+    return dict(result, reasoning=_juice_reasoning(
+        selected_fruits, result["avg_fruit_sugar"], result["recommended_ml_per_L"], result["sugar_estimate_g_L"],
+    ))
+
+
+def get_result_cache_stats():
+    """Hit/miss/eviction counters for the result caches."""
+    return {
+        "manual_blend": _blend_cache.stats(),
+        "juice_recommend": _juice_cache.stats(),
+    }
+
+
+if __name__ == "__main__":
+    # Build step: python excel_backend.py build-snapshot [path/to/workbook.xlsx]
+    if len(sys.argv) >= 2 and sys.argv[1] == "build-snapshot":
+        target, model = build_snapshot(sys.argv[2] if len(sys.argv) > 2 else EXCEL_FILE)
+        print(f"Wrote {target} (version {model.version}, {len(model.catalog)} fruits)")
+        if model.cost_resolver.missing:
+            print(f"No Costing price for: {', '.join(model.cost_resolver.missing)}")
+    else:
+        print("usage: python excel_backend.py build-snapshot [workbook.xlsx]")
+        sys.exit(2)
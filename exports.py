@@ -0,0 +1,154 @@
+# exports.py
+
+import csv
+import io
+import os
+
+from flask import current_app, stream_with_context
+
+from excel_backend import calculate_blends_batch, sweep_blend
+
+# Rows computed (and written) per step: one calculate_blends_batch call or
+# one slice of a sweep grid. Memory per export is bounded by this, not by
+# the number of rows.
+EXPORT_CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", 500))
+
+MIMETYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _pcts(result):
+    return ";".join(f"{f['pct'] * 100:g}" for f in result["fruits"])
+
+
+# (CSV header, value getter) for one blend result; NDJSON rows are the full results
+BLEND_COLUMNS = [
+    ("fruits", lambda r: ";".join(f["name"] for f in r["fruits"])),
+    ("pcts", _pcts),
+    ("batch_l", lambda r: r["batch_l"]),
+    ("juice_ml_per_L", lambda r: r["juice_ml_per_L"]),
+    ("temp_C", lambda r: r["temp_C"]),
+    ("sugar_g_per_L", lambda r: r["sugar_g_per_L"]),
+    ("co2_vols", lambda r: r["co2_vols"]),
+    ("abv_percent", lambda r: r["abv_percent"]),
+    ("safety_flag", lambda r: r["safety_flag"]),
+    ("risk", lambda r: r.get("safety_detail", {}).get("risk")),
+    ("safety_max_hours", lambda r: r.get("safety_detail", {}).get("max_hours")),
+    ("ferment_min_hours", lambda r: r["ferment_time"]["min_hours"]),
+    ("ferment_optimal_hours", lambda r: r["ferment_time"]["optimal_hours"]),
+    ("ferment_max_hours", lambda r: r["ferment_time"]["max_hours"]),
+    ("water_ml", lambda r: r["formulation"]["water_ml"]),
+    ("total_fruit_juice_ml", lambda r: r["formulation"]["total_fruit_juice_ml"]),
+    ("lemon_juice_ml", lambda r: r["formulation"]["lemon_juice_ml"]),
+    ("ginger_bug_ml", lambda r: r["formulation"]["ginger_bug_ml"]),
+    ("cost_estimate", lambda r: r["cost_estimate"]),
+    ("pct_corrected", lambda r: r["pct_corrected"]),
+]
+
+PLAN_COLUMNS = [
+    ("label", lambda r: r["label"]),
+    ("start_at", lambda r: r.get("start_at")),
+    ("finish_at", lambda r: r.get("finish_at")),
+] + BLEND_COLUMNS + [
+    ("lemon_juice_cost", lambda r: r["ingredient_cost"]["lemon_juice"]),
+    ("ginger_bug_cost", lambda r: r["ingredient_cost"]["ginger_bug"]),
+    ("total_cost", lambda r: r["ingredient_cost"]["total"]),
+]
+
+SWEEP_FIELDS = [
+    "sugar_g_per_L", "co2_vols", "abv_percent", "cost_estimate", "over_sugar_limit",
+    "risk", "safety_max_hours", "ferment_min_hours", "ferment_optimal_hours", "ferment_max_hours",
+]
+SWEEP_COLUMNS = [("temp_C", lambda r: r["temp_C"]), ("juice_ml_per_L", lambda r: r["juice_ml_per_L"])] + [
+    (field, lambda r, field=field: r.get(field)) for field in SWEEP_FIELDS
+]
+
+
+def negotiate_format(request):
+    """"csv" or "ndjson" from ?format= or the Accept header (default ndjson); None if unsupported."""
+    fmt = request.args.get("format")
+    if fmt is None:
+        fmt = "csv" if request.accept_mimetypes.best_match(["application/x-ndjson", "text/csv"]) == "text/csv" else "ndjson"
+    return fmt if fmt in MIMETYPES else None
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def blend_chunks(blends, model, interpolate_safety=False):
+    """calculate_blends_batch results, EXPORT_CHUNK_ROWS at a time."""
+    for chunk in _chunks(blends, EXPORT_CHUNK_ROWS):
+        yield calculate_blends_batch(chunk, model=model, interpolate_safety=interpolate_safety)
+
+
+def plan_chunks(batches, model, totals, interpolate_safety=False):
+    """Annotated plan batch results, EXPORT_CHUNK_ROWS at a time, folded into totals (a PlanTotals)."""
+    for chunk in _chunks(batches, EXPORT_CHUNK_ROWS):
+        results = calculate_blends_batch(chunk, model=model, interpolate_safety=interpolate_safety)
+        yield [totals.add(batch, result) for batch, result in zip(chunk, results)]
+
+
+def sweep_chunks(fruit_names, pcts, batch_l, temps_C, doses, model, interpolate_safety=False):
+    """One dict per sweep grid cell, computed a band of temperatures at a time."""
+    band = max(1, EXPORT_CHUNK_ROWS // max(len(doses), 1))
+    for temps in _chunks(list(temps_C), band):
+        sweep = sweep_blend(fruit_names, pcts, batch_l, temps, doses, model=model,
+                            interpolate_safety=interpolate_safety)
+        grid = sweep["grid"]
+        fields = [f for f in SWEEP_FIELDS if f in grid]
+        yield [
+            dict({"temp_C": temp, "juice_ml_per_L": dose}, **{f: grid[f][i][j] for f in fields})
+            for i, temp in enumerate(sweep["temps_C"])
+            for j, dose in enumerate(sweep["juice_ml_per_L"])
+        ]
+
+
+def _encode(rows, columns, fmt):
+    if fmt == "ndjson":
+        dumps = current_app.json.dumps
+        return "".join(dumps(row) + "\n" for row in rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if value is None else value for value in (get(row) for _, get in columns)])
+    return buffer.getvalue()
+
+
+def stream(chunks, columns, fmt, filename, trailer=None):
+    """
+    Streamed CSV/NDJSON response over an iterator of row lists.
+
+    The CSV header is sent before anything is computed; after that each
+    chunk is computed, encoded and sent before the next one starts, so
+    memory stays flat and the client sees rows while the export runs.
+    trailer, if given, is called after the last chunk and its dict is
+    sent as a final NDJSON line (CSV has nowhere to put it). An error part
+    way through is logged and, for NDJSON, reported as a final
+    {"error": ...} line; the status has already been sent as 200.
+    """
+    def generate():
+        rows = 0
+        if fmt == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow([name for name, _ in columns])
+            yield buffer.getvalue()
+        try:
+            for chunk in chunks:
+                rows += len(chunk)
+                yield _encode(chunk, columns, fmt)
+            if trailer is not None and fmt == "ndjson":
+                yield current_app.json.dumps(trailer()) + "\n"
+        except Exception as e:
+            current_app.logger.error("Export %s failed after %d rows: %s", filename, rows, e)
+            if fmt == "ndjson":
+                yield current_app.json.dumps({"error": "Export failed", "message": str(e), "rows": rows}) + "\n"
+            return
+        current_app.logger.info("Export %s finished: %d rows", filename, rows,
+                                extra={"event": "export", "export": filename, "rows": rows})
+
+    response = current_app.response_class(stream_with_context(generate()), mimetype=MIMETYPES[fmt])
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    # Proxies (nginx) would otherwise buffer the whole body before sending it
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
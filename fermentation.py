@@ -0,0 +1,240 @@
+# fermentation.py
+
+import math
+
+import numpy as np
+
+# Fully fermented sugar -> CO2 volumes and % ABV: the same factors the blend
+# results use for their end-of-fermentation figures
+CO2_VOLS_PER_G_L = 0.24
+ABV_PER_G_L = 0.065
+
+# Rates are quoted at this temperature and scale by theta per degree from it
+REFERENCE_TEMP_C = 26.0
+
+# Milestones reported by ferment_times(), as fractions of the CO2 limit
+MIN_CO2_FRACTION = 0.5
+OPTIMAL_CO2_FRACTION = 0.75
+# A blend too dilute to ever reach the CO2 limit is "done" once this much of
+# its sugar has fermented
+DEPLETED_FRACTION = 0.95
+
+# Used when the workbook has too few CO2Safety rows to fit; these are the
+# values calibrate() fits to the bundled workbook's sheet
+DEFAULT_RATE_PER_HOUR = 0.0441
+DEFAULT_THETA = 1.1003
+DEFAULT_CO2_LIMIT_VOLS = 0.784
+
+# Candidate CO2 limits tried per calibration pass, and passes (each one
+# zooms in around the previous best)
+CALIBRATION_GRID = 41
+CALIBRATION_PASSES = 3
+
+MAX_SIMULATION_STEPS = 10000
+
+
+class FermentationModel:
+    """
+    First-order sugar fermentation with a temperature-dependent rate.
+
+    Sugar decays as S(t) = S0 * exp(-R(t)), where R is the integral of
+    rate_per_hour * theta ** (T(t) - REFERENCE_TEMP_C) over time. Fermented
+    sugar turns into CO2 and alcohol at CO2_VOLS_PER_G_L / ABV_PER_G_L.
+    co2_limit_vols is the fermentation CO2 at which a sealed bottle reaches
+    a CO2Safety Max_Time_Hours row; calibrate() fits all three parameters to
+    those rows.
+
+    Every method takes arrays (or scalars) of sugar and temperature and
+    evaluates all scenarios together.
+    """
+
+    def __init__(self, rate_per_hour=DEFAULT_RATE_PER_HOUR, theta=DEFAULT_THETA,
+                 co2_limit_vols=DEFAULT_CO2_LIMIT_VOLS, calibration_rows=0, rmse_hours=None):
+        self.rate_per_hour = rate_per_hour
+        self.theta = theta
+        self.co2_limit_vols = co2_limit_vols
+        self.calibration_rows = calibration_rows
+        self.rmse_hours = rmse_hours
+
+    @classmethod
+    def calibrate(cls, rows):
+        """
+        Fit the model to CO2Safety rows (dicts with sugar_g_L, temp_C, max_hours).
+
+        For a candidate CO2 limit V the crossing time is
+        ln(h) = ln(-ln(1 - V / (CO2_VOLS_PER_G_L * S))) - ln(k) - (T - Tref) ln(theta),
+        which is linear in ln(k) and ln(theta), so each candidate is a least
+        squares solve and only V is searched. Returns a default model if
+        fewer than two rows are usable.
+        """
+        usable = [r for r in rows if r["sugar_g_L"] > 0 and r["max_hours"] > 0]
+        if len(usable) < 2:
+            return cls()
+        sugar = np.array([r["sugar_g_L"] for r in usable])
+        dtemp = np.array([r["temp_C"] for r in usable]) - REFERENCE_TEMP_C
+        log_hours = np.log([r["max_hours"] for r in usable])
+        fit_theta = np.ptp(dtemp) > 0
+        design = np.column_stack([np.ones_like(dtemp), dtemp])
+
+        def fit(limit):
+            # Returns (sse, ln k, ln theta) for one candidate CO2 limit
+            y = log_hours - np.log(-np.log1p(-limit / (CO2_VOLS_PER_G_L * sugar)))
+            if fit_theta:
+                (a, b), *_ = np.linalg.lstsq(design, y, rcond=None)
+            else:
+                b = -math.log(DEFAULT_THETA)
+                a = float(np.mean(y - b * dtemp))
+            residual = y - a - b * dtemp
+            return float(residual @ residual), -a, -b
+
+        # Every row must be able to reach the limit, so V < 0.24 * min sugar
+        upper = CO2_VOLS_PER_G_L * sugar.min()
+        lo, hi = upper * 0.01, upper * 0.99
+        best = None
+        for _ in range(CALIBRATION_PASSES):
+            candidates = np.linspace(lo, hi, CALIBRATION_GRID)
+            fits = [(fit(v), v) for v in candidates]
+            (sse, log_k, log_theta), limit = min(fits, key=lambda f: f[0][0])
+            best = (limit, log_k, log_theta)
+            step = candidates[1] - candidates[0]
+            lo, hi = max(limit - step, upper * 0.001), min(limit + step, upper * 0.999)
+
+        limit, log_k, log_theta = best
+        model = cls(math.exp(log_k), math.exp(log_theta), float(limit), calibration_rows=len(usable))
+        predicted = model.hours_to_co2(sugar, dtemp + REFERENCE_TEMP_C, limit)
+        model.rmse_hours = float(np.sqrt(np.mean((predicted - np.exp(log_hours)) ** 2)))
+        return model
+
+    def rate(self, temp_C):
+        """Fraction of the remaining sugar fermented per hour at temp_C."""
+        return self.rate_per_hour * self.theta ** (np.asarray(temp_C, dtype=float) - REFERENCE_TEMP_C)
+
+    def hours_to_co2(self, sugar_g_L, temp_C, co2_vols):
+        """
+        Hours at constant temp_C until fermentation has produced co2_vols.
+
+        A target the sugar can't reach is capped at DEPLETED_FRACTION of the
+        sugar's full yield, so the result is always finite.
+        """
+        sugar_g_L, temp_C, co2_vols = np.broadcast_arrays(
+            np.asarray(sugar_g_L, dtype=float), np.asarray(temp_C, dtype=float), np.asarray(co2_vols, dtype=float))
+        ultimate = CO2_VOLS_PER_G_L * sugar_g_L
+        fraction = np.minimum(co2_vols, ultimate * DEPLETED_FRACTION)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fraction = np.where(ultimate > 0, fraction / ultimate, 0.0)
+        return -np.log1p(-fraction) / self.rate(temp_C)
+
+    def max_hours_many(self, sugar_g_L, temp_C):
+        """Hours until the CO2 limit (or depletion): the model's Max_Time_Hours."""
+        return self.hours_to_co2(sugar_g_L, temp_C, self.co2_limit_vols)
+
+    def ferment_times(self, sugar_g_L, temp_C):
+        """
+        Milestone hours at constant temperature for arrays of scenarios.
+
+        Returns a dict of arrays: min_hours and optimal_hours (CO2 at
+        MIN/OPTIMAL_CO2_FRACTION of the limit), max_hours (the limit) and
+        limit_reached (False where the sugar can't produce the limit, in
+        which case the milestones are fractions of the depleted yield).
+        """
+        sugar_g_L, temp_C = np.broadcast_arrays(np.asarray(sugar_g_L, dtype=float), np.asarray(temp_C, dtype=float))
+        reachable = CO2_VOLS_PER_G_L * sugar_g_L * DEPLETED_FRACTION
+        limit_reached = reachable >= self.co2_limit_vols
+        target = np.minimum(self.co2_limit_vols, reachable)
+        return {
+            "min_hours": self.hours_to_co2(sugar_g_L, temp_C, target * MIN_CO2_FRACTION),
+            "optimal_hours": self.hours_to_co2(sugar_g_L, temp_C, target * OPTIMAL_CO2_FRACTION),
+            "max_hours": self.hours_to_co2(sugar_g_L, temp_C, target),
+            "limit_reached": limit_reached,
+        }
+
+    def ferment_times_one(self, sugar_g_L, temp_C):
+        """Scalar ferment_times() without the NumPy overhead, for single requests."""
+        ultimate = CO2_VOLS_PER_G_L * sugar_g_L
+        if ultimate <= 0:
+            return {"min_hours": 0.0, "optimal_hours": 0.0, "max_hours": 0.0, "limit_reached": False}
+        limit_reached = ultimate * DEPLETED_FRACTION >= self.co2_limit_vols
+        target = min(self.co2_limit_vols, ultimate * DEPLETED_FRACTION) / ultimate
+        rate = self.rate_per_hour * self.theta ** (temp_C - REFERENCE_TEMP_C)
+        return {
+            "min_hours": -math.log1p(-target * MIN_CO2_FRACTION) / rate,
+            "optimal_hours": -math.log1p(-target * OPTIMAL_CO2_FRACTION) / rate,
+            "max_hours": -math.log1p(-target) / rate,
+            "limit_reached": limit_reached,
+        }
+
+    def simulate(self, sugar_g_L, temp_C, hours=48.0, step_hours=0.5):
+        """
+        Sugar, CO2 and ABV over time for n scenarios.
+
+        Args:
+            sugar_g_L: (n,) starting fermentable sugar
+            temp_C: scalar, (n,) constant temperatures, or an (n, steps)
+                profile giving each scenario's temperature during each step
+            hours: simulated duration
+            step_hours: time step; the rate is held constant within a step
+
+        Returns:
+            dict with "hours" (steps + 1,) and (n, steps + 1) arrays
+            "sugar_g_L", "co2_vols" and "abv_percent", plus "limit_hours" (n,):
+            when CO2 first reaches co2_limit_vols, NaN if not within hours
+        """
+        sugar_g_L = np.atleast_1d(np.asarray(sugar_g_L, dtype=float))
+        steps = int(math.ceil(hours / step_hours))
+        if steps < 1 or steps > MAX_SIMULATION_STEPS:
+            raise ValueError(f"hours / step_hours must give 1 to {MAX_SIMULATION_STEPS} steps")
+        times = np.arange(steps + 1) * step_hours
+
+        temp_C = np.asarray(temp_C, dtype=float)
+        if temp_C.ndim < 2:
+            temp_C = np.broadcast_to(np.reshape(temp_C, (-1, 1)), (sugar_g_L.size, steps))
+        if temp_C.shape != (sugar_g_L.size, steps):
+            raise ValueError(f"temp_C profile must have shape ({sugar_g_L.size}, {steps})")
+
+        # R(t): cumulative rate integral, exact for a piecewise-constant profile
+        integral = np.zeros((sugar_g_L.size, steps + 1))
+        np.cumsum(self.rate(temp_C) * step_hours, axis=1, out=integral[:, 1:])
+        fermented = sugar_g_L[:, None] * -np.expm1(-integral)
+
+        # Crossing time of the CO2 limit, interpolated within its step
+        needed = np.full(sugar_g_L.shape, np.inf)
+        ultimate = CO2_VOLS_PER_G_L * sugar_g_L
+        reachable = ultimate > self.co2_limit_vols
+        needed[reachable] = -np.log1p(-self.co2_limit_vols / ultimate[reachable])
+        after = np.minimum((integral < needed[:, None]).sum(axis=1), steps)
+        rows = np.arange(sugar_g_L.size)
+        r0, r1 = integral[rows, after - 1], integral[rows, after]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            within = np.clip((needed - r0) / (r1 - r0), 0.0, 1.0)
+        limit_hours = np.where(needed <= integral[:, -1], times[after - 1] + within * step_hours, np.nan)
+
+        return {
+            "hours": times,
+            "sugar_g_L": sugar_g_L[:, None] - fermented,
+            "co2_vols": fermented * CO2_VOLS_PER_G_L,
+            "abv_percent": fermented * ABV_PER_G_L,
+            "limit_hours": limit_hours,
+        }
+
+    def describe(self):
+        """Calibrated parameters, for API responses and /health."""
+        return {
+            "rate_per_hour_at_26C": round(self.rate_per_hour, 5),
+            "theta_per_C": round(self.theta, 4),
+            "co2_limit_vols": round(self.co2_limit_vols, 4),
+            "calibration_rows": self.calibration_rows,
+            "rmse_hours": None if self.rmse_hours is None else round(self.rmse_hours, 3),
+        }
+
+
+def profile_from_points(points, hours, step_hours):
+    """
+    Per-step temperatures for a simulate() grid from [(hour, temp_C), ...].
+
+    Temperatures are linearly interpolated at each step's midpoint and held
+    at the first/last point outside their range.
+    """
+    points = sorted((float(h), float(t)) for h, t in points)
+    steps = int(math.ceil(hours / step_hours))
+    midpoints = (np.arange(steps) + 0.5) * step_hours
+    return np.interp(midpoints, [p[0] for p in points], [p[1] for p in points])
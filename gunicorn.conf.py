@@ -0,0 +1,75 @@
+# gunicorn.conf.py
+#
+# Production startup: gunicorn -c gunicorn.conf.py app:app
+#
+# The app is imported and the workbook model (catalog, costs, CO2 safety
+# index, fermentation fit and auto-suggest table) is built once in the master before the
+# listening socket opens and before workers fork. Workers inherit it
+# copy-on-write, so no user pays the workbook parse on a worker's first
+# request and N workers don't each build their own copy.
+#
+# Prometheus metrics run in multiprocess mode: each process writes its samples
+# to files in PROMETHEUS_MULTIPROC_DIR and /metrics, served by any worker,
+# aggregates all of them.
+
+import gc
+import glob
+import os
+import time
+
+# Must be set before the app (and so prometheus_client) is imported
+METRICS_DIR = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/probiotic-designer-metrics")
+if os.environ.get("METRICS_DIR_OWNER_PID") != str(os.getpid()):
+    # First load in this master, not a HUP config reload: drop the last run's samples
+    for stale in glob.glob(os.path.join(METRICS_DIR, "*.db")):
+        os.remove(stale)
+    os.environ["METRICS_DIR_OWNER_PID"] = str(os.getpid())
+os.makedirs(METRICS_DIR, exist_ok=True)
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+preload_app = True
+
+# Written once the master has loaded the model and is about to start workers;
+# removed on shutdown. Point an exec readiness probe at it (test -f ...).
+READY_FILE = os.environ.get("READY_FILE", "/tmp/probiotic-designer.ready")
+
+
+def _remove_ready_file():
+    try:
+        os.remove(READY_FILE)
+    except FileNotFoundError:
+        pass
+
+
+def on_starting(server):
+    _remove_ready_file()
+    if not server.cfg.preload_app:
+        return
+
+    from excel_backend import warm_model
+
+    started = time.perf_counter()
+    model = warm_model(suggestions=True)
+    server.log.info(
+        "Model %s preloaded from %s in %.2fs (%d fruits, %d auto-suggest entries)",
+        model.version, model.source, time.perf_counter() - started, len(model.catalog), len(model.suggest_table),
+    )
+    # Keep the cyclic GC from touching (and so copying) the inherited objects in workers
+    gc.freeze()
+
+
+def when_ready(server):
+    with open(READY_FILE, "w") as fh:
+        fh.write(f"{os.getpid()}\n")
+    server.log.info("Ready: %s", READY_FILE)
+
+
+def child_exit(server, worker):
+    from metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    _remove_ready_file()
@@ -0,0 +1,69 @@
+# json_provider.py
+
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    # Optional: without it the app keeps Flask's stdlib json provider
+    orjson = None
+
+# "auto" uses orjson when it is installed, "orjson" requires it, "default"
+# keeps Flask's stdlib provider
+JSON_PROVIDER = os.environ.get("JSON_PROVIDER", "auto").lower()
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+
+    Output matches DefaultJSONProvider's: sorted keys, compact outside debug
+    mode, indented in debug mode, and Flask's default() for dates, UUIDs,
+    dataclasses and __html__ objects. NumPy scalars and arrays serialize
+    natively. Anything orjson rejects (e.g. integers over 64 bits) falls back
+    to the stdlib encoder. Non-ASCII text is written as UTF-8 rather than
+    \\u escapes, and NaN/Infinity become null, which is valid JSON.
+    """
+
+    def _options(self, indent=False):
+        # Dates go through default() (HTTP dates) rather than orjson's ISO 8601
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def _dumpb(self, obj, indent=False):
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._options(indent))
+        except TypeError:
+            kwargs = {"indent": 2} if indent else {"separators": (",", ":")}
+            return super().dumps(obj, **kwargs).encode()
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # indent=, cls= etc. are stdlib json options
+            return super().dumps(obj, **kwargs)
+        return self._dumpb(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._dumpb(obj, indent) + b"\n", mimetype=self.mimetype)
+
+
+def init_app(app):
+    """Install the JSON provider selected by JSON_PROVIDER on app and return it."""
+    if JSON_PROVIDER == "orjson" and orjson is None:
+        raise RuntimeError("JSON_PROVIDER=orjson but orjson is not installed")
+    if JSON_PROVIDER != "default" and orjson is not None:
+        app.json = OrjsonProvider(app)
+    return app.json
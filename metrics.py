@@ -0,0 +1,123 @@
+# metrics.py
+
+import os
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+except ImportError:
+    # Metrics are optional: without prometheus_client the hooks below are
+    # no-ops and /metrics reports that it is unavailable
+    Counter = None
+
+ENABLED = Counter is not None
+
+# Under gunicorn (see gunicorn.conf.py) every worker writes its samples to
+# files in this directory and a scrape of any worker aggregates all of them
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+# Seconds; from sub-millisecond cache hits up past the weather deadline
+_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_LOAD_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+if ENABLED:
+    HTTP_REQUESTS = Counter(
+        "probiotic_http_requests_total", "HTTP requests handled", ["route", "method", "status"],
+    )
+    HTTP_LATENCY = Histogram(
+        "probiotic_http_request_duration_seconds", "HTTP request latency", ["route"], buckets=_LATENCY_BUCKETS,
+    )
+    MODEL_LOAD = Histogram(
+        "probiotic_model_load_duration_seconds", "Workbook model load time", ["source"], buckets=_LOAD_BUCKETS,
+    )
+    SUGGEST_TABLE_BUILD = Histogram(
+        "probiotic_suggest_table_build_seconds", "Auto-suggest table build time", buckets=_LOAD_BUCKETS,
+    )
+    CATALOG_FRUITS = Gauge(
+        "probiotic_catalog_fruits", "Fruits in the most recently loaded workbook model",
+        multiprocess_mode="mostrecent",
+    )
+    CACHE_LOOKUPS = Counter(
+        "probiotic_cache_lookups_total", "Cache lookups by outcome (hit, stale, miss)", ["cache", "result"],
+    )
+    CACHE_EVICTIONS = Counter(
+        "probiotic_cache_evictions_total", "Entries evicted to respect a cache's size limit", ["cache"],
+    )
+    WEATHER_UPSTREAM = Histogram(
+        "probiotic_weather_upstream_duration_seconds", "wttr.in call duration", ["outcome"],
+        buckets=_LATENCY_BUCKETS,
+    )
+    WEATHER_ERRORS = Counter(
+        "probiotic_weather_errors_total",
+        "Failed upstream weather calls and lookups that never reached upstream, by reason", ["reason"],
+    )
+
+
+def observe_request(route, method, status, seconds):
+    if ENABLED:
+        HTTP_REQUESTS.labels(route, method, str(status)).inc()
+        HTTP_LATENCY.labels(route).observe(seconds)
+
+
+def observe_model_load(source, seconds, fruits):
+    if ENABLED:
+        MODEL_LOAD.labels(source).observe(seconds)
+        CATALOG_FRUITS.set(fruits)
+
+
+def observe_suggest_table(seconds):
+    if ENABLED:
+        SUGGEST_TABLE_BUILD.observe(seconds)
+
+
+def cache_lookup(cache, result):
+    if ENABLED:
+        CACHE_LOOKUPS.labels(cache, result).inc()
+
+
+def cache_eviction(cache, count=1):
+    if ENABLED:
+        CACHE_EVICTIONS.labels(cache).inc(count)
+
+
+def observe_weather_fetch(outcome, seconds):
+    """outcome: "ok", "error_status" or "exception"."""
+    if ENABLED:
+        WEATHER_UPSTREAM.labels(outcome).observe(seconds)
+
+
+def weather_error(reason):
+    """reason: "timeout", "circuit_open", "pool_full", "error_status" or "exception"."""
+    if ENABLED:
+        WEATHER_ERRORS.labels(reason).inc()
+
+
+def render():
+    """
+    Return (body, content_type) for a scrape, or None if metrics are disabled.
+
+    In multiprocess mode the registry is rebuilt from the shared directory on
+    every scrape, so the numbers cover all workers, not just this one.
+    """
+    if not ENABLED:
+        return None
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """Drop a dead worker's live-gauge files (called from gunicorn's child_exit)."""
+    if ENABLED and MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,211 @@
+# profiling.py
+
+import cProfile
+import glob
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, request
+
+# Profile this fraction of /api/ requests (0 disables sampling)
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+# A request carrying this value in X-Profile-Token is always profiled, and the
+# same header unlocks /api/admin/profiles. Unset disables both.
+PROFILE_ADMIN_TOKEN = os.environ.get("PROFILE_ADMIN_TOKEN", "")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join("logs", "profiles"))
+# Oldest profiles beyond this many are deleted
+PROFILE_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", 200))
+
+PROFILE_HEADER = "X-Profile-Token"
+# Request bodies are attached to the profile up to this many characters
+_MAX_INPUT_CHARS = 4096
+_TOP_FUNCTIONS = 25
+
+logger = logging.getLogger(__name__)
+_prune_lock = threading.Lock()
+
+
+def enabled():
+    return PROFILE_SAMPLE_RATE > 0 or bool(PROFILE_ADMIN_TOKEN)
+
+
+def is_admin(request):
+    token = request.headers.get(PROFILE_HEADER)
+    return bool(PROFILE_ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, PROFILE_ADMIN_TOKEN)
+
+
+def should_profile(request):
+    """Profile on a valid admin header, otherwise sample /api/ requests."""
+    if request.path.startswith("/api/admin/"):
+        return False
+    if is_admin(request):
+        return True
+    if PROFILE_SAMPLE_RATE <= 0 or not request.path.startswith("/api/"):
+        return False
+    return random.random() < PROFILE_SAMPLE_RATE
+
+
+def start():
+    """Return an enabled profiler, or None if one can't be attached to this thread."""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler already owns this thread
+        return None
+    return profiler
+
+
+def _short_path(filename):
+    # App modules relative to the working directory, libraries as package/module.py
+    relative = os.path.relpath(filename)
+    if not relative.startswith(".."):
+        return relative
+    return os.path.join(os.path.basename(os.path.dirname(filename)), os.path.basename(filename))
+
+
+def _request_inputs(request):
+    if request.is_json:
+        body = request.get_data(as_text=True)
+    else:
+        body = ""
+    if len(body) > _MAX_INPUT_CHARS:
+        body = body[:_MAX_INPUT_CHARS] + f"... ({len(body)} chars)"
+    return {"query": request.args.to_dict(flat=False), "body": body}
+
+
+def finish(profiler, request, response, seconds):
+    """
+    Stop profiler and write the request's profile to PROFILE_DIR.
+
+    Two files share a name: <name>.prof (pstats/snakeviz format) and
+    <name>.json with the route, inputs, duration and the top functions by
+    cumulative time. Returns the profile name, or None if it couldn't be written.
+    """
+    profiler.disable()
+    route = request.url_rule.rule if request.url_rule is not None else request.path
+    finished_at = datetime.now(timezone.utc)
+    slug = re.sub(r"[^A-Za-z0-9.-]+", "_", route.strip("/")) or "index"
+    name = f"{finished_at:%Y%m%dT%H%M%S}-{slug}-{uuid.uuid4().hex[:8]}"
+
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    stats.sort_stats("cumulative")
+    top = []
+    for func in stats.fcn_list[:_TOP_FUNCTIONS]:
+        calls, primitive_calls, tottime, cumtime, _ = stats.stats[func]
+        filename, line, function = func
+        top.append({
+            "function": f"{_short_path(filename)}:{line}({function})" if line else function,
+            "calls": calls,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+        })
+
+    record = {
+        "name": name,
+        "timestamp": finished_at.isoformat(),
+        "route": route,
+        "method": request.method,
+        "status": response.status_code,
+        "duration_ms": round(seconds * 1000, 3),
+        "pid": os.getpid(),
+        "inputs": _request_inputs(request),
+        "top_functions": top,
+    }
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stats.dump_stats(os.path.join(PROFILE_DIR, f"{name}.prof"))
+        with open(os.path.join(PROFILE_DIR, f"{name}.json"), "w") as fh:
+            json.dump(record, fh, indent=2)
+    except OSError as e:
+        logger.warning("Could not write request profile %s: %s", name, e)
+        return None
+    _prune()
+    return name
+
+
+def _prune():
+    with _prune_lock:
+        records = sorted(glob.glob(os.path.join(PROFILE_DIR, "*.json")), key=_mtime)
+        for path in records[:max(0, len(records) - PROFILE_MAX_FILES)]:
+            for stale in (path, path[:-len(".json")] + ".prof"):
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        return 0.0
+
+
+def slowest(limit=20, route=None):
+    """
+    Return the slowest profiled requests still in PROFILE_DIR, slowest first.
+
+    Reads the .json records, so every gunicorn worker's profiles are included.
+    """
+    records = []
+    for path in glob.glob(os.path.join(PROFILE_DIR, "*.json")):
+        try:
+            with open(path) as fh:
+                record = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        if route and record.get("route") != route:
+            continue
+        # The summary lists requests; the full breakdown stays in the files
+        record["top_functions"] = record.get("top_functions", [])[:5]
+        records.append(record)
+    records.sort(key=lambda r: r.get("duration_ms", 0), reverse=True)
+    return records[:limit]
+
+
+def init_app(app):
+    """
+    Install the profiling hooks on app when PROFILE_SAMPLE_RATE or
+    PROFILE_ADMIN_TOKEN is set. When neither is, no hook is registered and
+    requests pay nothing.
+    """
+    if not enabled():
+        return
+
+    @app.before_request
+    def start_profiler():
+        if should_profile(request):
+            g.profiler = start()
+            g.profiler_started = time.perf_counter()
+
+    @app.after_request
+    def write_profile(response):
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            name = finish(profiler, request, response, time.perf_counter() - g.profiler_started)
+            if name:
+                response.headers["X-Profile-Id"] = name
+        return response
+
+    @app.teardown_request
+    def stop_profiler(exc):
+        # after_request is skipped when a request dies with an unhandled error
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+
+    app.logger.info(
+        "Request profiling enabled: sample rate %s, admin header %s, writing to %s",
+        PROFILE_SAMPLE_RATE, "on" if PROFILE_ADMIN_TOKEN else "off", PROFILE_DIR,
+    )
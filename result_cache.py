@@ -0,0 +1,103 @@
+# result_cache.py
+
+from collections import OrderedDict
+import threading
+import time
+
+import metrics
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL, scoped to one model version.
+
+    Entries belong to the model version they were computed from. The first
+    get() for a different version drops everything, so a hot-reloaded
+    workbook never serves stale results; put() for any other version than the
+    current one is ignored (a request that started before the swap).
+
+    Args:
+        maxsize: maximum number of entries; 0 disables caching
+        ttl: seconds an entry stays valid; 0 means no expiry
+        name: label for lookups and evictions in /metrics; None to skip
+    """
+
+    def __init__(self, maxsize=1024, ttl=300.0, name=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key, version):
+        """Return the cached value for key, or None on a miss."""
+        if self.maxsize <= 0:
+            return None
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self._entries.clear()
+                    self.invalidations += 1
+                self._version = version
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                self._record("miss")
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                self._record("miss")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._record("hit")
+            return value
+
+    def put(self, key, version, value):
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+                if self.name:
+                    metrics.cache_eviction(self.name)
+
+    def _record(self, result):
+        if self.name:
+            metrics.cache_lookup(self.name, result)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "model_version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,120 @@
+# static_assets.py
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+from flask import abort, current_app, request
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without it assets are served gzip or uncompressed
+    brotli = None
+
+# A fingerprinted URL (?v=<content hash>) always has the same bytes, so
+# browsers and CDNs may keep it for a year without revalidating
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Smaller files aren't worth a compressed variant
+MIN_COMPRESS_BYTES = 512
+COMPRESSIBLE_EXTENSIONS = {".css", ".html", ".js", ".json", ".map", ".svg", ".txt"}
+# Server preference when the client accepts several equally
+ENCODINGS = ("br", "gzip", "identity")
+
+
+class StaticAsset:
+    """One static file: its content hash and identity/gzip/br bodies, built once."""
+
+    def __init__(self, path):
+        with open(path, "rb") as fh:
+            data = fh.read()
+        self.path = path
+        self.mtime = os.stat(path).st_mtime
+        self.digest = hashlib.sha256(data).hexdigest()[:12]
+        self.mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.variants = {"identity": data}
+        if os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS and len(data) >= MIN_COMPRESS_BYTES:
+            # mtime=0 keeps the gzip bytes (and so the ETag's body) reproducible
+            self.variants["gzip"] = gzip.compress(data, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(data, quality=11)
+
+
+class AssetManifest:
+    """
+    Static files by name, hashed and precompressed on first use.
+
+    build() loads the whole folder up front (in the gunicorn master, so
+    workers share it). With check=True a file whose mtime changed is
+    reloaded, for development.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def build(self):
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                self.get(os.path.relpath(os.path.join(root, name), self.folder).replace(os.sep, "/"))
+        return self
+
+    def get(self, filename, check=False):
+        """Return the StaticAsset for filename, or None if there is no such file."""
+        asset = self._assets.get(filename)
+        if asset is not None and not check:
+            return asset
+        path = safe_join(self.folder, filename)
+        if path is None or not os.path.isfile(path):
+            return None
+        if asset is None or os.stat(path).st_mtime != asset.mtime:
+            asset = StaticAsset(path)
+            with self._lock:
+                self._assets[filename] = asset
+        return asset
+
+
+def _serve_static(filename):
+    manifest = current_app.extensions["static_assets"]
+    asset = manifest.get(filename, check=current_app.debug)
+    if asset is None:
+        abort(404)
+
+    encoding = request.accept_encodings.best_match([e for e in ENCODINGS if e in asset.variants]) or "identity"
+    response = current_app.response_class(asset.variants[encoding], mimetype=asset.mimetype)
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.set_etag(f"{asset.digest}-{encoding}")
+    if request.args.get("v") == asset.digest:
+        response.headers["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        # Unversioned URL: may be cached, but revalidate (a cheap 304) every time
+        response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+
+def init_app(app):
+    """
+    Serve app.static_folder with fingerprinted URLs and precompressed bodies.
+
+    url_for('static', filename=...) gains ?v=<content hash>; a request with
+    the current hash is cacheable as immutable, and the body is the best of
+    br/gzip/identity the client accepts, with ETag and 304 support.
+    """
+    manifest = AssetManifest(app.static_folder).build()
+    app.extensions["static_assets"] = manifest
+    app.view_functions["static"] = _serve_static
+
+    @app.url_defaults
+    def add_asset_version(endpoint, values):
+        if endpoint == "static" and "filename" in values and "v" not in values:
+            asset = manifest.get(values["filename"], check=app.debug)
+            if asset is not None:
+                values["v"] = asset.digest
+
+    return manifest
@@ -0,0 +1,183 @@
+# structured_logging.py
+
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+
+# JSON lines by default; "text" keeps the old human-readable layout
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json").lower()
+# Records waiting for the writer thread; when full, new records are dropped
+# (and counted) rather than blocking the request
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+# Fraction of per-request INFO lines (records with an "event") that are kept
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", 1.0))
+# Per-event overrides, e.g. "manual_blend=0.1,auto_blend=0.25"
+LOG_SAMPLE_RATES = os.environ.get("LOG_SAMPLE_RATES", "")
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]"
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _parse_rates(spec):
+    rates = {}
+    for part in spec.split(","):
+        event, _, rate = part.partition("=")
+        if event.strip() and rate.strip():
+            rates[event.strip()] = float(rate)
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record: timestamp, level, logger, message, source
+    location, pid, and every field passed with extra=.
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "source": f"{record.pathname}:{record.lineno}",
+            "pid": record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a fraction of high-volume INFO records.
+
+    Only records at INFO or below that carry an "event" field are sampled;
+    warnings, errors and one-off lines always pass. Kept records get a
+    sample_rate field so counts can be scaled back up.
+    """
+
+    def __init__(self, rate=1.0, rates=None):
+        super().__init__()
+        self.rate = rate
+        self.rates = dict(rates or {})
+        self.sampled_out = 0
+
+    def filter(self, record):
+        event = getattr(record, "event", None)
+        if event is None or record.levelno > logging.INFO:
+            return True
+        rate = self.rates.get(event, self.rate)
+        if rate >= 1.0:
+            return True
+        if random.random() < rate:
+            record.sample_rate = rate
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler that hands the record over unformatted.
+
+    The stock prepare() formats the message on the calling thread; here
+    getMessage() and the JSON encoding run on the writer thread. Callers pass
+    %-style args and extra= fields instead of pre-built strings. A full queue
+    drops the record and counts it instead of raising.
+    """
+
+    def __init__(self, queue_):
+        super().__init__(queue_)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _QueueLogging:
+    """The queue handler attached to a logger plus its background writer."""
+
+    def __init__(self, handlers, sampler):
+        self.handlers = handlers
+        self.sampler = sampler
+        self.handler = LazyQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        self.handler.addFilter(sampler)
+        self.listener = None
+        self._running = False
+        self._lock = threading.Lock()
+        self.start()
+        atexit.register(self.stop)
+        # Threads don't survive fork: gunicorn workers forked from a preloading
+        # master need their own queue and writer
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def start(self):
+        self.listener = QueueListener(self.handler.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+        self._running = True
+
+    def stop(self):
+        """Flush queued records and stop the writer."""
+        with self._lock:
+            if self._running:
+                self.listener.stop()
+                self._running = False
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._running = False
+        self.handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+        self.handler.dropped = 0
+        self.sampler.sampled_out = 0
+        self.start()
+
+    def stats(self):
+        return {
+            "queued": self.handler.queue.qsize(),
+            "dropped": self.handler.dropped,
+            "sampled_out": self.sampler.sampled_out,
+        }
+
+
+_queue_logging = None
+
+
+def configure(logger, *handlers, level=logging.INFO):
+    """
+    Route logger through a background queue to handlers.
+
+    Each handler gets the JSON (or LOG_FORMAT=text) formatter. Records are
+    sampled per LOG_SAMPLE_RATE / LOG_SAMPLE_RATES and enqueued on the calling
+    thread; formatting, file writes and rotation happen on the writer thread.
+    """
+    global _queue_logging
+    formatter = JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    sampler = SamplingFilter(LOG_SAMPLE_RATE, _parse_rates(LOG_SAMPLE_RATES))
+    _queue_logging = _QueueLogging(list(handlers), sampler)
+    logger.addHandler(_queue_logging.handler)
+    logger.setLevel(level)
+    return _queue_logging
+
+
+def get_logging_stats():
+    """Queue depth, dropped and sampled-out counts for this process, or None."""
+    return _queue_logging.stats() if _queue_logging is not None else None
@@ -0,0 +1,371 @@
+# weather.py
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# wttr.in by default; point at a local stub (python weather.py stub) for testing
+WEATHER_API_URL = os.environ.get("WEATHER_API_URL", "https://wttr.in").rstrip("/")
+WEATHER_API_TIMEOUT = float(os.environ.get("WEATHER_API_TIMEOUT", 10))
+
+# Readings are shared by every request in the same grid cell (0.05 deg is ~5 km)
+WEATHER_GRID_DEGREES = float(os.environ.get("WEATHER_GRID_DEGREES", 0.05))
+# Fresh for WEATHER_CACHE_TTL; after that, served while one background refresh
+# runs, until WEATHER_STALE_TTL when a request has to wait for a new reading
+WEATHER_CACHE_TTL = float(os.environ.get("WEATHER_CACHE_TTL", 1800))
+WEATHER_STALE_TTL = float(os.environ.get("WEATHER_STALE_TTL", 6 * 3600))
+WEATHER_CACHE_SIZE = int(os.environ.get("WEATHER_CACHE_SIZE", 1024))
+
+# Upstream calls run on a small per-worker pool; a request waits at most
+# WEATHER_REQUEST_DEADLINE seconds for one before falling back to 28C
+WEATHER_FETCH_WORKERS = int(os.environ.get("WEATHER_FETCH_WORKERS", 4))
+WEATHER_REQUEST_DEADLINE = float(os.environ.get("WEATHER_REQUEST_DEADLINE", 2))
+# Stop calling upstream after this many consecutive failures; probe again after the reset
+WEATHER_BREAKER_FAILURES = int(os.environ.get("WEATHER_BREAKER_FAILURES", 5))
+WEATHER_BREAKER_RESET = float(os.environ.get("WEATHER_BREAKER_RESET", 30))
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_wttr(weather_data):
+    """Pull the fields /api/weather returns out of a wttr.in format=j1 payload."""
+    current = weather_data.get("current_condition", [{}])[0]
+
+    temp_c = float(current.get("temp_C", 28))
+    humidity = int(current.get("humidity", 60))
+    weather_desc = current.get("weatherDesc", [{}])[0].get("value", "Clear")
+
+    # Get location name
+    nearest_area = weather_data.get("nearest_area", [{}])[0]
+    city = nearest_area.get("areaName", [{}])[0].get("value", "Unknown")
+    country = nearest_area.get("country", [{}])[0].get("value", "")
+
+    return {
+        "temp_c": temp_c,
+        "humidity": humidity,
+        "weather": weather_desc,
+        "location": f"{city}, {country}" if country else city,
+    }
+
+
+class WeatherUnavailable(requests.RequestException):
+    """Raised without calling upstream: the circuit is open or the fetch pool is full."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Closed, calls go through. After failure_threshold failures in a row it
+    opens and allow() refuses calls for reset_timeout seconds; then a single
+    probe is let through (half-open) and its outcome closes or re-opens it.
+    """
+
+    def __init__(self, failure_threshold=WEATHER_BREAKER_FAILURES, reset_timeout=WEATHER_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go upstream now (claims the probe when half-open)."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.state = "open"
+                self.opened += 1
+                self._opened_at = time.monotonic()
+            elif self.state == "open":
+                # A straggler from before the trip; restart the cool-down
+                self._opened_at = time.monotonic()
+
+
+class WeatherClient:
+    """
+    Current-conditions client with a pooled session and a grid-cell cache.
+
+    Coordinates are snapped to a grid_degrees cell and each cell is fetched
+    (at its centre) at most once per ttl. Entries older than ttl but younger
+    than stale_ttl are still returned immediately while a single background
+    refresh per cell replaces them.
+
+    Upstream calls never run on the request thread. They go to a pool of
+    fetch_workers threads, at most one in flight per cell, and a caller
+    waits no longer than deadline for its result. A CircuitBreaker skips
+    upstream entirely after repeated failures, so during an outage requests
+    fall back immediately instead of holding a worker.
+    """
+
+    def __init__(self, base_url=WEATHER_API_URL, timeout=WEATHER_API_TIMEOUT, grid_degrees=WEATHER_GRID_DEGREES,
+                 ttl=WEATHER_CACHE_TTL, stale_ttl=WEATHER_STALE_TTL, max_entries=WEATHER_CACHE_SIZE,
+                 fetch_workers=WEATHER_FETCH_WORKERS, deadline=WEATHER_REQUEST_DEADLINE, breaker=None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.grid_degrees = grid_degrees
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.max_entries = max_entries
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=fetch_workers, pool_maxsize=fetch_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._pool = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="weather-fetch")
+        # Queued + running fetches; beyond this, misses fail fast instead of queueing
+        self.max_pending = fetch_workers * 4
+
+        self._entries = OrderedDict()   # cell -> (reading, fetched_at)
+        self._in_flight = {}            # cell -> Future
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.fetch_errors = 0
+        self.deadline_timeouts = 0
+        self.rejected = 0
+
+    def cell(self, lat, lon):
+        """Grid cell for a coordinate pair."""
+        return (round(float(lat) / self.grid_degrees), round(float(lon) / self.grid_degrees))
+
+    def fetch(self, cell):
+        """
+        Fetch current conditions for a cell's centre from the upstream API.
+
+        Returns the parsed reading, or None if the API answered with an error
+        status. Network errors (requests.RequestException) propagate.
+        """
+        lat, lon = (round(i * self.grid_degrees, 4) for i in cell)
+        response = self.session.get(f"{self.base_url}/{lat},{lon}", params={"format": "j1"}, timeout=self.timeout)
+        if response.status_code != 200:
+            logger.warning("Weather API returned %s for %s,%s", response.status_code, lat, lon)
+            return None
+        return _parse_wttr(response.json())
+
+    def get(self, lat, lon):
+        """
+        Return (reading, status) for a location.
+
+        status is "hit", "stale" (served while a refresh runs) or "miss"
+        (fetched for this call). reading is None if the API answered with an
+        error. Raises requests.Timeout when no reading arrives within the
+        deadline, WeatherUnavailable when upstream isn't called at all, and
+        the fetch's own requests.RequestException otherwise.
+        """
+        cell = self.cell(lat, lon)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(cell)
+            if entry is not None:
+                reading, fetched_at = entry
+                age = now - fetched_at
+                if age < self.ttl:
+                    self._entries.move_to_end(cell)
+                    self.hits += 1
+                    metrics.cache_lookup("weather", "hit")
+                    return reading, "hit"
+                if age < self.stale_ttl:
+                    self._entries.move_to_end(cell)
+                    self.stale_hits += 1
+                    metrics.cache_lookup("weather", "stale")
+                    if cell not in self._in_flight and self._has_capacity() and self.breaker.allow():
+                        self._submit(cell)
+                    return reading, "stale"
+
+            self.misses += 1
+            metrics.cache_lookup("weather", "miss")
+            future = self._in_flight.get(cell)
+            if future is None:
+                # Capacity first, so a half-open probe is never claimed and then dropped
+                if not self._has_capacity():
+                    self.rejected += 1
+                    metrics.weather_error("pool_full")
+                    raise WeatherUnavailable("weather fetch pool is full")
+                if not self.breaker.allow():
+                    self.rejected += 1
+                    metrics.weather_error("circuit_open")
+                    raise WeatherUnavailable("weather circuit is open")
+                future = self._submit(cell)
+
+        try:
+            return future.result(timeout=self.deadline), "miss"
+        except FutureTimeout:
+            # The fetch keeps running and fills the cache for the next request
+            with self._lock:
+                self.deadline_timeouts += 1
+            metrics.weather_error("timeout")
+            # The breaker hears about it once, from the fetch itself, when it ends
+            raise requests.Timeout(f"no weather reading within {self.deadline}s")
+
+    def _has_capacity(self):
+        return len(self._in_flight) < self.max_pending
+
+    def _submit(self, cell):
+        # Caller holds self._lock
+        future = self._pool.submit(self._fetch_task, cell)
+        self._in_flight[cell] = future
+        return future
+
+    def _fetch_task(self, cell):
+        started = time.monotonic()
+        ok = False
+        outcome = "exception"
+        try:
+            reading = self.fetch(cell)
+            if reading is not None:
+                self._store(cell, reading)
+                ok = True
+                outcome = "ok"
+            else:
+                outcome = "error_status"
+            # Every upstream call settles the breaker exactly once, so a half-open
+            # probe always closes or re-opens it. Slower than the deadline is a
+            # failure for the breaker's purposes, but the reading is still cached.
+            if ok and time.monotonic() - started <= self.deadline:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            return reading
+        except Exception as e:
+            self.breaker.record_failure()
+            logger.warning("Weather fetch for %s failed: %s", cell, e)
+            raise
+        finally:
+            metrics.observe_weather_fetch(outcome, time.monotonic() - started)
+            if not ok:
+                metrics.weather_error(outcome)
+            with self._lock:
+                self._in_flight.pop(cell, None)
+                self.fetches += 1
+                if not ok:
+                    self.fetch_errors += 1
+
+    def _store(self, cell, reading):
+        with self._lock:
+            self._entries[cell] = (reading, time.monotonic())
+            self._entries.move_to_end(cell)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                metrics.cache_eviction("weather")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "fetches": self.fetches,
+                "fetch_errors": self.fetch_errors,
+                "in_flight": len(self._in_flight),
+                "deadline_timeouts": self.deadline_timeouts,
+                "rejected": self.rejected,
+                "circuit": self.breaker.state,
+                "circuit_opened": self.breaker.opened,
+            }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_weather_client():
+    """Return the process-wide WeatherClient (created on first use, per worker)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = WeatherClient()
+    return _client
+
+
+def make_stub_server(port=8099, temp_c=24.0, delay=0.0):
+    """
+    Build an HTTP server answering every GET with a wttr.in-shaped j1 reading.
+
+    delay (seconds) simulates a slow API; port 0 picks a free port.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    payload = json.dumps({
+        "current_condition": [{"temp_C": str(temp_c), "humidity": "65", "weatherDesc": [{"value": "Partly cloudy"}]}],
+        "nearest_area": [{"areaName": [{"value": "Stubville"}], "country": [{"value": "Testland"}]}],
+    }).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if delay:
+                time.sleep(delay)
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client timed out while we were "slow"
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def run_stub_server(port=8099, temp_c=24.0, delay=0.0):
+    """
+    Serve wttr.in-shaped format=j1 responses locally for testing.
+
+    Point the app at it with WEATHER_API_URL=http://127.0.0.1:<port>.
+    """
+    server = make_stub_server(port, temp_c, delay)
+    print(f"Weather stub listening on http://127.0.0.1:{server.server_port} (temp {temp_c}C, delay {delay}s)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    # Local stub: python weather.py stub [port] [temp_C] [delay_seconds]
+    if len(sys.argv) >= 2 and sys.argv[1] == "stub":
+        args = sys.argv[2:]
+        run_stub_server(
+            port=int(args[0]) if len(args) > 0 else 8099,
+            temp_c=float(args[1]) if len(args) > 1 else 24.0,
+            delay=float(args[2]) if len(args) > 2 else 0.0,
+        )
+    else:
+        print("usage: python weather.py stub [port] [temp_C] [delay_seconds]")
+        sys.exit(2)